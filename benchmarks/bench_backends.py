@@ -0,0 +1,189 @@
+"""
+Accuracy/latency comparison of the CPU inference backends (utils.backends).
+
+    python benchmarks/bench_backends.py --threads 4
+    python benchmarks/bench_backends.py --models encoder clip --images recordings/
+
+Every backend is measured against eager torch fp32 on the same inputs:
+- encoder (all-MiniLM-L6-v2): embedding cosine to the reference and agreement
+  of the best label per intent;
+- clip (image tower): embedding cosine and agreement of the zero-shot icon label;
+- yolo: detection count and mean IoU of matched boxes.
+Inputs are synthetic unless --images points at saved screenshots. Runs on CPU.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+
+from utils.backends import BACKENDS, configure_threads, load_clip, load_sentence_transformer, load_yolo  # type: ignore
+from utils.metrics import MetricsRegistry  # type: ignore
+from utils.tracker import iou_matrix, greedy_match  # type: ignore
+from synthetic import make_scene  # type: ignore
+
+INTENTS = ["click save", "open settings", "search files", "press the cancel button", "close the dialog",
+           "go home", "delete this item", "add a new entry"]
+
+
+def timed(registry, name, fn, repeat):
+    result = fn()  # warm-up, also the result compared across backends
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        registry.observe(name, (time.perf_counter() - start) * 1000)
+    return result
+
+
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def load_frames(directory, count=4):
+    import cv2  # type: ignore
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, '*.png')) + glob.glob(os.path.join(directory, '*.jpg')))
+        return [cv2.imread(p) for p in paths[:count]]
+    # Synthetic screens: the boxes of generated scenes drawn as filled widgets with labels
+    frames = []
+    for seed in range(count):
+        scene = make_scene(120, seed=seed)
+        img = np.full((1080, 1920, 3), 240, dtype=np.uint8)
+        rng = np.random.default_rng(seed)
+        for el in scene['layouts'] + scene['elements']:
+            x1, y1, x2, y2 = map(int, el['box'])
+            cv2.rectangle(img, (x1, y1), (x2, y2), tuple(int(c) for c in rng.integers(0, 200, 3)), -1)
+        for t in scene['text']:
+            (x1, y1), (x2, y2) = t['box'][0], t['box'][2]
+            cv2.putText(img, t['text'], (x1, y2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+        frames.append(img)
+    return frames
+
+
+def bench_encoder(backend, registry, repeat, cache_dir, threads, reference):
+    model = load_sentence_transformer('all-MiniLM-L6-v2', backend, cache_dir, threads)
+    scene = make_scene(400)
+    labels = sorted({t['text'] for t in scene['text']} |
+                    {f"{el['class']} inside container_{lay['class']}"
+                     for lay in scene['layouts'] for el in scene['elements'][:20]})
+    texts = INTENTS + labels
+    embeds = timed(registry, f"encoder[{backend}]",
+                   lambda: model.encode(texts, convert_to_numpy=True, batch_size=64), repeat)
+    intents, label_embeds = embeds[:len(INTENTS)], embeds[len(INTENTS):]
+    best = (intents @ label_embeds.T).argmax(axis=1)
+    if reference is None:
+        return {'embeds': embeds, 'best': best}, {}
+    cos = cosine_rows(embeds, reference['embeds'])
+    return None, {'cosine_mean': float(cos.mean()), 'cosine_min': float(cos.min()),
+                  'top1_agreement': float((best == reference['best']).mean())}
+
+
+def bench_clip(backend, registry, repeat, cache_dir, threads, reference, frames):
+    import torch  # type: ignore
+    from transformers import CLIPProcessor  # type: ignore
+    from perception.detector import ICON_LABELS  # type: ignore
+    processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+    model = load_clip("openai/clip-vit-base-patch32", backend, 'cpu', cache_dir, threads)
+    rng = np.random.default_rng(0)
+    crops = []
+    for img in frames:
+        for _ in range(8):
+            x, y = int(rng.integers(0, img.shape[1] - 64)), int(rng.integers(0, img.shape[0] - 64))
+            crops.append(img[y:y + 64, x:x + 64])
+    image_inputs = processor(images=crops, return_tensors="pt")
+    text_inputs = processor(text=ICON_LABELS, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        text = model.get_text_features(**text_inputs).numpy()
+
+        def run():
+            return model.get_image_features(**image_inputs).numpy()
+
+        embeds = timed(registry, f"clip[{backend}]", run, repeat)
+    text = text / np.linalg.norm(text, axis=1, keepdims=True)
+    best = (embeds @ text.T).argmax(axis=1)
+    if reference is None:
+        return {'embeds': embeds, 'best': best}, {}
+    cos = cosine_rows(embeds, reference['embeds'])
+    return None, {'cosine_mean': float(cos.mean()), 'cosine_min': float(cos.min()),
+                  'top1_agreement': float((best == reference['best']).mean())}
+
+
+def bench_yolo(backend, registry, repeat, cache_dir, threads, reference, frames, weights):
+    model = load_yolo(weights, backend, cache_dir)
+    results = timed(registry, f"yolo[{backend}]", lambda: model(frames, verbose=False), repeat)
+    boxes = [r.boxes.xyxy.cpu().numpy() for r in results]
+    if reference is None:
+        return {'boxes': boxes}, {}
+    ious, counts = [], []
+    for ours, ref in zip(boxes, reference['boxes']):
+        counts.append(len(ours) - len(ref))
+        if len(ours) and len(ref):
+            iou = iou_matrix(ref, ours)
+            ious.extend(iou[r, c] for r, c in greedy_match(iou, 1e-6))
+    return None, {'mean_iou': float(np.mean(ious)) if ious else None,
+                  'count_delta': int(np.sum(counts))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--models', nargs='+', choices=['encoder', 'clip', 'yolo'], default=['encoder', 'clip', 'yolo'])
+    parser.add_argument('--threads', type=int, help="Intra-op CPU threads")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--images', metavar='DIR', help="Screenshots to use instead of synthetic frames")
+    parser.add_argument('--yolo-weights', default='yolov8n.pt')
+    parser.add_argument('--cache-dir', help="Where exported ONNX graphs are kept")
+    parser.add_argument('--output', metavar='PATH', help="Write the JSON report to PATH")
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    frames = load_frames(args.images)
+    registry = MetricsRegistry()
+    report = {}
+    backends = ['torch'] + [b for b in args.backends if b != 'torch']
+    for model_name in args.models:
+        reference = None
+        for backend in backends:
+            try:
+                if model_name == 'encoder':
+                    ref, accuracy = bench_encoder(backend, registry, args.repeat, args.cache_dir, args.threads, reference)
+                elif model_name == 'clip':
+                    ref, accuracy = bench_clip(backend, registry, args.repeat, args.cache_dir, args.threads,
+                                               reference, frames)
+                else:
+                    ref, accuracy = bench_yolo(backend, registry, args.repeat, args.cache_dir, args.threads,
+                                               reference, frames, args.yolo_weights)
+            except ImportError as e:
+                report[f"{model_name}[{backend}]"] = {'skipped': str(e)}
+                continue
+            if ref is not None:
+                reference = ref
+            stats = registry.summary(f"{model_name}[{backend}]")
+            report[f"{model_name}[{backend}]"] = {**stats, **accuracy}
+
+    print(f"{'model[backend]':<18} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}  accuracy vs torch")
+    for key, row in report.items():
+        if 'skipped' in row:
+            print(f"{key:<18} skipped ({row['skipped']})")
+            continue
+        base = report.get(key.split('[')[0] + '[torch]', {})
+        speedup = base.get('p50', 0) / row['p50'] if row.get('p50') else 0.0
+        accuracy = {k: v for k, v in row.items() if k not in ('count', 'mean', 'p50', 'p95', 'p99', 'max')}
+        print(f"{key:<18} {row['p50']:>9.1f} {row['p95']:>9.1f} {speedup:>7.2f}x  "
+              + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in accuracy.items()))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
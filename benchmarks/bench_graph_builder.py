@@ -0,0 +1,80 @@
+"""
+Scaling benchmark for UIGraphBuilder near-edge construction.
+
+    python benchmarks/bench_graph_builder.py --sizes 50 500 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from reasoning.graph_builder import UIGraphBuilder  # type: ignore
+from synthetic import make_scene  # type: ignore
+
+
+def legacy_spatial_relationships(builder, threshold_px=80):
+    """
+    The original all-pairs scan, kept here as the correctness and speed reference.
+    """
+    graph = builder.graph
+    nodes = list(graph.nodes(data=True))
+    for i, (id1, attr1) in enumerate(nodes):
+        for j, (id2, attr2) in enumerate(nodes):
+            if i == j: continue
+            if graph.has_edge(id1, id2) or graph.has_edge(id2, id1):
+                continue
+            if builder._is_near(attr1['box'], attr2['box'], threshold_px):
+                graph.add_edge(id1, id2, relation='near')
+
+
+def near_edges(graph):
+    return [(u, v) for u, v, d in graph.edges(data=True) if d.get('relation') == 'near']
+
+
+def time_call(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes, legacy_max, repeat):
+    print(f"{'nodes':>7} {'edges':>8} {'build ms':>10} {'legacy ms':>10} {'speedup':>8}  match")
+    for n in sizes:
+        scene = make_scene(n, seed=n)
+        builder = UIGraphBuilder()
+
+        def grid_pass():
+            builder.build_graph(scene)
+
+        grid_ms = time_call(grid_pass, repeat)
+        grid_edges = near_edges(builder.graph)
+
+        legacy_ms, match = 0.0, '-'
+        if n <= legacy_max:
+            def legacy_pass():
+                builder.build_graph(scene)
+                builder.graph.remove_edges_from(near_edges(builder.graph))
+                legacy_spatial_relationships(builder)
+
+            legacy_ms = time_call(legacy_pass, repeat)
+            match = 'yes' if near_edges(builder.graph) == grid_edges else 'NO'
+
+        if n <= legacy_max:
+            print(f"{n:>7} {len(grid_edges):>8} {grid_ms:>10.1f} {legacy_ms:>10.1f} {legacy_ms / grid_ms:>7.1f}x  {match}")
+        else:
+            print(f"{n:>7} {len(grid_edges):>8} {grid_ms:>10.1f} {'-':>10} {'-':>8}  {match}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 500, 1000, 2000, 5000])
+    parser.add_argument('--legacy-max', type=int, default=2000,
+                        help="Skip the O(n^2) reference above this many nodes")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_max, args.repeat)
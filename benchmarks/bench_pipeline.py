@@ -0,0 +1,237 @@
+"""
+Offline, headless benchmark of the VIGA pipeline stages on CPU.
+
+Synthetic scenes stress the graph builder and grounding engine at scale:
+
+    python benchmarks/bench_pipeline.py synthetic --sizes 100 1000 5000
+
+Recorded screenshots are replayed through detection, OCR, tracking, graph
+building and grounding. A `<name>.json` next to `<name>.png` holds cached
+perception ('layouts', 'elements' and optionally 'text'); cached groups skip
+the matching model stage:
+
+    python benchmarks/bench_pipeline.py replay recordings/
+
+Each stage reports latency percentiles, throughput and peak Python heap
+(tracemalloc; native model buffers are not included). The first call of each
+stage is a warm-up (lazy model loads, cold caches): it is traced for memory and
+left out of the latency figures, since tracing slows Python code severalfold.
+--save-baseline stores the report, --baseline compares against one and exits 1
+on a regression.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Headless CPU: hide GPUs before torch is imported anywhere
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from utils.metrics import MetricsRegistry  # type: ignore
+from synthetic import make_scene  # type: ignore
+
+INTENTS = ["click save", "open settings", "search files", "press the cancel button", "type in the input"]
+IMAGE_EXTENSIONS = ('*.png', '*.jpg', '*.jpeg', '*.bmp')
+
+
+class StageRecorder:
+    def __init__(self):
+        """
+        Latency samples per stage (in a MetricsRegistry), plus items processed
+        and wall time of the timed calls, and the peak traced heap of the warm-up call.
+        """
+        self.registry = MetricsRegistry(window=100000)
+        self.items = {}
+        self.wall = {}
+        self.peak = {}
+        self.skipped = {}
+
+    def run(self, stage, fn, items=1):
+        if stage not in self.peak:
+            tracemalloc.start()
+            try:
+                result = fn()
+                self.peak[stage] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.items.setdefault(stage, 0)
+            self.wall.setdefault(stage, 0.0)
+            return result
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.registry.observe(stage, elapsed * 1000)
+        self.items[stage] += items
+        self.wall[stage] += elapsed
+        return result
+
+    def skip(self, stage, reason):
+        self.skipped.setdefault(stage, reason)
+
+    def report(self):
+        stages = {}
+        for stage in self.items:
+            stats = self.registry.summary(stage)
+            stats['throughput_per_s'] = self.items[stage] / self.wall[stage] if self.wall[stage] else 0.0
+            stats['peak_kb'] = self.peak[stage] / 1024
+            stages[stage] = stats
+        return {'stages': stages, 'skipped': self.skipped}
+
+
+def bench_synthetic(recorder, sizes, repeat, intents, grounding=True, cold_cache=False):
+    from reasoning.graph_builder import UIGraphBuilder  # type: ignore
+    grounder = _grounder(recorder) if grounding else None
+
+    for n in sizes:
+        scene = make_scene(n, seed=n)
+        builder = UIGraphBuilder()
+        for _ in range(repeat + 1):
+            graph = recorder.run(f"graph_build[{n}]", lambda: builder.build_graph(scene), items=n)
+        if grounder is None:
+            continue
+        for _ in range(repeat + 1):
+            # Warm caches serve every label after the first pass unless cleared
+            if cold_cache:
+                grounder.label_cache.clear()
+                grounder.intent_cache.clear()
+            recorder.run(f"grounding[{n}]", lambda: grounder.ground_many(intents, graph), items=len(intents))
+
+
+def bench_replay(recorder, directory, intents, grounding=True):
+    import cv2  # type: ignore
+    from reasoning.graph_builder import UIGraphBuilder  # type: ignore
+    from utils.temporal import TemporalManager  # type: ignore
+
+    paths = sorted(p for ext in IMAGE_EXTENSIONS for p in glob.glob(os.path.join(directory, ext)))
+    if not paths:
+        raise SystemExit(f"No screenshots found in {directory}")
+
+    detector = recognizer = None
+    temporal = TemporalManager()
+    builder = UIGraphBuilder()
+    grounder = _grounder(recorder) if grounding else None
+
+    for path in paths:
+        img = recorder.run('load', lambda: cv2.imread(path))
+        cached = {}
+        cache_path = os.path.splitext(path)[0] + '.json'
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+
+        if 'layouts' in cached and 'elements' in cached:
+            detections = {'layouts': cached['layouts'], 'elements': cached['elements']}
+        else:
+            if detector is None:
+                from perception.detector import UIDetector  # type: ignore
+                detector = UIDetector()
+            detections = recorder.run('detect', lambda: detector.detect(img))
+
+        if 'text' in cached:
+            text = cached['text']
+        else:
+            if recognizer is None:
+                from perception.ocr import TextRecognizer  # type: ignore
+                recognizer = TextRecognizer()
+            text = recorder.run('ocr', lambda: recognizer.recognize(img))
+
+        data = {'image': img, **detections, 'text': text}
+        data = recorder.run('temporal', lambda: temporal.update(data))
+        n = len(data['layouts']) + len(data['elements']) + len(data['text'])
+        graph = recorder.run('graph_build', lambda: builder.build_graph(data), items=n)
+        if grounder is not None:
+            recorder.run('grounding', lambda: grounder.ground_many(intents, graph), items=len(intents))
+
+
+def _grounder(recorder):
+    try:
+        import sentence_transformers  # type: ignore  # noqa: F401
+    except ImportError as e:
+        recorder.skip('grounding', f"sentence_transformers unavailable: {e}")
+        return None
+    from reasoning.grounding import ActionGroundingEngine  # type: ignore
+    return ActionGroundingEngine()
+
+
+def compare(report, baseline, tolerance):
+    """
+    Returns regression messages: p50 latency or peak memory above the baseline
+    by more than `tolerance` (fractional), or throughput below it.
+    """
+    regressions = []
+    for stage, base in baseline.get('stages', {}).items():
+        current = report['stages'].get(stage)
+        if current is None or 'p50' not in base or 'p50' not in current:
+            continue
+        if current['p50'] > base['p50'] * (1 + tolerance):
+            regressions.append(f"{stage}: p50 {current['p50']:.2f}ms vs baseline {base['p50']:.2f}ms")
+        if base['peak_kb'] and current['peak_kb'] > base['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{stage}: peak {current['peak_kb']:.0f}KB vs baseline {base['peak_kb']:.0f}KB")
+        if current['throughput_per_s'] < base['throughput_per_s'] / (1 + tolerance):
+            regressions.append(f"{stage}: {current['throughput_per_s']:.1f}/s vs baseline {base['throughput_per_s']:.1f}/s")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'stage':<24} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>10} {'peak KB':>9}")
+    for stage, s in report['stages'].items():
+        if 'p50' not in s:
+            print(f"{stage:<24} {0:>5} {'-':>9} {'-':>9} {'-':>9} {'-':>10} {s['peak_kb']:>9.0f}")
+            continue
+        print(f"{stage:<24} {s['count']:>5} {s['p50']:>9.2f} {s['p95']:>9.2f} {s['p99']:>9.2f} "
+              f"{s['throughput_per_s']:>10.1f} {s['peak_kb']:>9.0f}")
+    for stage, reason in report['skipped'].items():
+        print(f"{stage:<24} skipped ({reason})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='mode', required=True)
+    synthetic = sub.add_parser('synthetic', help="Generated scenes of N nodes")
+    synthetic.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 5000])
+    synthetic.add_argument('--repeat', type=int, default=5, help="Timed runs per stage, after one warm-up")
+    synthetic.add_argument('--cold-cache', action='store_true',
+                           help="Clear the grounding embedding caches before every run")
+    replay = sub.add_parser('replay', help="Saved screenshots, with optional cached perception JSON")
+    replay.add_argument('directory')
+    for p in (synthetic, replay):
+        p.add_argument('--no-grounding', action='store_true', help="Skip the sentence-transformer stage")
+        p.add_argument('--intents', nargs='+', default=INTENTS)
+        p.add_argument('--output', metavar='PATH', help="Write the JSON report to PATH")
+        p.add_argument('--save-baseline', metavar='PATH', help="Store this run as the baseline")
+        p.add_argument('--baseline', metavar='PATH', help="Compare against a stored baseline")
+        p.add_argument('--tolerance', type=float, default=0.2,
+                       help="Allowed fractional slowdown before a stage is flagged (default 0.2)")
+    args = parser.parse_args()
+
+    recorder = StageRecorder()
+    if args.mode == 'synthetic':
+        bench_synthetic(recorder, args.sizes, args.repeat, args.intents, not args.no_grounding, args.cold_cache)
+    else:
+        bench_replay(recorder, args.directory, args.intents, not args.no_grounding)
+
+    report = recorder.report()
+    report['mode'] = args.mode
+    print_report(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
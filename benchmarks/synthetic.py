@@ -0,0 +1,49 @@
+from typing import Any, Dict, List
+import numpy as np
+
+
+def make_scene(n_nodes: int, width: int = 1920, height: int = 1080, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generates a perception dict shaped like PerceptionEngine.perceive() output
+    (without the image) with roughly 5% layouts, 45% elements and 50% text.
+    """
+    rng = np.random.default_rng(seed)
+    n_layouts = max(1, n_nodes // 20)
+    n_elements = (n_nodes - n_layouts) // 2
+    n_text = n_nodes - n_layouts - n_elements
+
+    layouts = []
+    for _ in range(n_layouts):
+        w, h = rng.uniform(200, 800), rng.uniform(100, 500)
+        x1, y1 = rng.uniform(0, width - w), rng.uniform(0, height - h)
+        layouts.append({
+            'group': 'layout',
+            'box': [float(x1), float(y1), float(x1 + w), float(y1 + h)],
+            'confidence': float(rng.uniform(0.5, 1.0)),
+            'class': str(rng.choice(['form', 'toolbar', 'sidebar', 'panel']))
+        })
+
+    elements = []
+    for _ in range(n_elements):
+        w, h = rng.uniform(16, 120), rng.uniform(16, 40)
+        x1, y1 = rng.uniform(0, width - w), rng.uniform(0, height - h)
+        elements.append({
+            'group': 'element',
+            'box': [float(x1), float(y1), float(x1 + w), float(y1 + h)],
+            'confidence': float(rng.uniform(0.3, 1.0)),
+            'class': str(rng.choice(['button', 'input', 'icon', 'checkbox']))
+        })
+
+    words = ['Save', 'Open', 'Search', 'File', 'Edit', 'Settings', 'Cancel', 'Submit', 'Help', 'Close']
+    text = []
+    for _ in range(n_text):
+        w, h = rng.uniform(20, 160), rng.uniform(10, 24)
+        x1, y1 = int(rng.uniform(0, width - w)), int(rng.uniform(0, height - h))
+        x2, y2 = int(x1 + w), int(y1 + h)
+        text.append({
+            'box': [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+            'text': str(rng.choice(words)),
+            'confidence': float(rng.uniform(0.5, 1.0))
+        })
+
+    return {'layouts': layouts, 'elements': elements, 'text': text}
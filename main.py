@@ -1,4 +1,6 @@
-from typing import List, Dict, Any, Optional, cast
+from typing import List, Dict, Any, Iterator, Optional, cast
+import argparse
+import json
 import sys
 import os
 import time
@@ -9,62 +11,151 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 from perception.perception_bridge import PerceptionEngine  # type: ignore
-from reasoning.graph_builder import UIGraphBuilder  # type: ignore
+from reasoning.graph_builder import UIGraphBuilder, parent_map  # type: ignore
 from reasoning.grounding import ActionGroundingEngine  # type: ignore
 from execution.executor import ExecutionEngine  # type: ignore
 from utils.temporal import TemporalManager  # type: ignore
+from utils.pipeline import StreamingPipeline  # type: ignore
+from utils.intent_batcher import IntentBatcher  # type: ignore
+from perception.screen_capture import ScreenCapturer, fingerprint  # type: ignore
+from perception.replay import ReplayPerception, SessionRecorder  # type: ignore
+from perception.tiling import TiledPerceptionEngine  # type: ignore
+from utils.lazy import warm_up, load_report  # type: ignore
+from utils.metrics import metrics  # type: ignore
+from utils.scene_cache import SceneCache  # type: ignore
+from utils.backends import BACKENDS, configure_threads  # type: ignore
+from service.ipc import resolve_address  # type: ignore
+from service.daemon import VIGADaemon  # type: ignore
 
 class VIGAAgent:
-    def __init__(self):
+    def __init__(self, warmup: bool = False, active: bool = False, perception=None,
+                 backend: str = 'torch', threads: Optional[int] = None, scene_cache_ttl: float = 5.0):
+        """
+        Models are loaded on first use. warmup=True preloads them all in parallel
+        on background threads. active=True performs the grounded action instead
+        of only printing it.
+        perception: alternative perception backend, e.g. a ReplayPerception
+        serving a recorded session instead of the live screen.
+        backend: inference backend for every model ('torch', 'int8', 'onnx');
+        threads: intra-op CPU threads (torch and ONNX Runtime), applied when the
+        first model loads.
+        scene_cache_ttl: seconds an unchanged screen (same frame fingerprint)
+        reuses its perception, graph and grounding results; 0 disables it.
+        """
         print("Initializing VIGA (Advanced Architecture)...")
-        self.perception = PerceptionEngine()
+        configure_threads(threads)
+        self.perception = perception if perception is not None else PerceptionEngine(backend=backend, threads=threads)
         self.graph_builder = UIGraphBuilder()
-        self.grounder = ActionGroundingEngine()
+        self.grounder = ActionGroundingEngine(backend=backend, threads=threads)
         self.executor = ExecutionEngine()
         self.temporal = TemporalManager()
+        self.active = active
+        self._batcher: Optional[IntentBatcher] = None
+        self.scene_cache = SceneCache(ttl=scene_cache_ttl) if scene_cache_ttl > 0 else None
+        if warmup:
+            warm_up(self.models())
 
-    def run_command(self, user_intent: str) -> bool:
+    def models(self):
+        return self.perception.models() + self.grounder.models()
+
+    def model_load_report(self) -> Dict[str, Optional[float]]:
+        """
+        Load time (ms) per model; None for models not loaded yet.
+        """
+        return load_report(self.models())
+
+    def _scene_graph(self, perception_data: Optional[Dict[str, Any]] = None):
+        """
+        Perception, tracking and graph construction for the screen (or
+        for perception_data). With the scene cache, the captured frame is
+        fingerprinted first and an unchanged screen reuses its graph, or at
+        least its perception output.
+        Returns (scene_key, graph); scene_key is None when the cache was not used.
+        """
+        print("[1/4] Perceiving UI (Hierarchical + CLIP)...")
+        scene_key, raw_data = None, perception_data
+        if raw_data is None:
+            frame = self.perception.capture()
+            if self.scene_cache is not None:
+                with metrics.span('agent.fingerprint'):
+                    scene_key = fingerprint(frame)
+                graph = self.scene_cache.get(scene_key, 'graph')
+                if graph is not None:
+                    return scene_key, graph
+                raw_data = self.scene_cache.get(scene_key, 'perception')
+            if raw_data is None:
+                raw_data = self.perception.perceive(frame)
+                if scene_key is not None:
+                    # Pixels are not needed past perception; keep cached entries small
+                    self.scene_cache.put(scene_key, 'perception', {**raw_data, 'image': None})
+
+        # 2. Temporal Tracking (boxes stay as detected)
+        print("      Applying temporal stability...")
+        with metrics.span('agent.temporal'):
+            data = self.temporal.update(raw_data)
+
+        # 3. Reasoning - Hierarchical Graph Construction
+        print("[2/4] Constructing Hierarchical UI Graph...")
+        with metrics.span('agent.graph'):
+            graph = self.graph_builder.build_graph(data)
+        if scene_key is not None:
+            self.scene_cache.put(scene_key, 'graph', graph)
+        return scene_key, graph
+
+    def run_command(self, user_intent: str, perception_data: Optional[Dict[str, Any]] = None,
+                    text: Optional[str] = None) -> bool:
+        """
+        perception_data: optional cached perception dict to use instead of the screen.
+        text: what to type when the grounded action is 'type'.
+        In active mode the call returns once the UI has settled after the action.
+        """
         try:
             print(f"\n[Goal] {user_intent}")
             
-            # 1. Perception
-            start_time = float(time.time())
-            print("[1/4] Perceiving UI (Hierarchical + CLIP)...")
-            raw_data = self.perception.perceive()
-            
-            # 2. Temporal Smoothing
-            print("      Applying temporal stability...")
-            data = self.temporal.update(raw_data)
-            
-            # 3. Reasoning - Hierarchical Graph Construction
-            print("[2/4] Constructing Hierarchical UI Graph...")
-            graph = self.graph_builder.build_graph(data)
+            # 1. Perception (skipped down to the grounding result for an unchanged screen)
+            start_time = time.perf_counter()
+            scene_key, graph = self._scene_graph(perception_data)
             
             # 4. Reasoning - Multimodal Grounding
-            print("[3/4] Grounding intent to structured scene...")
-            node_id, confidence, action_type = self.grounder.ground(user_intent, graph)
+            cached = self.scene_cache.get_result(scene_key, user_intent) if scene_key is not None else None
+            if cached is not None:
+                print("      Unchanged screen: reusing the grounding result")
+                node_id, confidence, action_type = cached
+            else:
+                print("[3/4] Grounding intent to structured scene...")
+                with metrics.span('agent.grounding'):
+                    node_id, confidence, action_type = self.grounder.ground(user_intent, graph)
+                if scene_key is not None:
+                    self.scene_cache.put_result(scene_key, user_intent, (node_id, confidence, action_type))
             
-            duration = (float(time.time()) - start_time) * 1000
+            duration = (time.perf_counter() - start_time) * 1000
+            metrics.observe('agent.pipeline', duration)
             print(f"      Pipeline Latency: {duration:.2f}ms")
 
             if node_id and confidence > 0.35:
                 attr = graph.nodes[node_id]
-                coords = self.executor.get_center(attr['box'])
+                screen_box = self.perception.to_screen(attr['box'])
+                coords = self.executor.get_center(screen_box)
                 
                 # Find context for logging
-                parents = [p for p, c, d in graph.in_edges(node_id, data=True) if d.get('relation') == 'parent_of']
+                parent = parent_map(graph).get(node_id)
                 context = ""
-                if parents:
-                    p_node = graph.nodes[parents[0]]
+                if parent is not None:
+                    p_node = graph.nodes[parent]
                     context = f" in {p_node.get('semantic_label', 'container')}"
                 
                 print(f"      Matched: '{attr.get('semantic_label', 'element')}'{context} (Conf: {confidence:.2f})")
                 
                 # 5. Execution
                 print(f"[4/4] Grounded Action: {action_type} at {coords}...")
-                # Simulation mode
-                # self.executor.execute({'action': action_type, 'coordinates': coords})
-                print("      Action simulation successful.")
+                if self.active:
+                    self.executor.execute({'action': action_type, 'coordinates': coords, 'box': screen_box,
+                                           'text': text or ""}, settle=True)
+                    # The UI reacts to the action, possibly after our next capture
+                    self.invalidate_scene_cache()
+                else:
+                    # Simulation mode
+                    print("      Action simulation successful.")
                 return True
             else:
                 print("      FAILED: Could not find a reliable semantic match in the UI scene.")
@@ -73,17 +164,284 @@ class VIGAAgent:
             print(f"      CRITICAL ERROR in agent loop: {e}")
             return False
 
+    def run_plan(self, steps: List[Dict[str, Any]]) -> bool:
+        """
+        Multi-step task, e.g. click a field -> type -> submit:
+            [{'intent': 'click the search box'},
+             {'action': 'type', 'text': 'weather'},
+             {'action': 'press', 'key': 'enter'}]
+        Steps with an 'intent' are grounded on the current screen (see
+        run_command, 'text' is passed along); the others are keyboard actions
+        for the focused element, run by ExecutionEngine.execute_plan. In active
+        mode each step starts as soon as the UI has settled after the previous
+        one, so grounding sees its effect.
+        """
+        start_time = time.perf_counter()
+        i = 0
+        while i < len(steps):
+            if 'intent' in steps[i]:
+                ok = self.run_command(steps[i]['intent'], text=steps[i].get('text'))
+                failed = steps[i]
+                i += 1
+            else:
+                end = i
+                while end < len(steps) and 'intent' not in steps[end]:
+                    end += 1
+                keys, i = steps[i:end], end
+                if self.active:
+                    records = self.executor.execute_plan(keys)
+                    self.invalidate_scene_cache()
+                    ok = all(r['ok'] for r in records)
+                    failed = keys[len(records) - 1]
+                else:
+                    print(f"      Simulated {', '.join(str(s.get('action')) for s in keys)} step(s).")
+                    ok = True
+            if not ok:
+                print(f"      Plan stopped at step {failed}")
+                return False
+        duration = (time.perf_counter() - start_time) * 1000
+        metrics.observe('agent.plan', duration)
+        print(f"      Plan Latency: {duration:.2f}ms ({len(steps)} steps)")
+        return True
+
+    def invalidate_scene_cache(self):
+        if self.scene_cache is not None:
+            self.scene_cache.invalidate()
+
+    def ground_intents(self, user_intents: List[str]) -> List[Dict[str, Any]]:
+        """
+        Perceives the screen once and grounds every intent against the same graph.
+        On an unchanged screen only intents without a cached result are grounded.
+        """
+        scene_key, graph = self._scene_graph()
+        grounded: Dict[str, Any] = {}
+        if scene_key is not None:
+            for intent in user_intents:
+                cached = self.scene_cache.get_result(scene_key, intent)
+                if cached is not None:
+                    grounded[intent] = cached
+        missing = list(dict.fromkeys(i for i in user_intents if i not in grounded))
+        if missing:
+            for intent, result in zip(missing, self.grounder.ground_many(missing, graph)):
+                grounded[intent] = result
+                if scene_key is not None:
+                    self.scene_cache.put_result(scene_key, intent, result)
+        results = []
+        for intent in user_intents:
+            node_id, confidence, action_type = grounded[intent]
+            result: Dict[str, Any] = {
+                'intent': intent,
+                'node_id': node_id,
+                'confidence': confidence,
+                'action': action_type,
+                'label': None,
+                'coordinates': None
+            }
+            if node_id is not None:
+                attr = graph.nodes[node_id]
+                result['label'] = attr.get('semantic_label', 'element')
+                result['coordinates'] = self.executor.get_center(self.perception.to_screen(attr['box']))
+            results.append(result)
+        return results
+
+    async def ground_async(self, user_intent: str, frame_window: float = 0.05) -> Dict[str, Any]:
+        """
+        asyncio entry point. Intents awaited within the same frame window share one
+        perception + graph pass and one batched grounding call; the blocking work
+        runs on a worker thread. frame_window applies from the next window opened.
+        """
+        if self._batcher is None:
+            self._batcher = IntentBatcher(self.ground_intents, window=frame_window)
+        self._batcher.window = frame_window
+        return await self._batcher.submit(user_intent)
+
+    def stream(self, user_intent: str, capture_interval: float = 0.0) -> Iterator[Dict[str, Any]]:
+        """
+        Continuous monitoring mode. Capture, perception and reasoning run as a
+        pipeline: capture grabs a frame on its own thread whenever perception is
+        ready for one (at most every capture_interval seconds), and graph
+        building + grounding for the previous frame run in the consuming thread
+        meanwhile.
+
+        Yields one grounded scene state per perceived frame; 'coordinates' are
+        the screen position of the target, mapped with the transform of the
+        capture that produced that frame. The 'graph' entry is rebuilt in place
+        for the next frame, so copy it if it must outlive the step.
+        """
+        capturer: List[ScreenCapturer] = []
+        # update_graph patches in place: never the graph a run_command left in the scene cache
+        self.graph_builder.reset()
+
+        def capture():
+            # mss handles are thread-bound: create ours on the capture thread
+            if not capturer:
+                capturer.append(self.perception.make_capturer())
+            img = capturer[0].capture()
+            return img, capturer[0].last_transform
+
+        def perceive(frame):
+            img, transform = frame
+            return self.perception.process_frame(img), transform
+
+        def reason(frame_id, timestamp, perceived):
+            raw_data, transform = perceived
+            data = self.temporal.update(raw_data)
+            # Track ids are stable across frames, so the graph is patched rather than rebuilt
+            changes = self.graph_builder.update_graph(data)
+            graph = self.graph_builder.graph
+            node_id, confidence, action_type = self.grounder.ground(user_intent, graph)
+            coordinates = None
+            if node_id is not None:
+                coordinates = self.executor.get_center(capturer[0].to_screen(graph.nodes[node_id]['box'], transform))
+            return {
+                'frame_id': frame_id,
+                'timestamp': timestamp,
+                'graph': graph,
+                'node_id': node_id,
+                'confidence': confidence,
+                'action': action_type,
+                'coordinates': coordinates,
+                'transform': transform,
+                'changes': changes,
+                'latency_ms': (time.time() - timestamp) * 1000
+            }
+
+        pipeline = StreamingPipeline(capture, perceive, reason,
+                                     capture_interval=capture_interval)
+        yield from pipeline
+
+def load_perception(path: str) -> Dict[str, Any]:
+    """
+    Reads cached perception data: a JSON object with 'layouts', 'elements' and 'text'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for key in ('layouts', 'elements', 'text'):
+        data.setdefault(key, [])
+    return data
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="VIGA: Vision-Grounded Interaction Agent")
+    parser.add_argument('intent', nargs='*', help="Natural language command")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--simulation', dest='active', action='store_false',
+                      help="Print the grounded action without performing it (default)")
+    mode.add_argument('--active', dest='active', action='store_true',
+                      help="Perform real mouse and keyboard actions")
+    parser.add_argument('--type', dest='text', metavar='TEXT',
+                        help="Text to type into the grounded element (a click -> type plan)")
+    parser.add_argument('--submit', action='store_true',
+                        help="Press Enter once the UI has settled after the last step")
+    parser.add_argument('--warmup', action='store_true',
+                        help="Preload all models in parallel on background threads")
+    parser.add_argument('--perception-file', metavar='PATH',
+                        help="Use cached perception JSON instead of capturing the screen")
+    parser.add_argument('--graph-only', action='store_true',
+                        help="Build and summarise the UI graph without grounding (no models needed)")
+    parser.add_argument('--serve', action='store_true',
+                        help="Run as a daemon keeping models resident (see viga_client.py)")
+    parser.add_argument('--socket', metavar='PATH', help="Unix socket path for --serve")
+    parser.add_argument('--port', type=int, help="Serve on this localhost TCP port instead of a Unix socket")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                        help="Inference backend: eager torch, dynamic int8 quantization or ONNX Runtime")
+    parser.add_argument('--threads', type=int, help="Intra-op CPU threads for model inference")
+    parser.add_argument('--scene-cache-ttl', type=float, default=5.0, metavar='SECONDS',
+                        help="Reuse results for an unchanged screen for this long (0 disables)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--record', metavar='DIR',
+                        help="Record captured frames and detections to a session directory")
+    source.add_argument('--replay', metavar='DIR',
+                        help="Perceive from a recorded session instead of the screen (no vision models)")
+    source.add_argument('--tiled', action='store_true',
+                        help="Perceive every monitor in overlapping tiles on a process pool")
+    parser.add_argument('--workers', type=int, help="Worker processes for --tiled, ~1 GB RAM each (default: min(4, CPU count))")
+    parser.add_argument('--tile-size', type=int, default=1280, help="Tile size in px for --tiled")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Append a JSON-lines metrics snapshot (stage timings, counters) to PATH")
+    parser.add_argument('--prometheus', action='store_true',
+                        help="Print stage metrics in Prometheus text format when done")
+    args = parser.parse_args(argv)
+    if args.perception_file and (args.text is not None or args.submit):
+        # Plans act on the live screen and re-perceive it after every step
+        parser.error("--type/--submit cannot be combined with --perception-file")
+    return args
+
+def make_perception(args: argparse.Namespace):
+    if args.replay:
+        return ReplayPerception(args.replay)
+    if args.record:
+        return PerceptionEngine(recorder=SessionRecorder(args.record), backend=args.backend, threads=args.threads)
+    if args.tiled:
+        return TiledPerceptionEngine(workers=args.workers, tile_size=args.tile_size, backend=args.backend,
+                                     threads=args.threads)
+    return None
+
+def make_plan(intent: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    steps: List[Dict[str, Any]] = [{'intent': intent}]
+    if args.text is not None:
+        steps.append({'action': 'type', 'text': args.text})
+    if args.submit:
+        steps.append({'action': 'press', 'key': 'enter'})
+    return steps
+
+def scene_cache_ttl(args: argparse.Namespace) -> float:
+    # A replay is a regression run: every recorded frame must go through the pipeline
+    return 0.0 if args.replay else args.scene_cache_ttl
+
+def export_metrics(args: argparse.Namespace) -> None:
+    if args.metrics:
+        with open(args.metrics, 'a', encoding='utf-8') as f:
+            f.write(metrics.to_json_line() + "\n")
+    if args.prometheus:
+        print(metrics.prometheus_text(), end="")
+
 def main() -> None:
-    agent = VIGAAgent()
-    
     # Cast to list to satisfy certain linters for slicing
-    args = cast(List[str], sys.argv)
-    if len(args) > 1:
-        intent = " ".join(args[1:])  # type: ignore
+    args = parse_args(cast(List[str], sys.argv)[1:])
+    if args.intent:
+        intent = " ".join(args.intent)
     else:
         intent = "click the Windows Start button" # Default example
-        
-    agent.run_command(intent)
+
+    perception_data = load_perception(args.perception_file) if args.perception_file else None
+    if args.graph_only:
+        if perception_data is None:
+            print("--graph-only requires --perception-file")
+            sys.exit(2)
+        start_time = time.perf_counter()
+        graph = UIGraphBuilder().build_graph(perception_data)
+        duration = (time.perf_counter() - start_time) * 1000
+        print(f"UI Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges ({duration:.2f}ms)")
+        export_metrics(args)
+        return
+
+    if args.serve:
+        # Models stay resident for the daemon's lifetime, so load them up front
+        agent = VIGAAgent(warmup=True, active=args.active, perception=make_perception(args),
+                          backend=args.backend, threads=args.threads, scene_cache_ttl=scene_cache_ttl(args))
+        try:
+            VIGADaemon(agent, resolve_address(args.socket, args.port)).serve_forever()
+        finally:
+            agent.perception.close()
+        return
+
+    agent = VIGAAgent(warmup=args.warmup, active=args.active, perception=make_perception(args),
+                      backend=args.backend, threads=args.threads, scene_cache_ttl=scene_cache_ttl(args))
+    try:
+        if args.replay:
+            # Regression run: ground the intent against every recorded frame
+            for _ in range(len(agent.perception)):
+                agent.run_command(intent)
+        elif args.text is not None or args.submit:
+            agent.run_plan(make_plan(intent, args))
+        else:
+            agent.run_command(intent, perception_data)
+    finally:
+        agent.perception.close()
+    for name, ms in agent.model_load_report().items():
+        if ms is not None:
+            print(f"      Model load: {name} {ms:.0f}ms")
+    export_metrics(args)
 
 if __name__ == "__main__":
     main()
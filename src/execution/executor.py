@@ -1,37 +1,107 @@
-import pyautogui
+from typing import Any, Dict, List, Optional
 import time
+from execution.settle import wait_for_settle
+from perception.screen_capture import ScreenCapturer
+
+def _gui():
+    # Imported on first action: pyautogui is slow to import and needs a display
+    import pyautogui  # type: ignore
+    # Fail-safe: moving mouse to corner aborts
+    pyautogui.FAILSAFE = True
+    return pyautogui
 
 class ExecutionEngine:
-    def __init__(self):
-        # Fail-safe: moving mouse to corner aborts
-        pyautogui.FAILSAFE = True
+    def __init__(self, capturer=None, settle_timeout=2.0, **settle_options):
+        """
+        capturer: ScreenCapturer used to watch the UI settle after actions
+        (created on first use; mss handles are thread-bound, so use the engine
+        from one thread).
+        settle_timeout / settle_options: see execution.settle.wait_for_settle.
+        """
+        # pyautogui is resolved lazily by _gui() on the first action
+        self._capturer = capturer
+        self.settle_timeout = settle_timeout
+        self.settle_options = settle_options
+        # Last pointer target: keyboard steps of a plan watch the element they type into
+        self._last_box: Optional[List[float]] = None
+        self.last_settle: Optional[Dict[str, Any]] = None
+
+    @property
+    def capturer(self):
+        if self._capturer is None:
+            self._capturer = ScreenCapturer()
+        return self._capturer
+
+    def settle(self, box=None, timeout=None) -> Dict[str, Any]:
+        """
+        Blocks until the region around box (screen coordinates) and the whole
+        screen stop changing, or the timeout passes.
+        """
+        self.last_settle = wait_for_settle(self.capturer, box if box is not None else self._last_box,
+                                           timeout=self.settle_timeout if timeout is None else timeout,
+                                           **self.settle_options)
+        return self.last_settle
 
-    def execute(self, action_data):
+    def execute(self, action_data, settle=False):
         """
-        Executes an action based on data: 
-        {action: 'click'|'type', coordinates: (x, y), text: optional}
+        Executes an action based on data:
+        {action: 'click'|'double_click'|'type'|'press', coordinates: (x, y),
+         text: optional, key: optional (default 'enter'), box: optional}
+        'type' clicks the coordinates first when given and waits for the UI to
+        settle before typing; without coordinates it types into the focused
+        element, as does 'press'.
+        box: [x1, y1, x2, y2] screen region of the target, watched while settling
+        (default: a small box around the coordinates).
+        settle: after acting, wait for the UI to settle (result in self.last_settle).
         """
         action = action_data.get('action')
         coords = action_data.get('coordinates')
-        
-        if not coords:
+
+        if not coords and action not in ("type", "press"):
             return False
 
-        x, y = coords
-        print(f"Executing {action} at ({x}, {y})")
-        
+        pyautogui = _gui()
+        if coords:
+            x, y = coords
+            print(f"Executing {action} at ({x}, {y})")
+            self._last_box = list(action_data.get('box') or [x - 16, y - 16, x + 16, y + 16])
+        else:
+            print(f"Executing {action}")
+
         if action == "click":
             pyautogui.click(x, y)
         elif action == "type":
-            pyautogui.click(x, y)
-            time.sleep(0.5)
+            if coords:
+                pyautogui.click(x, y)
+                self.settle()
             text = action_data.get('text', "")
             pyautogui.typewrite(text)
+        elif action == "press":
+            pyautogui.press(action_data.get('key', "enter"))
         elif action == "double_click":
             pyautogui.doubleClick(x, y)
-        
+
+        if settle:
+            self.settle()
         return True
 
+    def execute_plan(self, steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Runs action dicts in order (e.g. click -> type -> press enter), starting
+        each step as soon as the UI has settled after the previous one.
+        Stops at the first step that fails; returns one record per step run.
+        """
+        records = []
+        for step in steps:
+            start = time.perf_counter()
+            ok = self.execute(step, settle=True)
+            records.append({'action': step.get('action'), 'ok': ok,
+                            'settled': bool(ok and self.last_settle and self.last_settle['settled']),
+                            'ms': (time.perf_counter() - start) * 1000})
+            if not ok:
+                break
+        return records
+
     def get_center(self, box):
         """
         box: [x1, y1, x2, y2]
@@ -0,0 +1,96 @@
+from typing import Any, Callable, Dict, Optional, Sequence
+import time
+import cv2  # type: ignore
+import numpy as np
+from utils.metrics import metrics
+
+
+def changed_fraction(prev: np.ndarray, curr: np.ndarray, threshold=8) -> float:
+    """
+    Share of pixels that changed by more than threshold on any channel.
+    """
+    if prev.shape != curr.shape:
+        return 1.0
+    diff = cv2.absdiff(prev, curr)
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    return float(np.count_nonzero(diff > threshold)) / max(1, diff.size)
+
+
+def monitor_of(capturer, box: Optional[Sequence[float]]) -> int:
+    """
+    mss monitor number containing the center of a screen-space box (default
+    and fallback: the primary monitor, 1).
+    """
+    monitors = capturer.sct.monitors
+    if box is not None:
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        for number, mon in enumerate(monitors[1:], start=1):
+            if mon['left'] <= cx < mon['left'] + mon['width'] and mon['top'] <= cy < mon['top'] + mon['height']:
+                return number
+    return 1 if len(monitors) > 1 else 0
+
+
+def watch_region(capturer, box: Sequence[float], monitor_number: int, margin=24):
+    """
+    Region (left, top, width, height) of the given monitor around a
+    screen-space box, grown by margin px and clipped to the monitor.
+    """
+    mon = capturer.sct.monitors[monitor_number]
+    left = max(mon['left'], int(box[0]) - margin)
+    top = max(mon['top'], int(box[1]) - margin)
+    right = min(mon['left'] + mon['width'], int(box[2]) + margin)
+    bottom = min(mon['top'] + mon['height'], int(box[3]) + margin)
+    if right <= left or bottom <= top:
+        return None
+    return (left - mon['left'], top - mon['top'], right - left, bottom - top)
+
+
+def wait_for_settle(capturer, box: Optional[Sequence[float]] = None, timeout=2.0, interval=0.03,
+                    stable_frames=3, quiet=0.3, threshold=8, tolerance=0.002, region_scale=0.5,
+                    screen_scale=0.125, sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+    """
+    Waits for the UI to react to an action and stop changing.
+    Polls low-resolution captures of the target region (box, in screen
+    coordinates) and of the monitor showing it. Once a change has been seen,
+    the UI is settled after stable_frames consecutive polls differ from their
+    predecessor in at most tolerance of their pixels. While nothing has
+    changed yet, the UI may simply not have started reacting, so it only
+    counts as settled after quiet seconds without any change. Gives up after
+    timeout seconds.
+    Returns {'settled', 'changed' (any motion seen), 'polls', 'ms'}.
+    """
+    start = time.perf_counter()
+    monitor_number = monitor_of(capturer, box)
+    region = watch_region(capturer, box, monitor_number) if box is not None else None
+
+    def grab():
+        frames = [capturer.capture(monitor_number, scale=screen_scale)]
+        if region is not None:
+            frames.append(capturer.capture(monitor_number, region=region, scale=region_scale))
+        return frames
+
+    previous = grab()
+    stable, polls, changed, settled = 0, 0, False, False
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= timeout:
+            break
+        sleep(min(interval, timeout - elapsed))
+        current = grab()
+        polls += 1
+        if all(changed_fraction(p, c, threshold) <= tolerance for p, c in zip(previous, current)):
+            stable += 1
+            if stable >= stable_frames and (changed or time.perf_counter() - start >= quiet):
+                settled = True
+                break
+        else:
+            stable = 0
+            changed = True
+        previous = current
+
+    ms = (time.perf_counter() - start) * 1000
+    metrics.observe('execution.settle', ms)
+    if not settled:
+        metrics.incr('execution.settle_timeouts')
+    return {'settled': settled, 'changed': changed, 'polls': polls, 'ms': ms}
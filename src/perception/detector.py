@@ -1,62 +1,237 @@
 from typing import List, Dict, Any, Union, cast
-from ultralytics import YOLO  # type: ignore
+import os
 import cv2  # type: ignore
 import numpy as np
-import torch  # type: ignore
-from transformers import CLIPProcessor, CLIPModel  # type: ignore
+from utils.lazy import LazyModel
+from utils.backends import check_backend, load_clip, load_yolo
+from utils.metrics import metrics
+from perception.icon_cache import IconSemanticCache, dhash
+from perception.scene import Scene, LabelTable, GROUP_LAYOUT, GROUP_ELEMENT
+
+ICON_LABELS = ["settings gear", "trash delete", "search magnifier", "user profile", "home", "plus add"]
 
 class UIDetector:
-    def __init__(self, atomic_model='yolov8n.pt', layout_model='yolov8n.pt'):
+    def __init__(self, atomic_model='yolov8n.pt', layout_model='yolov8n.pt',
+                 icon_labels=None, clip_batch_size=32, icon_cache_size=2048, icon_cache_path=None,
+                 layout_classes=None, backend='torch', threads=None, backend_cache_dir=None):
         """
         Initializes a hierarchical detector.
         Layout Model: For containers (forms, panels, toolbars).
         Atomic Model: For primitives (buttons, inputs, icons).
+        When both point at the same weights, one model is loaded and run once.
+        layout_classes: With shared weights, class names reported as layouts;
+        everything else is an element. None keeps every detection in both groups.
+        icon_labels: CLIP zero-shot vocabulary for icon semantics.
+        clip_batch_size: Max crops per CLIP image forward pass.
+        icon_cache_path: Optional JSON file persisting crop hash -> tag across runs.
+        backend: 'torch', 'int8' or 'onnx' (see utils.backends); threads sets ONNX
+        Runtime intra-op threads, backend_cache_dir where exported graphs are kept.
+        Models are lazy handles, loaded on first use (see models()).
         """
+        if clip_batch_size <= 0:
+            raise ValueError(f"clip_batch_size must be positive, got {clip_batch_size}")
         # In a real scenario, these would be custom fine-tuned models
-        self.atomic_model = YOLO(atomic_model)
-        self.layout_model = YOLO(layout_model)
+        self.backend = check_backend(backend)
+        self.threads = threads
+        self.backend_cache_dir = backend_cache_dir
+        self.shared_backbone = self._same_weights(atomic_model, layout_model)
+        self.atomic_model = LazyModel(f"yolo:{atomic_model}", lambda: self._load_yolo(atomic_model))
+        self.layout_model = self.atomic_model if self.shared_backbone else \
+            LazyModel(f"yolo:{layout_model}", lambda: self._load_yolo(layout_model))
+        self.layout_classes = set(layout_classes) if layout_classes is not None else None
         
-        # Load CLIP for icon semantics
-        self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.clip_model.to(self.device)
+        # CLIP for icon semantics
+        self.device = None
+        self.clip_model = LazyModel("clip", self._load_clip)
+        self.clip_processor = LazyModel("clip_processor", self._load_clip_processor)
+        self.clip_batch_size = clip_batch_size
+        self.last_timings: Dict[str, float] = {}
+        # Icons already seen (by perceptual hash) never reach CLIP again
+        self.icon_cache = IconSemanticCache(icon_cache_size, icon_cache_path)
+
+        # Label vocabulary is fixed per frame, so its text embeddings are computed once
+        self.icon_labels: List[str] = []
+        self.label_embeddings = None
+        self.add_icon_labels(icon_labels or ICON_LABELS)
+
+    def _load_yolo(self, weights):
+        return load_yolo(weights, self.backend, self.backend_cache_dir, self.threads)
+
+    def _load_clip(self):
+        import torch  # type: ignore
+        # Quantized and ONNX models are CPU-only
+        self.device = "cuda" if self.backend == 'torch' and torch.cuda.is_available() else "cpu"
+        return load_clip("openai/clip-vit-base-patch32", self.backend, self.device,
+                         self.backend_cache_dir, self.threads)
+
+    @staticmethod
+    def _load_clip_processor():
+        from transformers import CLIPProcessor  # type: ignore
+        return CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+
+    def models(self) -> List[LazyModel]:
+        return list(dict.fromkeys([self.atomic_model, self.layout_model, self.clip_model, self.clip_processor]))
+
+    def add_icon_labels(self, labels: List[str]):
+        """
+        Extends the icon vocabulary. Only labels not seen before are encoded,
+        on the next classification.
+        """
+        new_labels = [l for l in dict.fromkeys(labels) if l not in self.icon_labels]
+        if not new_labels:
+            return
+        self.icon_labels.extend(new_labels)
+        self.icon_cache.bind_vocabulary(self.icon_labels)
+
+    def _label_embeddings(self):
+        """
+        Normalised CLIP text embeddings for icon_labels, encoding only labels
+        added since the last call.
+        """
+        import torch  # type: ignore
+        done = 0 if self.label_embeddings is None else len(self.label_embeddings)
+        if done == len(self.icon_labels):
+            return self.label_embeddings
+        clip_model = self.clip_model.get()
+        inputs = self.clip_processor(text=self.icon_labels[done:], return_tensors="pt", padding=True).to(self.device)
+        with torch.no_grad():
+            text_features = clip_model.get_text_features(**inputs)
+        text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+        if self.label_embeddings is None:
+            self.label_embeddings = text_features
+        else:
+            self.label_embeddings = torch.cat([self.label_embeddings, text_features])
+        return self.label_embeddings
 
-    def detect(self, img: np.ndarray) -> Dict[str, List[Dict[str, Any]]]:
+    @staticmethod
+    def _same_weights(a, b) -> bool:
+        if a == b:
+            return True
+        try:
+            return os.path.samefile(a, b)
+        except OSError:
+            return False
+
+    def detect(self, img: np.ndarray, executor=None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Performs hierarchical detection.
+        executor: optional concurrent.futures executor; the layout model then runs
+        on it while the atomic model runs in the calling thread.
         Returns {'layouts': [...], 'elements': [...]}
+        Per-stage timings (ms) are left in self.last_timings.
         """
-        layout_results = self.layout_model(img, verbose=False)
-        atomic_results = self.atomic_model(img, verbose=False)
-        
-        layouts = self._process_results(layout_results, "layout")
-        elements = self._process_results(atomic_results, "element")
+        return self.detect_batch([img], executor)[0]
+
+    def detect_batch(self, imgs: List[np.ndarray], executor=None) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Hierarchical detection over several images (e.g. dirty regions of one frame),
+        with each YOLO model invoked once for the whole batch.
+        """
+        timings: Dict[str, float] = {}
+        layout_results, atomic_results = self._run_models(imgs, executor, timings)
         
-        # Semantic enrichment for icons
-        for el in elements:
-            if el['class'] in ['icon', 'image'] or el['confidence'] < 0.6:
-                el['semantic_tag'] = self._get_icon_semantics(img, el['box'])
+        frames = []
+        timings['clip'] = 0.0
+        for img, layout_result, atomic_result in zip(imgs, layout_results, atomic_results):
+            layouts = self._process_results([layout_result], "layout")
+            elements = self._process_results([atomic_result], "element")
+            if self.shared_backbone and self.layout_classes is not None:
+                layouts = [l for l in layouts if l['class'] in self.layout_classes]
+                elements = [e for e in elements if e['class'] not in self.layout_classes]
         
-        return {
-            'layouts': layouts,
-            'elements': elements
-        }
+            # Semantic enrichment for icons (one batched CLIP pass per frame)
+            targets = [el for el in elements if el['class'] in ['icon', 'image'] or el['confidence'] < 0.6]
+            with metrics.span('detector.clip') as span:
+                tags = self._get_icon_semantics_batch(img, [el['box'] for el in targets])
+            timings['clip'] += span.ms
+            for el, tag in zip(targets, tags):
+                el['semantic_tag'] = tag
+            frames.append({
+                'layouts': layouts,
+                'elements': elements
+            })
+            metrics.incr('detector.layouts', len(layouts))
+            metrics.incr('detector.elements', len(elements))
+        self.last_timings = timings
+        return frames
+
+    def detect_scene(self, img: np.ndarray, executor=None) -> Scene:
+        """
+        Same detection as detect(), returned as a columnar Scene built directly
+        from the YOLO tensors (layouts and elements only).
+        """
+        timings: Dict[str, float] = {}
+        layout_results, atomic_results = self._run_models([img], executor, timings)
+        classes = LabelTable()
+        layouts = Scene.from_yolo(layout_results, GROUP_LAYOUT, classes)
+        elements = Scene.from_yolo(atomic_results, GROUP_ELEMENT, classes)
+        if self.shared_backbone and self.layout_classes is not None:
+            is_layout = np.isin(np.array(classes.labels, dtype=object), list(self.layout_classes))
+            is_layout = np.append(is_layout, False)
+            layouts = self._take(layouts, is_layout[layouts.class_ids])
+            elements = self._take(elements, ~is_layout[elements.class_ids])
+
+        names = np.array(classes.labels + [''], dtype=object)[elements.class_ids]
+        targets = np.flatnonzero(np.isin(names, ['icon', 'image']) | (elements.confidences < 0.6))
+        with metrics.span('detector.clip') as span:
+            tags = self._get_icon_semantics_batch(img, elements.boxes[targets])
+        timings['clip'] = span.ms
+        labels = LabelTable()
+        label_ids = np.full(len(elements), -1, dtype=np.int32)
+        label_ids[targets] = labels.intern_many(tags)
+        self.last_timings = timings
+        metrics.incr('detector.layouts', len(layouts))
+        metrics.incr('detector.elements', len(elements))
+
+        elements = elements.replace(label_ids=label_ids, labels=labels)
+        return Scene.concat([layouts, elements], image=img)
+
+    @staticmethod
+    def _take(scene: Scene, mask: np.ndarray) -> Scene:
+        return scene.replace(boxes=scene.boxes[mask], confidences=scene.confidences[mask],
+                             groups=scene.groups[mask], class_ids=scene.class_ids[mask],
+                             label_ids=scene.label_ids[mask], track_ids=scene.track_ids[mask])
+
+    def _run_models(self, imgs, executor, timings: Dict[str, float]):
+        """
+        Runs the layout and atomic models over imgs; returns (layout_results, atomic_results).
+        """
+        def run_layout():
+            with metrics.span('detector.layout') as span:
+                results = self.layout_model(imgs, verbose=False)
+            timings['layout'] = span.ms
+            return results
+
+        layout_future = None
+        if not self.shared_backbone:
+            layout_future = executor.submit(run_layout) if executor is not None else None
+            if layout_future is None:
+                layout_results = run_layout()
+        with metrics.span('detector.atomic') as span:
+            atomic_results = self.atomic_model(imgs, verbose=False)
+        timings['atomic'] = span.ms
+        if self.shared_backbone:
+            # Same weights: one inference serves both groups
+            layout_results = atomic_results
+        elif layout_future is not None:
+            layout_results = layout_future.result()
+        return layout_results, atomic_results
 
     def _process_results(self, results: Any, group: str) -> List[Dict[str, Any]]:
         processed = []
         for result in results:
-            if not hasattr(result, 'boxes'):
+            if not hasattr(result, 'boxes') or result.boxes is None:
                 continue
-            for box in result.boxes:
-                coords = box.xyxy[0].tolist()
-                cls_id = int(box.cls[0])
-                cls_name = str(result.names[cls_id])
+            # One device->host transfer per column instead of per box
+            coords = result.boxes.xyxy.cpu().numpy().tolist()
+            confs = result.boxes.conf.cpu().numpy().tolist()
+            cls_ids = result.boxes.cls.cpu().numpy().astype(np.int64).tolist()
+            for box, conf, cls_id in zip(coords, confs, cls_ids):
                 processed.append({
                     'group': group,
-                    'box': coords,
-                    'confidence': float(box.conf[0]),
-                    'class': cls_name
+                    'box': box,
+                    'confidence': conf,
+                    'class': str(result.names[cls_id])
                 })
         return processed
 
@@ -64,21 +239,60 @@ class UIDetector:
         """
         Uses CLIP to understand icon semantics when labels are missing.
         """
-        x1, y1, x2, y2 = map(int, box)
-        crop = img[y1:y2, x1:x2]
-        if crop.size == 0: return "unknown"
-        
-        labels = ["settings gear", "trash delete", "search magnifier", "user profile", "home", "plus add"]
-        inputs = self.clip_processor(text=labels, images=crop, return_tensors="pt", padding=True).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.clip_model(**inputs)
-        
-        logits_per_image = outputs.logits_per_image
-        probs = logits_per_image.softmax(dim=1)
-        best_label = labels[probs.argmax().item()]
-        
-        return best_label
+        return self._get_icon_semantics_batch(img, [box])[0]
+
+    def _get_icon_semantics_batch(self, img, boxes) -> List[str]:
+        """
+        Resolves crops through the icon cache first; the remaining distinct crops
+        are classified against the precomputed label embeddings,
+        clip_batch_size crops per forward pass.
+        """
+        tags = ["unknown"] * len(boxes)
+        pending: Dict[int, List[int]] = {}
+        crops = []
+        hits = 0
+        for i, box in enumerate(boxes):
+            x1, y1, x2, y2 = map(int, box)
+            crop = img[y1:y2, x1:x2]
+            if crop.size == 0: continue
+            key = dhash(crop)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = self.icon_cache.get(key)
+            if cached is not None:
+                hits += 1
+                tags[i] = cached
+            else:
+                pending[key] = [i]
+                crops.append(crop)
+
+        keys = list(pending)
+        metrics.incr('detector.crops', len(boxes))
+        metrics.incr('detector.icon_cache_hits', hits)
+        if crops:
+            import torch  # type: ignore
+            label_embeddings = self._label_embeddings()
+        for start in range(0, len(crops), self.clip_batch_size):
+            batch = crops[start:start + self.clip_batch_size]
+            with metrics.span('detector.clip_forward'):
+                inputs = self.clip_processor(images=batch, return_tensors="pt").to(self.device)
+                with torch.no_grad():
+                    image_features = self.clip_model.get_image_features(**inputs)
+            metrics.incr('detector.clip_crops', len(batch))
+            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+
+            # Cosine similarity has the same argmax as CLIP's scaled logits
+            best = (image_features @ label_embeddings.T).argmax(dim=1).tolist()
+            for key, label_idx in zip(keys[start:start + self.clip_batch_size], best):
+                tag = self.icon_labels[label_idx]
+                self.icon_cache.put(key, tag)
+                for slot in pending[key]:
+                    tags[slot] = tag
+
+        if crops and self.icon_cache.path:
+            self.icon_cache.save()
+        return tags
 
     def draw_detections(self, img, detections):
         annotated_img = img.copy()
@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Tuple
+import cv2  # type: ignore
+import numpy as np
+
+Rect = Tuple[int, int, int, int]
+
+
+def changed_blocks(prev: np.ndarray, curr: np.ndarray, block=32, threshold=12) -> np.ndarray:
+    """
+    Block-wise frame difference.
+    Returns a (ceil(H/block), ceil(W/block)) bool grid, True where any pixel in the
+    block changed by more than threshold on any channel.
+    """
+    diff = cv2.absdiff(prev, curr)
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    h, w = diff.shape
+    gh, gw = -(-h // block), -(-w // block)
+    padded = np.zeros((gh * block, gw * block), dtype=diff.dtype)
+    padded[:h, :w] = diff
+    return padded.reshape(gh, block, gw, block).max(axis=(1, 3)) > threshold
+
+
+def dirty_rects(mask: np.ndarray, block: int, shape: Tuple[int, int], pad=16) -> List[Rect]:
+    """
+    Groups changed blocks into connected rectangles in pixel space,
+    grown by pad pixels and clipped to the frame.
+    """
+    if not mask.any():
+        return []
+    h, w = shape[:2]
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    rects = []
+    for x, y, bw, bh, _ in stats[1:count]:
+        rects.append((max(0, int(x) * block - pad), max(0, int(y) * block - pad),
+                      min(w, int(x + bw) * block + pad), min(h, int(y + bh) * block + pad)))
+    return rects
+
+
+def rect_area(rects: List[Rect]) -> int:
+    return sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects)
+
+
+def _intersects(box, rect: Rect) -> bool:
+    return box[0] < rect[2] and box[2] > rect[0] and box[1] < rect[3] and box[3] > rect[1]
+
+
+def text_box(item: Dict[str, Any]):
+    (x1, y1), (x2, y2) = item['box'][0], item['box'][2]
+    return [x1, y1, x2, y2]
+
+
+def offset_detection(det: Dict[str, Any], dx: int, dy: int) -> Dict[str, Any]:
+    x1, y1, x2, y2 = det['box']
+    return {**det, 'box': [x1 + dx, y1 + dy, x2 + dx, y2 + dy]}
+
+
+def offset_text(item: Dict[str, Any], dx: int, dy: int) -> Dict[str, Any]:
+    return {**item, 'box': [[x + dx, y + dy] for x, y in item['box']]}
+
+
+def grow_rects(rects: List[Rect], boxes: List[List[float]], shape: Tuple[int, int]) -> List[Rect]:
+    """
+    Grows each dirty rectangle to the union of itself and every cached box it
+    touches (repeated until no further box is hit), then merges rectangles that
+    overlap. Re-perceiving the grown crops sees those boxes whole, so a change
+    inside a button re-detects the button rather than dropping it.
+    Pass element and text boxes only: containers are handled by keep_containers.
+    """
+    if not rects:
+        return []
+    h, w = shape[:2]
+    arr = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+    grown = [list(r) for r in rects]
+    changed = True
+    while changed:
+        changed = False
+        for rect in grown:
+            hit = ((arr[:, 0] < rect[2]) & (arr[:, 2] > rect[0]) &
+                   (arr[:, 1] < rect[3]) & (arr[:, 3] > rect[1]))
+            if hit.any():
+                union = [min(rect[0], arr[hit, 0].min()), min(rect[1], arr[hit, 1].min()),
+                         max(rect[2], arr[hit, 2].max()), max(rect[3], arr[hit, 3].max())]
+                if union != rect:
+                    rect[:] = union
+                    changed = True
+        merged: List[List[float]] = []
+        for rect in grown:
+            for other in merged:
+                if _intersects(rect, other):
+                    other[:] = [min(rect[0], other[0]), min(rect[1], other[1]),
+                                max(rect[2], other[2]), max(rect[3], other[3])]
+                    changed = True
+                    break
+            else:
+                merged.append(rect)
+        grown = merged
+    return [(max(0, int(np.floor(x1))), max(0, int(np.floor(y1))), min(w, int(np.ceil(x2))), min(h, int(np.ceil(y2))))
+            for x1, y1, x2, y2 in grown]
+
+
+def keep_containers(items: List[Dict[str, Any]], rects: List[Rect]) -> List[Dict[str, Any]]:
+    """
+    Cached layouts that are not wholly inside a dirty rectangle. A crop cannot
+    see a container that extends past it, so such layouts stay as they were.
+    """
+    return [item for item in items
+            if not any(item['box'][0] >= r[0] and item['box'][1] >= r[1] and
+                       item['box'][2] <= r[2] and item['box'][3] <= r[3] for r in rects)]
+
+
+def inside_crop(det: Dict[str, Any], rect: Rect, shape: Tuple[int, int]) -> bool:
+    """
+    Whether a detection (in crop coordinates) stays clear of the crop edges that
+    are not frame edges, i.e. is not a clipped view of a larger box.
+    """
+    h, w = shape[:2]
+    x1, y1, x2, y2 = det['box']
+    return ((x1 > 0 or rect[0] == 0) and (y1 > 0 or rect[1] == 0) and
+            (x2 < rect[2] - rect[0] or rect[2] == w) and (y2 < rect[3] - rect[1] or rect[3] == h))
+
+
+def keep_outside(items: List[Dict[str, Any]], rects: List[Rect], text=False) -> List[Dict[str, Any]]:
+    """
+    Cached results that do not touch any dirty rectangle.
+    """
+    kept = []
+    for item in items:
+        box = text_box(item) if text else item['box']
+        if not any(_intersects(box, r) for r in rects):
+            kept.append(item)
+    return kept
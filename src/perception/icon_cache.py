@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import json
+import os
+import cv2  # type: ignore
+import numpy as np
+
+
+def dhash(crop: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image crop.
+    The crop is normalised to a (hash_size + 1) x hash_size grayscale thumbnail,
+    so small scaling and compression noise do not change the hash.
+    """
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(crop, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int(np.packbits(bits).tobytes().hex(), 16)
+
+
+class IconSemanticCache:
+    def __init__(self, max_size=2048, path: Optional[str] = None):
+        """
+        Content-addressed LRU cache: dHash of an icon crop -> resolved semantic_tag.
+        path: optional JSON file used for warm starts (see load/save).
+        """
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.vocabulary: List[str] = []
+        self._store: "OrderedDict[int, str]" = OrderedDict()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def get(self, key: int) -> Optional[str]:
+        tag = self._store.get(key)
+        if tag is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._store.move_to_end(key)
+        return tag
+
+    def put(self, key: int, tag: str):
+        self._store[key] = tag
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    def bind_vocabulary(self, labels: List[str]):
+        """
+        Tags are only valid for the label set they were resolved against;
+        any vocabulary change drops the cached entries.
+        """
+        if list(labels) != self.vocabulary:
+            self._store.clear()
+            self.vocabulary = list(labels)
+
+    def load(self, path: Optional[str] = None):
+        path = path or self.path
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        self.vocabulary = payload.get('vocabulary', [])
+        self._store.clear()
+        for key, tag in payload.get('entries', []):
+            self.put(int(key, 16), tag)
+
+    def save(self, path: Optional[str] = None):
+        """
+        Writes the cache atomically so a crash never leaves a truncated file.
+        """
+        path = path or self.path
+        if not path:
+            return
+        payload = {
+            'vocabulary': self.vocabulary,
+            'entries': [[f"{key:x}", tag] for key, tag in self._store.items()]
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._store),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def __len__(self):
+        return len(self._store)
@@ -1,17 +1,43 @@
 from typing import List, Dict, Any, Tuple, cast
-import easyocr  # type: ignore
+from collections import OrderedDict
+import hashlib
 import numpy as np
 import cv2  # type: ignore
+from utils.lazy import LazyModel
+from utils.backends import apply_threads
+from perception.scene import Scene, LabelTable, GROUP_TEXT
 
 class TextRecognizer:
-    def __init__(self, languages=['en']):
-        self.reader = easyocr.Reader(languages)
+    def __init__(self, languages=['en'], cache_size=4096, batch_size=16):
+        """
+        cache_size: recognised crops kept (by content hash) for region OCR.
+        batch_size: crops per recognition batch in region OCR.
+        """
+        self.reader = LazyModel("easyocr", lambda: self._load_reader(languages))
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def _load_reader(languages):
+        import easyocr  # type: ignore
+        apply_threads()
+        return easyocr.Reader(languages)
 
-    def recognize(self, img: np.ndarray) -> List[Dict[str, Any]]:
+    def models(self) -> List[LazyModel]:
+        return [self.reader]
+
+    def recognize(self, img: np.ndarray, regions=None) -> List[Dict[str, Any]]:
         """
         Extracts text and coordinates from the image.
+        regions: optional [x1, y1, x2, y2] boxes (e.g. UIDetector elements); only
+        those crops are recognised. None runs full-frame OCR.
         Returns a list of results: [{'box': [[x,y],...], 'text': str, 'conf': float}]
         """
+        if regions is not None:
+            return self.recognize_regions(img, regions)
         # EasyOCR returns list of (bbox, text, confidence)
         results = self.reader.readtext(img)
         formatted_results = []
@@ -23,6 +49,107 @@ class TextRecognizer:
             })
         return formatted_results
 
+    def detect_text_regions(self, img: np.ndarray) -> List[List[int]]:
+        """
+        Runs only EasyOCR's text detector; returns [x1, y1, x2, y2] line boxes.
+        """
+        horizontal_list, free_list = self.reader.detect(img)
+        boxes = [[x_min, y_min, x_max, y_max] for x_min, x_max, y_min, y_max in horizontal_list[0]]
+        for poly in free_list[0]:
+            xs, ys = [p[0] for p in poly], [p[1] for p in poly]
+            boxes.append([min(xs), min(ys), max(xs), max(ys)])
+        return boxes
+
+    def recognize_regions(self, img: np.ndarray, regions) -> List[Dict[str, Any]]:
+        """
+        Recognises text in the given boxes only. Crops already seen (same pixels)
+        are answered from the cache; the rest go through EasyOCR's recogniser
+        in one batched call. Boxes are returned in full-frame coordinates.
+        """
+        h, w = img.shape[:2]
+        results: List[Dict[str, Any]] = []
+        pending: Dict[bytes, List[List[int]]] = OrderedDict()
+        for box in regions:
+            x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+            x2, y2 = min(w, int(box[2])), min(h, int(box[3]))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crop = img[y1:y2, x1:x2]
+            digest = hashlib.blake2b(repr(crop.shape).encode(), digest_size=16)
+            digest.update(np.ascontiguousarray(crop).data)
+            key = digest.digest()
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                self._append(results, [x1, y1, x2, y2], *cached)
+            else:
+                self.cache_misses += 1
+                pending.setdefault(key, []).append([x1, y1, x2, y2])
+
+        if pending:
+            # EasyOCR expects [x_min, x_max, y_min, y_max] and returns the same
+            # rectangle as the result polygon, in its own order, so results are
+            # routed back by the full box (equal boxes hold equal pixels, and
+            # those were merged into one pending entry above)
+            first_boxes = [boxes[0] for boxes in pending.values()]
+            horizontal_list = [[x1, x2, y1, y2] for x1, y1, x2, y2 in first_boxes]
+            from easyocr.utils import reformat_input  # type: ignore
+            _, img_grey = reformat_input(img)
+            recognised = self.reader.recognize(img_grey, horizontal_list=horizontal_list, free_list=[],
+                                               batch_size=self.batch_size)
+            by_box = {(int(bbox[0][0]), int(bbox[0][1]), int(bbox[2][0]), int(bbox[2][1])): (str(text), float(conf))
+                      for bbox, text, conf in recognised}
+            for (key, boxes), first in zip(pending.items(), first_boxes):
+                hit = by_box.get(tuple(first))
+                if hit is None:
+                    continue
+                self._cache[key] = hit
+                for box in boxes:
+                    self._append(results, box, *hit)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _append(results, box, text, conf):
+        if not text:
+            return
+        x1, y1, x2, y2 = box
+        results.append({
+            'box': [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+            'text': text,
+            'confidence': conf
+        })
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'size': len(self._cache),
+            'max_size': self.cache_size,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+
+    def recognize_scene(self, img: np.ndarray) -> Scene:
+        """
+        Same as recognize(), as a columnar Scene of text rows.
+        Boxes are the axis-aligned [top-left, bottom-right] corners.
+        """
+        results = self.reader.readtext(img)
+        if not results:
+            return Scene(image=img)
+        corners = np.array([[bbox[0][0], bbox[0][1], bbox[2][0], bbox[2][1]] for bbox, _, _ in results], dtype=np.float64)
+        classes = LabelTable(['text'])
+        labels = LabelTable()
+        return Scene(boxes=corners,
+                     confidences=[conf for _, _, conf in results],
+                     groups=np.full(len(results), GROUP_TEXT),
+                     class_ids=np.zeros(len(results)),
+                     label_ids=labels.intern_many([str(text) for _, text, _ in results]),
+                     classes=classes, labels=labels, image=img)
+
     def get_text_center(self, bbox):
         """
         Calculates the center of a bbox returned by EasyOCR.
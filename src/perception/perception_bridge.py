@@ -1,22 +1,145 @@
 from perception.screen_capture import ScreenCapturer
 from perception.detector import UIDetector
 from perception.ocr import TextRecognizer
+from perception import dirty_regions
+from perception.scene import Scene
+from utils.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 
 class PerceptionEngine:
-    def __init__(self):
+    def __init__(self, incremental=False, dirty_block=32, dirty_threshold=12, max_dirty_ratio=0.3,
+                 full_every=30, concurrent=False, max_workers=2, capture_region=None, capture_scale=None,
+                 ocr_mode='full', recorder=None, backend='torch', threads=None, backend_cache_dir=None):
+        """
+        incremental: Re-run detection/OCR only on regions that changed since the
+        previous frame, falling back to a full pass when more than
+        max_dirty_ratio of the frame changed. Dirty regions are grown to cover
+        every cached element and text box they touch (containers around them are
+        kept), and a full pass is forced every full_every frames so patching
+        errors cannot accumulate.
+        concurrent: Run OCR and the layout detector on a thread pool of
+        max_workers threads while the atomic detector runs in the caller.
+        capture_region / capture_scale: passed to ScreenCapturer.capture; boxes are
+        then in capture coordinates, see to_screen().
+        ocr_mode: 'full' reads the whole frame; 'regions' recognises only detected
+        element boxes (after detection, falling back to 'full' when there are none);
+        'detector' runs EasyOCR's detector and recognises its boxes through the
+        crop cache.
+        recorder: optional perception.replay.SessionRecorder; every perceive()
+        result is appended to it together with the capture transform.
+        backend / threads / backend_cache_dir: detector inference backend, see
+        utils.backends.
+        """
         self.capturer = ScreenCapturer()
-        self.detector = UIDetector()
+        self.detector = UIDetector(backend=backend, threads=threads, backend_cache_dir=backend_cache_dir)
         self.recognizer = TextRecognizer()
+        self.incremental = incremental
+        self.dirty_block = dirty_block
+        self.dirty_threshold = dirty_threshold
+        self.max_dirty_ratio = max_dirty_ratio
+        self.full_every = full_every
+        self._since_full = 0
+        self._last = None
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        self._pool = None
+        self.last_timings = {}
+        self.capture_region = capture_region
+        self.capture_scale = capture_scale
+        self.ocr_mode = ocr_mode
+        self.recorder = recorder
 
-    def perceive(self):
+    def capture(self):
+        """
+        Grabs one frame with the configured region and scale, for perceive(frame).
+        """
+        with metrics.span('perception.capture') as span:
+            img = self.capturer.capture(region=self.capture_region, scale=self.capture_scale)
+        self.last_timings['capture'] = span.ms
+        return img
+
+    def perceive(self, frame=None):
         """
         Captures screen, detects layout & atomic elements, and recognizes text.
         Returns a dictionary with all visual data.
+        frame: a frame from capture() to perceive instead of capturing a new one.
+        Per-stage timings (ms) are left in self.last_timings.
+        """
+        self.last_timings = {}
+        with metrics.span('perception.total') as total:
+            img = self.capture() if frame is None else frame
+            data = self.process_frame(img)
+        self.last_timings['total'] = total.ms
+        if self.recorder is not None:
+            self.recorder.record(data, self.capturer.last_transform)
+        return data
+
+    def perceive_scene(self):
+        """
+        Full perception pass returned as a columnar Scene instead of dicts.
         """
-        img = self.capturer.capture()
-        detections = self.detector.detect(img)
-        text_results = self.recognizer.recognize(img)
+        img = self.capturer.capture(region=self.capture_region, scale=self.capture_scale)
+        detections = self.detector.detect_scene(img)
+        text = self.recognizer.recognize_scene(img)
+        return Scene.concat([detections, text], image=img)
+
+    def process_frame(self, img):
+        """
+        Runs detection and OCR on an already captured frame.
+        """
+        if (self.incremental and self._last is not None and self._last['image'].shape == img.shape
+                and self._since_full < self.full_every):
+            data = self._perceive_incremental(img)
+        else:
+            data = self._perceive_full(img)
+        self._last = data
+        return data
+
+    def make_capturer(self):
+        """
+        A fresh capturer for another thread (mss handles are thread-bound), with
+        the configured region and scale. Map its frames' boxes with its own
+        transform, not through to_screen().
+        """
+        return ScreenCapturer(self.capture_region, self.capture_scale)
+
+    def models(self):
+        return self.detector.models() + self.recognizer.models()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="viga-perception")
+        return self._pool
+
+    def _timed_ocr(self, img, detections=None):
+        with metrics.span('perception.ocr') as span:
+            if self.ocr_mode == 'regions' and detections is not None and detections['elements']:
+                results = self.recognizer.recognize(img, regions=[el['box'] for el in detections['elements']])
+            elif self.ocr_mode == 'detector':
+                results = self.recognizer.recognize(img, regions=self.recognizer.detect_text_regions(img))
+            else:
+                results = self.recognizer.recognize(img)
+        self.last_timings['ocr'] = span.ms
+        metrics.incr('perception.text_boxes', len(results))
+        return results
+
+    def _perceive_full(self, img):
+        self._since_full = 0
+        if self.concurrent and self.ocr_mode != 'regions':
+            # Both stages spend their time in native code that releases the GIL
+            pool = self._executor()
+            ocr_future = pool.submit(self._timed_ocr, img)
+            with metrics.span('perception.detect') as span:
+                detections = self.detector.detect(img, executor=pool)
+            self.last_timings['detect'] = span.ms
+            text_results = ocr_future.result()
+        else:
+            with metrics.span('perception.detect') as span:
+                detections = self.detector.detect(img, executor=self._executor() if self.concurrent else None)
+            self.last_timings['detect'] = span.ms
+            text_results = self._timed_ocr(img, detections)
+        self.last_timings.update({f"detect.{k}": v for k, v in self.detector.last_timings.items()})
         
         return {
             'image': img,
@@ -25,6 +148,62 @@ class PerceptionEngine:
             'text': text_results
         }
 
+    def _perceive_incremental(self, img):
+        """
+        Diffs against the previous frame and patches the cached results:
+        everything outside the dirty rectangles is kept as is. Each rectangle is
+        first grown over the cached element and text boxes it touches, which are
+        then re-perceived whole from the crop. Layouts reaching past a crop are
+        kept from the cache; the crop's clipped views of them are dropped.
+        """
+        last = self._last
+        self._since_full += 1
+        mask = dirty_regions.changed_blocks(last['image'], img, self.dirty_block, self.dirty_threshold)
+        rects = dirty_regions.dirty_rects(mask, self.dirty_block, img.shape)
+        if not rects:
+            return {**last, 'image': img}
+        cached_boxes = ([d['box'] for d in last['elements']] +
+                        [dirty_regions.text_box(t) for t in last['text']])
+        rects = dirty_regions.grow_rects(rects, cached_boxes, img.shape)
+        if dirty_regions.rect_area(rects) > self.max_dirty_ratio * img.shape[0] * img.shape[1]:
+            return self._perceive_full(img)
+
+        layouts = dirty_regions.keep_containers(last['layouts'], rects)
+        elements = dirty_regions.keep_outside(last['elements'], rects)
+        text = dirty_regions.keep_outside(last['text'], rects, text=True)
+        crops = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+        for (x1, y1, x2, y2), crop, detections in zip(rects, crops, self.detector.detect_batch(crops)):
+            layouts += [dirty_regions.offset_detection(d, x1, y1) for d in detections['layouts']
+                        if dirty_regions.inside_crop(d, (x1, y1, x2, y2), img.shape)]
+            elements += [dirty_regions.offset_detection(d, x1, y1) for d in detections['elements']]
+            text += [dirty_regions.offset_text(t, x1, y1) for t in self.recognizer.recognize(crop)]
+
+        return {
+            'image': img,
+            'layouts': layouts,
+            'elements': elements,
+            'text': text
+        }
+
+    def to_screen(self, box):
+        """
+        Maps a box or point from the last captured frame to screen coordinates.
+        """
+        return self.capturer.to_screen(box)
+
+    def reset(self):
+        """
+        Forgets the cached frame so the next perceive() runs a full pass.
+        """
+        self._last = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self.recorder is not None:
+            self.recorder.close()
+
     def get_annotated_frame(self, data):
         img = data['image'].copy()
         
@@ -53,7 +232,7 @@ class PerceptionEngine:
 if __name__ == "__main__":
     engine = PerceptionEngine()
     data = engine.perceive()
-    print(f"Detected {len(data['detections'])} elements and {len(data['text'])} text blocks.")
+    print(f"Detected {len(data['layouts'])} layouts, {len(data['elements'])} elements and {len(data['text'])} text blocks.")
     
     annotated = engine.get_annotated_frame(data)
     cv2.imwrite("perception_debug.png", annotated)
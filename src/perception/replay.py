@@ -0,0 +1,303 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+import time
+import numpy as np
+import cv2  # type: ignore
+from perception.scene import Scene, LabelTable
+from perception.screen_capture import ScreenCapturer
+
+# Session layout (one directory per recording):
+#   frames.bin       encoded frames (PNG or JPEG) back to back
+#   index.bin        one INDEX_DTYPE record per frame, loaded memory-mapped
+#   columns/*.bin    Scene columns of every frame's detections, concatenated
+#   meta.json        label tables and format info
+# Every file is append-only and flushed after each frame, index row last, so a
+# recording cut short by a crash or kill stays readable up to its last frame.
+INDEX_DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('frame_offset', np.int64),
+    ('frame_size', np.int64),
+    ('row_start', np.int64),
+    ('row_count', np.int64),
+    ('offset_x', np.float64),
+    ('offset_y', np.float64),
+    ('scale', np.float64),
+    ('height', np.int32),
+    ('width', np.int32)
+])
+# Scene column dtypes, stored as is (boxes are 4 values per row)
+COLUMN_DTYPES = {'boxes': np.dtype(np.float64), 'confidences': np.dtype(np.float32),
+                 'groups': np.dtype(np.int8), 'class_ids': np.dtype(np.int32),
+                 'label_ids': np.dtype(np.int32), 'track_ids': np.dtype(np.int64)}
+COLUMNS = tuple(COLUMN_DTYPES)
+FORMAT_VERSION = 1
+
+
+class SessionRecorder:
+    def __init__(self, path: str, image_format: str = '.png', jpeg_quality: int = 90):
+        """
+        Writes perceived frames and their detector/OCR output to a session
+        directory (see the layout above). image_format: '.png' (lossless) or '.jpg'.
+        Each record() is on disk when it returns; close() (or the context
+        manager) only releases the files.
+        """
+        os.makedirs(os.path.join(path, 'columns'), exist_ok=True)
+        self.path = path
+        self.image_format = image_format
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if image_format == '.jpg' else \
+            [cv2.IMWRITE_PNG_COMPRESSION, 1]
+        self.classes = LabelTable()
+        self.labels = LabelTable()
+        self._frames = open(os.path.join(path, 'frames.bin'), 'wb')
+        self._columns = {name: open(os.path.join(path, 'columns', f"{name}.bin"), 'wb') for name in COLUMNS}
+        self._index = open(os.path.join(path, 'index.bin'), 'wb')
+        self._count = 0
+        self._rows = 0
+        self._meta_sizes = (-1, -1)
+        self._write_meta()
+
+    def _write_meta(self):
+        """
+        Rewrites meta.json (atomically) when the label tables have grown.
+        """
+        sizes = (len(self.classes), len(self.labels))
+        if sizes == self._meta_sizes:
+            return
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'image_format': self.image_format,
+                       'classes': self.classes.labels, 'labels': self.labels.labels}, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+        self._meta_sizes = sizes
+
+    def record(self, data: Dict[str, Any], transform: Tuple[float, float, float] = (0, 0, 1.0),
+               timestamp: Optional[float] = None):
+        """
+        Appends one frame: a perceive() dict (or Scene) with its 'image', and the
+        capture transform needed to map its boxes back to the screen.
+        """
+        scene = data if isinstance(data, Scene) else Scene.from_perception(data)
+        image = scene.image
+        encoded = b''
+        height = width = 0
+        if image is not None:
+            ok, buf = cv2.imencode(self.image_format, np.ascontiguousarray(image), self.encode_params)
+            if not ok:
+                raise ValueError(f"Could not encode frame as {self.image_format}")
+            encoded = buf.tobytes()
+            height, width = image.shape[:2]
+        offset = self._frames.tell()
+        self._frames.write(encoded)
+
+        # Re-intern into the session-wide tables; index -1 maps onto the sentinel
+        class_map = np.array([self.classes.intern(c) for c in scene.classes.labels] + [-1], dtype=np.int32)
+        label_map = np.array([self.labels.intern(l) for l in scene.labels.labels] + [-1], dtype=np.int32)
+        columns = {'boxes': scene.boxes, 'confidences': scene.confidences, 'groups': scene.groups,
+                   'class_ids': class_map[scene.class_ids], 'label_ids': label_map[scene.label_ids],
+                   'track_ids': scene.track_ids}
+        for name, values in columns.items():
+            self._columns[name].write(np.ascontiguousarray(values, dtype=COLUMN_DTYPES[name]).tobytes())
+        self._write_meta()
+
+        offset_x, offset_y, scale = transform
+        row = np.array([(time.time() if timestamp is None else timestamp, offset, len(encoded),
+                         self._rows, len(scene), offset_x, offset_y, scale, height, width)], dtype=INDEX_DTYPE)
+        # Data first, index row last: a row on disk always has its frame and detections
+        for f in [self._frames, *self._columns.values()]:
+            f.flush()
+        self._index.write(row.tobytes())
+        self._index.flush()
+        self._count += 1
+        self._rows += len(scene)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        if self._index.closed:
+            return
+        for f in [self._frames, *self._columns.values(), self._index]:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _map(path: str, dtype: np.dtype, shape_tail: Tuple[int, ...] = ()) -> np.ndarray:
+    """
+    Read-only memory map of a raw append-only file; a trailing partial record is ignored.
+    """
+    itemsize = dtype.itemsize * int(np.prod(shape_tail, dtype=np.int64))
+    count = os.path.getsize(path) // itemsize if os.path.exists(path) else 0
+    if count == 0:
+        return np.empty((0, *shape_tail), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count, *shape_tail))
+
+
+class SessionReader:
+    def __init__(self, path: str):
+        """
+        Random access to a recorded session. The index, the detection columns
+        and the frame blob are memory-mapped; frames are decoded on demand.
+        Sessions cut short (crash, kill) are read up to their last complete frame.
+        """
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.path = path
+        size = os.path.getsize(os.path.join(path, 'frames.bin'))
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format {self.meta.get('version')!r} in {path}")
+        self.columns = {name: _map(os.path.join(path, 'columns', f"{name}.bin"), dtype,
+                                   (4,) if name == 'boxes' else ())
+                        for name, dtype in COLUMN_DTYPES.items()}
+        index = _map(os.path.join(path, 'index.bin'), INDEX_DTYPE)
+        rows = min(len(column) for column in self.columns.values())
+        complete = ((index['row_start'] + index['row_count'] <= rows) &
+                    (index['frame_offset'] + index['frame_size'] <= size))
+        # Rows are appended in order, so the complete ones are a prefix
+        self.index = index[:int(np.argmin(complete)) if not complete.all() else len(index)]
+        self.classes = LabelTable(self.meta['classes'])
+        self.labels = LabelTable(self.meta['labels'])
+        self._frames = np.memmap(os.path.join(path, 'frames.bin'), dtype=np.uint8, mode='r') if size else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def image(self, i: int) -> Optional[np.ndarray]:
+        entry = self.index[i]
+        if self._frames is None or entry['frame_size'] == 0:
+            return None
+        start = int(entry['frame_offset'])
+        buf = np.asarray(self._frames[start:start + int(entry['frame_size'])])
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    def transform(self, i: int) -> Tuple[float, float, float]:
+        entry = self.index[i]
+        return float(entry['offset_x']), float(entry['offset_y']), float(entry['scale'])
+
+    def timestamp(self, i: int) -> float:
+        return float(self.index[i]['timestamp'])
+
+    def scene(self, i: int, load_image: bool = True) -> Scene:
+        """
+        Frame i's detections as a Scene (columns copied out of the memory map).
+        """
+        entry = self.index[i]
+        rows = slice(int(entry['row_start']), int(entry['row_start'] + entry['row_count']))
+        return Scene(**{name: np.array(column[rows]) for name, column in self.columns.items()},
+                     classes=self.classes, labels=self.labels,
+                     image=self.image(i) if load_image else None)
+
+    def perception(self, i: int, load_image: bool = True) -> Dict[str, Any]:
+        """
+        Frame i in the PerceptionEngine.perceive() dict format.
+        """
+        return self.scene(i, load_image).to_perception()
+
+
+class ReplayCapturer(ScreenCapturer):
+    def __init__(self, engine: "ReplayPerception"):
+        """
+        ScreenCapturer stand-in that steps through the recorded frames.
+        """
+        super().__init__()
+        self.engine = engine
+
+    def capture(self, *args, **kwargs):
+        i = self.engine._advance()
+        self.last_transform = self.engine.reader.transform(i)
+        img = self.engine.reader.image(i)
+        if img is None:
+            img = np.zeros((int(self.engine.reader.index[i]['height']) or 1,
+                            int(self.engine.reader.index[i]['width']) or 1, 3), dtype=np.uint8)
+        self.engine._remember(img, i)
+        return img
+
+
+class ReplayPerception:
+    def __init__(self, path: str, loop: bool = False, load_images: bool = True):
+        """
+        Drop-in replacement for PerceptionEngine that serves a recorded session:
+        each perceive() returns the next frame's recorded detections and text,
+        with no screen access and no models.
+        loop: restart at the first frame instead of raising StopIteration at the end.
+        load_images: decode frames; without it 'image' is None (graph building and
+        grounding do not need pixels).
+        """
+        self.reader = SessionReader(path)
+        self.loop = loop
+        self.load_images = load_images
+        self.position = 0
+        self.current = -1
+        self.capturer = ReplayCapturer(self)
+        self.last_timings: Dict[str, float] = {}
+        # Frames handed out by capturers, so process_frame can find their detections
+        self._frames: "OrderedDict[int, Tuple[np.ndarray, int]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.reader)
+
+    def _advance(self) -> int:
+        if self.position >= len(self.reader):
+            if not self.loop or not len(self.reader):
+                raise StopIteration("end of recorded session")
+            self.position = 0
+        i = self.position
+        self.position += 1
+        self.current = i
+        return i
+
+    def _remember(self, img, i):
+        self._frames[id(img)] = (img, i)
+        while len(self._frames) > 8:
+            self._frames.popitem(last=False)
+
+    def capture(self):
+        return self.capturer.capture()
+
+    def perceive(self, frame=None):
+        if frame is not None:
+            return self.process_frame(frame)
+        start = time.perf_counter()
+        i = self._advance()
+        self.capturer.last_transform = self.reader.transform(i)
+        data = self.reader.perception(i, self.load_images)
+        self.last_timings = {'total': (time.perf_counter() - start) * 1000}
+        return data
+
+    def perceive_scene(self):
+        i = self._advance()
+        self.capturer.last_transform = self.reader.transform(i)
+        return self.reader.scene(i, self.load_images)
+
+    def process_frame(self, img):
+        """
+        Recorded detections for a frame returned by one of our capturers.
+        """
+        entry = self._frames.pop(id(img), None)
+        if entry is None:
+            raise KeyError("frame was not produced by this replay session")
+        data = self.reader.perception(entry[1], load_image=False)
+        data['image'] = img
+        return data
+
+    def make_capturer(self) -> ReplayCapturer:
+        return self.capturer
+
+    def to_screen(self, box):
+        return self.capturer.to_screen(box)
+
+    def reset(self):
+        self.position = 0
+
+    def close(self):
+        pass
+
+    def models(self):
+        return []
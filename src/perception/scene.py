@@ -0,0 +1,178 @@
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+
+GROUP_LAYOUT = 0
+GROUP_ELEMENT = 1
+GROUP_TEXT = 2
+GROUP_KEYS = ('layouts', 'elements', 'text')
+
+
+class LabelTable:
+    def __init__(self, labels: Optional[Sequence[str]] = None):
+        """
+        Interned strings: each distinct label is stored once and referenced by id.
+        """
+        self.labels: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for label in labels or []:
+            self.intern(label)
+
+    def intern(self, label: str) -> int:
+        idx = self._ids.get(label)
+        if idx is None:
+            idx = len(self.labels)
+            self._ids[label] = idx
+            self.labels.append(label)
+        return idx
+
+    def intern_many(self, labels: Sequence[str]) -> np.ndarray:
+        return np.array([self.intern(l) for l in labels], dtype=np.int32)
+
+    def lookup(self, ids: np.ndarray) -> List[Optional[str]]:
+        return [self.labels[i] if i >= 0 else None for i in np.asarray(ids).tolist()]
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class Scene:
+    def __init__(self, boxes=None, confidences=None, groups=None, class_ids=None, label_ids=None,
+                 track_ids=None, classes: Optional[LabelTable] = None, labels: Optional[LabelTable] = None,
+                 image=None):
+        """
+        Columnar scene: one row per layout, element or text box.
+        Rows are ordered layouts, then elements, then text (see GROUP_*).
+        boxes: (n, 4) [x1, y1, x2, y2]; class_ids index `classes`;
+        label_ids index `labels` (semantic tag or OCR text, -1 if none);
+        track_ids are -1 until the scene passes through TemporalManager.
+        """
+        self.boxes = np.asarray(boxes if boxes is not None else np.empty((0, 4)), dtype=np.float64).reshape(-1, 4)
+        n = len(self.boxes)
+        self.confidences = np.asarray(confidences if confidences is not None else np.empty(0), dtype=np.float32)
+        self.groups = np.asarray(groups if groups is not None else np.empty(0), dtype=np.int8)
+        self.class_ids = np.asarray(class_ids if class_ids is not None else np.full(n, -1), dtype=np.int32)
+        self.label_ids = np.asarray(label_ids if label_ids is not None else np.full(n, -1), dtype=np.int32)
+        self.track_ids = np.asarray(track_ids if track_ids is not None else np.full(n, -1), dtype=np.int64)
+        self.classes = classes or LabelTable()
+        self.labels = labels or LabelTable()
+        self.image = image
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def count(self, group: int) -> int:
+        return int(np.count_nonzero(self.groups == group))
+
+    def group_slice(self, group: int) -> slice:
+        """
+        Rows of one group; valid because rows are ordered by group.
+        """
+        start = int(np.searchsorted(self.groups, group, side='left'))
+        end = int(np.searchsorted(self.groups, group, side='right'))
+        return slice(start, end)
+
+    def class_names(self) -> List[Optional[str]]:
+        return self.classes.lookup(self.class_ids)
+
+    def replace(self, **columns) -> "Scene":
+        """
+        Shallow copy with some columns swapped out; label tables are shared.
+        """
+        fields = dict(boxes=self.boxes, confidences=self.confidences, groups=self.groups,
+                      class_ids=self.class_ids, label_ids=self.label_ids, track_ids=self.track_ids,
+                      classes=self.classes, labels=self.labels, image=self.image)
+        fields.update(columns)
+        return Scene(**fields)
+
+    @classmethod
+    def from_yolo(cls, results: Any, group: int, classes: Optional[LabelTable] = None) -> "Scene":
+        """
+        Builds rows straight from ultralytics Results tensors, one transfer per column.
+        """
+        classes = classes or LabelTable()
+        boxes, confs, class_ids = [], [], []
+        for result in results:
+            if not hasattr(result, 'boxes') or result.boxes is None:
+                continue
+            cls_idx = result.boxes.cls.cpu().numpy().astype(np.int64)
+            # Map model-local class indices onto the shared class table
+            remap = np.array([classes.intern(str(result.names[i])) for i in range(len(result.names))], dtype=np.int32)
+            boxes.append(result.boxes.xyxy.cpu().numpy())
+            confs.append(result.boxes.conf.cpu().numpy())
+            class_ids.append(remap[cls_idx] if len(cls_idx) else np.empty(0, dtype=np.int32))
+        if not boxes:
+            return cls(classes=classes)
+        n = sum(len(b) for b in boxes)
+        return cls(boxes=np.concatenate(boxes), confidences=np.concatenate(confs),
+                   groups=np.full(n, group), class_ids=np.concatenate(class_ids), classes=classes)
+
+    @classmethod
+    def from_perception(cls, data: Dict[str, Any]) -> "Scene":
+        """
+        Converts the dict-per-detection format of PerceptionEngine.perceive().
+        """
+        classes, labels = LabelTable(), LabelTable()
+        boxes, confs, groups, class_ids, label_ids, track_ids = [], [], [], [], [], []
+        for group, key in enumerate(GROUP_KEYS):
+            for item in data.get(key, []):
+                if group == GROUP_TEXT:
+                    (x1, y1), (x2, y2) = item['box'][0], item['box'][2]
+                    boxes.append([x1, y1, x2, y2])
+                    class_ids.append(classes.intern('text'))
+                    label_ids.append(labels.intern(item['text']))
+                else:
+                    boxes.append(item['box'])
+                    class_ids.append(classes.intern(item['class']))
+                    tag = item.get('semantic_tag')
+                    label_ids.append(labels.intern(tag) if tag is not None else -1)
+                confs.append(item['confidence'])
+                groups.append(group)
+                track_ids.append(item.get('track_id', -1))
+        return cls(boxes=boxes, confidences=confs, groups=groups, class_ids=class_ids, label_ids=label_ids,
+                   track_ids=track_ids, classes=classes, labels=labels, image=data.get('image'))
+
+    @classmethod
+    def concat(cls, scenes: Sequence["Scene"], image=None) -> "Scene":
+        """
+        Merges scenes into one, re-interning labels and restoring group order.
+        """
+        classes, labels = LabelTable(), LabelTable()
+        parts: Dict[str, List[np.ndarray]] = {k: [] for k in ('boxes', 'confidences', 'groups', 'class_ids', 'label_ids', 'track_ids')}
+        for scene in scenes:
+            class_map = np.array([classes.intern(c) for c in scene.classes.labels] + [-1], dtype=np.int32)
+            label_map = np.array([labels.intern(l) for l in scene.labels.labels] + [-1], dtype=np.int32)
+            parts['boxes'].append(scene.boxes)
+            parts['confidences'].append(scene.confidences)
+            parts['groups'].append(scene.groups)
+            # Index -1 maps onto the trailing -1 sentinel
+            parts['class_ids'].append(class_map[scene.class_ids])
+            parts['label_ids'].append(label_map[scene.label_ids])
+            parts['track_ids'].append(scene.track_ids)
+        if not scenes:
+            return cls(image=image)
+        columns = {k: np.concatenate(v) for k, v in parts.items()}
+        order = np.argsort(columns['groups'], kind='stable')
+        return cls(**{k: v[order] for k, v in columns.items()}, classes=classes, labels=labels, image=image)
+
+    def to_perception(self) -> Dict[str, Any]:
+        """
+        Dict-per-detection view for consumers of the legacy format.
+        """
+        data: Dict[str, Any] = {'image': self.image, 'layouts': [], 'elements': [], 'text': []}
+        class_names = self.class_names()
+        label_names = self.labels.lookup(self.label_ids)
+        for box, conf, group, cls_name, label, track_id in zip(
+                self.boxes.tolist(), self.confidences.tolist(), self.groups.tolist(),
+                class_names, label_names, self.track_ids.tolist()):
+            if group == GROUP_TEXT:
+                x1, y1, x2, y2 = box
+                item = {'box': [[x1, y1], [x2, y1], [x2, y2], [x1, y2]], 'text': label, 'confidence': conf}
+            else:
+                item = {'group': 'layout' if group == GROUP_LAYOUT else 'element',
+                        'box': box, 'confidence': conf, 'class': cls_name}
+                if label is not None:
+                    item['semantic_tag'] = label
+            if track_id >= 0:
+                item['track_id'] = track_id
+            data[GROUP_KEYS[group]].append(item)
+        return data
@@ -1,27 +1,118 @@
+import hashlib
 import mss
 import numpy as np
 import cv2
 from PIL import Image
 
+
+def fingerprint(frame, scale=0.25) -> str:
+    """
+    Scene fingerprint of a captured frame: a hash of its area-downsampled
+    thumbnail. Equal frames always match. Each thumbnail pixel is the rounded
+    mean of a 4x4 block (at the default scale), so a change is only guaranteed
+    to show when it adds up to 16 or more levels within one block and
+    channel; fainter changes (a pixel nudged by a few levels) can keep the
+    fingerprint. Glyphs, carets and widget state changes are far above that.
+    frame: an image, or [(img, transform), ...] from capture_monitors().
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    parts = frame if isinstance(frame, list) else [(frame, None)]
+    for img, transform in parts:
+        size = (max(1, int(img.shape[1] * scale)), max(1, int(img.shape[0] * scale)))
+        thumb = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        digest.update(repr((img.shape, transform)).encode())
+        digest.update(np.ascontiguousarray(thumb).data)
+    return digest.hexdigest()
+
+
 class ScreenCapturer:
-    def __init__(self):
-        self.sct = mss.mss()
+    def __init__(self, region=None, scale=None):
+        """
+        region / scale: defaults for capture() when it is called without them.
+        """
+        self.region = region
+        self.scale = scale
+        self._sct = None
+        # (offset_x, offset_y, scale) of the last capture, for mapping back to screen space
+        self.last_transform = (0, 0, 1.0)
+
+    @property
+    def sct(self):
+        # Opened on first capture so constructing an agent needs no display
+        if self._sct is None:
+            self._sct = mss.mss()
+        return self._sct
 
-    def capture(self, monitor_number=1):
+    def capture(self, monitor_number=1, region=None, scale=None, zero_copy=False, out=None):
         """
         Captures the screen and returns a numpy array (BGR).
+        region: optional (left, top, width, height) relative to the monitor
+            (default: the capturer's region).
+        scale: optional downscale factor (e.g. 0.5) applied while converting
+            (default: the capturer's scale).
+        zero_copy: return a strided BGR view over the mss buffer instead of a
+            contiguous copy. The view is read-only in spirit: OpenCV drawing calls
+            need a contiguous array, so copy() it before annotating.
+        out: optional preallocated (h, w, 3) uint8 array to write the frame into.
+        Use to_screen() to map coordinates of the result back to the screen.
         """
+        region = self.region if region is None else region
+        scale = self.scale if scale is None else scale
         monitors = self.sct.monitors
         if monitor_number >= len(monitors):
             monitor_number = 1
-        
+
         monitor = monitors[monitor_number]
+        if region is not None:
+            left, top, width, height = region
+            monitor = {
+                'left': monitor['left'] + int(left),
+                'top': monitor['top'] + int(top),
+                'width': int(width),
+                'height': int(height)
+            }
         screenshot = self.sct.grab(monitor)
-        # Convert to numpy array and remove alpha channel if present
-        img = np.array(screenshot)
-        if img.shape[2] == 4:
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-        return img
+        # Wrap the BGRA buffer without copying; dropping alpha is just a strided view
+        bgra = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+        view = bgra[:, :, :3]
+
+        offset_x, offset_y = monitor['left'], monitor['top']
+        if scale is not None and scale != 1.0:
+            size = (max(1, int(round(screenshot.width * scale))), max(1, int(round(screenshot.height * scale))))
+            self.last_transform = (offset_x, offset_y, float(scale))
+            if out is not None:
+                return cv2.resize(view, size, dst=out, interpolation=cv2.INTER_AREA)
+            return cv2.resize(view, size, interpolation=cv2.INTER_AREA)
+
+        self.last_transform = (offset_x, offset_y, 1.0)
+        if out is not None:
+            np.copyto(out, view)
+            return out
+        if zero_copy:
+            return view
+        return np.ascontiguousarray(view)
+
+    def capture_monitors(self, monitor_numbers=None):
+        """
+        Captures several monitors (default: all) as separate frames.
+        Returns [(img, (offset_x, offset_y, 1.0)), ...]; each transform maps the
+        frame into the shared virtual-desktop coordinate space.
+        """
+        if monitor_numbers is None:
+            monitor_numbers = range(1, len(self.sct.monitors))
+        frames = []
+        for number in monitor_numbers:
+            img = self.capture(number)
+            frames.append((img, self.last_transform))
+        return frames
+
+    def to_screen(self, box, transform=None):
+        """
+        Maps [x1, y1, x2, y2] (or [x, y]) from capture coordinates to absolute
+        screen coordinates, undoing region offset and downscale.
+        """
+        offset_x, offset_y, scale = transform or self.last_transform
+        return [v / scale + (offset_x if i % 2 == 0 else offset_y) for i, v in enumerate(box)]
 
     def save_capture(self, filename, img=None):
         if img is None:
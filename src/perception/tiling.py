@@ -0,0 +1,387 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import multiprocessing
+import os
+import sys
+import numpy as np
+from perception.screen_capture import ScreenCapturer
+from utils.metrics import metrics
+from utils.tracker import iou_matrix
+
+Rect = Tuple[int, int, int, int]
+Transform = Tuple[float, float, float]
+
+
+def make_tiles(width: int, height: int, tile_size: Optional[int] = 1280, overlap: int = 128) -> List[Rect]:
+    """
+    Covers a width x height frame with tiles of at most tile_size px whose
+    neighbours overlap by `overlap` px, so anything narrower than the overlap
+    appears whole in at least one tile. None gives one tile for the frame.
+    """
+    if tile_size is None or (width <= tile_size and height <= tile_size):
+        return [(0, 0, width, height)]
+    stride = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        # Fewest tiles that keep at least `overlap` between neighbours, spread evenly
+        count = -(-(length - overlap) // stride)
+        return np.linspace(0, length - tile_size, count).round().astype(int).tolist()
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, threshold=0.6, labels: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """
+    Greedy suppression over intersection-over-smaller-area: a box cut at a tile
+    edge is mostly inside the complete one from the neighbouring tile, which
+    IoU would miss. With labels, only boxes of the same label suppress each other.
+    Score ties go to the larger box. Returns the kept indices in score order.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if not len(boxes):
+        return np.empty(0, dtype=np.int64)
+    ix1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    iy1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    ix2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    iy2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    smaller = np.minimum(area[:, None], area[None, :])
+    overlap = np.where(smaller > 0, inter / np.where(smaller > 0, smaller, 1), 0.0) > threshold
+    if labels is not None:
+        labels = np.asarray(labels, dtype=object)
+        overlap &= labels[:, None] == labels[None, :]
+
+    order = np.lexsort((-area, -np.asarray(scores, dtype=np.float64)))
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for i in order.tolist():
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlap[i]
+    return np.array(keep, dtype=np.int64)
+
+
+def overlap_regions(tiles: Sequence[Rect]) -> List[Rect]:
+    """
+    Areas covered by more than one tile: the only places duplicates can come from.
+    """
+    regions = []
+    for i, (ax1, ay1, ax2, ay2) in enumerate(tiles):
+        for bx1, by1, bx2, by2 in tiles[i + 1:]:
+            x1, y1, x2, y2 = max(ax1, bx1), max(ay1, by1), min(ax2, bx2), min(ay2, by2)
+            if x1 < x2 and y1 < y2:
+                regions.append((x1, y1, x2, y2))
+    return regions
+
+
+def _dedupe(boxes: np.ndarray, scores, threshold, labels, regions) -> np.ndarray:
+    """
+    Indices to keep, ascending. Only boxes touching an overlap region take part
+    in NMS, which keeps the pairwise matrix small on large desktops.
+    """
+    candidates = np.arange(len(boxes))
+    if regions is not None:
+        r = np.asarray(regions, dtype=np.float64).reshape(-1, 4)
+        touches = ((boxes[:, None, 0] < r[None, :, 2]) & (boxes[:, None, 2] > r[None, :, 0]) &
+                   (boxes[:, None, 1] < r[None, :, 3]) & (boxes[:, None, 3] > r[None, :, 1])).any(axis=1)
+        candidates = np.flatnonzero(touches)
+    keep = np.ones(len(boxes), dtype=bool)
+    keep[candidates] = False
+    kept = nms(boxes[candidates], np.asarray(scores)[candidates], threshold,
+               None if labels is None else [labels[i] for i in candidates.tolist()])
+    keep[candidates[kept]] = True
+    return np.flatnonzero(keep)
+
+
+def join_fragments(boxes: np.ndarray, labels: Sequence[Any], cut: np.ndarray, regions: Sequence[Rect],
+                   min_iou=0.5) -> List[List[int]]:
+    """
+    Groups of indices that are pieces of one object split by tile edges. Two
+    boxes of the same label are joined when at least one was cut at a tile
+    edge and their parts inside a shared overlap region match (IoU >= min_iou).
+    Nested boxes of one class differ inside the overlap, so they stay apart.
+    Returns every index exactly once, groups ordered by their first member.
+    """
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    labels = np.asarray(labels, dtype=object)
+    for x1, y1, x2, y2 in regions:
+        inside = np.flatnonzero((boxes[:, 0] < x2) & (boxes[:, 2] > x1) & (boxes[:, 1] < y2) & (boxes[:, 3] > y1))
+        if len(inside) < 2:
+            continue
+        clipped = np.clip(boxes[inside], [x1, y1, x1, y1], [x2, y2, x2, y2])
+        pairs = (iou_matrix(clipped, clipped) >= min_iou) & (labels[inside][:, None] == labels[inside][None, :])
+        pairs &= cut[inside][:, None] | cut[inside][None, :]
+        for a, b in zip(*np.nonzero(np.triu(pairs, 1))):
+            parent[find(inside[a])] = find(inside[b])
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(groups.values())
+
+
+def merge_tiles(results: List[Dict[str, List[Dict[str, Any]]]], threshold=0.6,
+                regions: Optional[Sequence[Rect]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Concatenates per-tile results (already in global coordinates) and removes
+    duplicates from tile overlaps: detections by class and confidence, text by
+    box area, since the complete copy of a word is the larger one.
+    Detections cut at a tile edge (flagged 'tile_cut' by the worker) are first
+    joined with their pieces from neighbouring tiles into one union box, so
+    layouts wider than the overlap come out whole (see join_fragments).
+    regions: overlap areas in the same coordinates (None: consider every box,
+    and join nothing).
+    """
+    merged: Dict[str, List[Dict[str, Any]]] = {}
+    for group in ('layouts', 'elements'):
+        items = [d for r in results for d in r[group]]
+        boxes = np.array([d['box'] for d in items], dtype=np.float64).reshape(-1, 4)
+        if regions is not None and len(items):
+            cut = np.array([bool(d.get('tile_cut')) for d in items])
+            joined = []
+            for members in join_fragments(boxes, [d['class'] for d in items], cut, regions):
+                best = max(members, key=lambda i: items[i]['confidence'])
+                part = boxes[members]
+                joined.append({**items[best], 'box': [*part[:, :2].min(axis=0).tolist(), *part[:, 2:].max(axis=0).tolist()]})
+            items = joined
+            boxes = np.array([d['box'] for d in items], dtype=np.float64).reshape(-1, 4)
+        keep = _dedupe(boxes, [d['confidence'] for d in items], threshold, [d['class'] for d in items], regions)
+        merged[group] = [{k: v for k, v in items[i].items() if k != 'tile_cut'} for i in keep.tolist()]
+    text = [t for r in results for t in r['text']]
+    boxes = np.array([[*t['box'][0], *t['box'][2]] for t in text], dtype=np.float64).reshape(-1, 4)
+    keep = _dedupe(boxes, (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), threshold, None, regions)
+    merged['text'] = [text[i] for i in keep.tolist()]
+    return merged
+
+
+class SharedFrame:
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8):
+        """
+        A frame buffer in multiprocessing.shared_memory; workers attach by name
+        and read their tile without the frame being pickled.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * self.dtype.itemsize))
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, img: np.ndarray):
+        np.copyto(self.array, img)
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per worker process state, set up by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(detector_kwargs: Dict[str, Any], ocr: bool, threads: int):
+    from perception.detector import UIDetector
+    from perception.ocr import TextRecognizer
+    from utils.backends import configure_threads
+    configure_threads(threads)
+    _worker['detector'] = UIDetector(**detector_kwargs)
+    _worker['recognizer'] = TextRecognizer() if ocr else None
+    _worker['frames'] = {}
+
+
+def _open_shared(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to a segment owned by the parent without tracking it: a tracked
+    attachment is reported as leaked, and unlinked, when the worker exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    handle = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # Before 3.13 attaching registers the segment with this process's resource tracker
+        resource_tracker.unregister(handle._name, 'shared_memory')  # type: ignore[attr-defined]
+    return handle
+
+
+def _attach(slot: int, name: str, shape, dtype) -> np.ndarray:
+    frames = _worker['frames']
+    handle = frames.get(slot)
+    if handle is None or handle.name != name:
+        # The parent reallocated this monitor's buffer (resolution change): drop the old mapping
+        if handle is not None:
+            handle.close()
+        handle = frames[slot] = _open_shared(name)
+    return np.ndarray(shape, dtype=dtype, buffer=handle.buf)
+
+
+def _cut(box, tile: Rect, shape, margin=2) -> bool:
+    """
+    Whether a tile-space box touches a tile edge that is not a frame edge.
+    """
+    x1, y1, x2, y2 = tile
+    return ((x1 > 0 and box[0] <= margin) or (y1 > 0 and box[1] <= margin) or
+            (x2 < shape[1] and box[2] >= x2 - x1 - margin) or (y2 < shape[0] and box[3] >= y2 - y1 - margin))
+
+
+def _perceive_tile(slot: int, name: str, shape, dtype, tile: Rect,
+                   transform: Transform) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Runs in a worker: detection and OCR on one tile, returned in global
+    (virtual desktop) coordinates. Detections cut by the tile are flagged
+    'tile_cut' for merge_tiles.
+    """
+    x1, y1, x2, y2 = tile
+    img = np.ascontiguousarray(_attach(slot, name, shape, dtype)[y1:y2, x1:x2])
+    detections = _worker['detector'].detect(img)
+    text = _worker['recognizer'].recognize(img) if _worker['recognizer'] is not None else []
+    offset_x, offset_y, scale = transform
+
+    # Tile -> frame -> screen, as in ScreenCapturer.to_screen
+    def point(x, y):
+        return [(x + x1) / scale + offset_x, (y + y1) / scale + offset_y]
+
+    def box(b):
+        return point(b[0], b[1]) + point(b[2], b[3])
+
+    return {
+        'layouts': [{**d, 'box': box(d['box']), 'tile_cut': _cut(d['box'], tile, shape)} for d in detections['layouts']],
+        'elements': [{**d, 'box': box(d['box']), 'tile_cut': _cut(d['box'], tile, shape)} for d in detections['elements']],
+        'text': [{**t, 'box': [point(x, y) for x, y in t['box']]} for t in text]
+    }
+
+
+class _MonitorCapturer:
+    def __init__(self, monitors):
+        """
+        capture() returns every selected monitor, see ScreenCapturer.capture_monitors.
+        """
+        self.capturer = ScreenCapturer()
+        self.monitors = monitors
+        # Merged tile results are in screen coordinates already
+        self.last_transform = (0, 0, 1.0)
+
+    def capture(self, *args, **kwargs):
+        return self.capturer.capture_monitors(self.monitors)
+
+    def to_screen(self, box, transform=None):
+        return list(box)
+
+
+class TiledPerceptionEngine:
+    def __init__(self, workers=None, monitors=None, tile_size=1280, overlap=128, nms_threshold=0.6,
+                 ocr=True, backend='torch', threads=1, backend_cache_dir=None, start_method='spawn'):
+        """
+        Multi-monitor, tile-sharded perception for large desktops.
+        Each monitor (default: all) is captured into shared memory, cut into
+        overlapping tiles (tile_size=None: one per monitor), and tiles are
+        perceived in a pool of `workers` processes, each holding its own
+        single-threaded models. Tile results are merged (fragments joined,
+        duplicates suppressed) into one virtual-desktop coordinate space, so the
+        output is a regular perceive() dict and boxes are already screen
+        coordinates.
+        Every worker loads its own YOLO, CLIP and EasyOCR, roughly 1 GB of RAM
+        each, so the pool defaults to min(4, CPU count) processes.
+        threads: intra-op threads per worker (default 1: parallelism comes from
+        the pool); backend / backend_cache_dir: see utils.backends.
+        """
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.monitors = monitors
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.nms_threshold = nms_threshold
+        self.ocr = ocr
+        self.backend = backend
+        self.threads = threads or 1
+        self.backend_cache_dir = backend_cache_dir
+        self.start_method = start_method
+        self.capturer = _MonitorCapturer(monitors)
+        self.last_timings: Dict[str, float] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._frames: Dict[int, SharedFrame] = {}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=({'backend': self.backend, 'threads': self.threads,
+                           'backend_cache_dir': self.backend_cache_dir}, self.ocr, self.threads))
+        return self._pool
+
+    def _shared(self, slot: int, img: np.ndarray) -> SharedFrame:
+        frame = self._frames.get(slot)
+        if frame is None or frame.shape != img.shape or frame.dtype != img.dtype:
+            if frame is not None:
+                frame.close()
+            frame = self._frames[slot] = SharedFrame(img.shape, img.dtype)
+        frame.write(img)
+        return frame
+
+    def capture(self):
+        return self.capturer.capture()
+
+    def perceive(self, frame=None):
+        return self.process_frame(self.capture() if frame is None else frame)
+
+    def process_frame(self, frames: List[Tuple[np.ndarray, Transform]]):
+        """
+        frames: [(img, transform), ...] as returned by ScreenCapturer.capture_monitors().
+        """
+        pool = self._executor()
+        futures, regions = [], []
+        with metrics.span('tiling.dispatch'):
+            for slot, (img, transform) in enumerate(frames):
+                shared = self._shared(slot, img)
+                height, width = img.shape[:2]
+                tiles = make_tiles(width, height, self.tile_size, self.overlap)
+                for tile in tiles:
+                    futures.append(pool.submit(_perceive_tile, slot, shared.name, shared.shape, shared.dtype.str,
+                                               tile, transform))
+                offset_x, offset_y, scale = transform
+                regions += [(x1 / scale + offset_x, y1 / scale + offset_y, x2 / scale + offset_x, y2 / scale + offset_y)
+                            for x1, y1, x2, y2 in overlap_regions(tiles)]
+        with metrics.span('tiling.workers'):
+            results = [f.result() for f in futures]
+        with metrics.span('tiling.merge'):
+            merged = merge_tiles(results, self.nms_threshold, regions)
+        metrics.incr('tiling.tiles', len(futures))
+        # No single image spans every monitor; graph building does not need one
+        return {'image': frames[0][0] if len(frames) == 1 else None, **merged}
+
+    def make_capturer(self):
+        return _MonitorCapturer(self.monitors)
+
+    def to_screen(self, box):
+        # Tile results are merged in screen coordinates already
+        return list(box)
+
+    def models(self):
+        # Models live in the worker processes
+        return []
+
+    def reset(self):
+        pass
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for frame in self._frames.values():
+            frame.close()
+        self._frames = {}
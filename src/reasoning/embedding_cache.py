@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Sequence
+
+
+class EmbeddingCache:
+    def __init__(self, max_size=4096):
+        """
+        Bounded LRU cache of embeddings keyed by the exact string that was encoded.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._store: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get_many(self, keys: Sequence[Hashable], encode: Callable[[List[Hashable]], Sequence[Any]]) -> List[Any]:
+        """
+        Returns one embedding per key, in order.
+        All keys not in the cache are passed to encode() in a single batch,
+        each distinct key once.
+        """
+        results: List[Any] = [None] * len(keys)
+        missing: Dict[Hashable, List[int]] = OrderedDict()
+
+        for i, key in enumerate(keys):
+            if key in missing:
+                # Repeated within this batch: served by the pending encode
+                self.hits += 1
+                missing[key].append(i)
+            elif key in self._store:
+                self.hits += 1
+                self._store.move_to_end(key)
+                results[i] = self._store[key]
+            else:
+                self.misses += 1
+                missing[key] = [i]
+
+        if missing:
+            encoded = encode(list(missing))
+            for (key, positions), emb in zip(missing.items(), encoded):
+                self._put(key, emb)
+                for i in positions:
+                    results[i] = emb
+
+        return results
+
+    def _put(self, key: Hashable, value: Any):
+        self._store[key] = value
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    def clear(self):
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._store),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def __len__(self):
+        return len(self._store)
@@ -1,75 +1,298 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Callable, Set, Tuple
 import networkx as nx  # type: ignore
 import numpy as np
+from reasoning.spatial_index import GridIndex, box_centers
+from reasoning.hierarchy import as_boxes, containment_pairs
+from perception.scene import Scene, GROUP_LAYOUT
+from utils.metrics import metrics
+
+# Graph-level caches derived from the edges (graph.graph[...]), dropped whenever the graph changes
+DERIVED_KEYS = ('parents', 'candidates', 'lexical_index')
+
+
+def parent_map(graph) -> Dict[str, str]:
+    """
+    Child id -> its first parent_of source, in in_edges order. build_graph
+    precomputes it; otherwise it is derived in one pass and cached on the graph.
+    """
+    parents = graph.graph.get('parents')
+    if parents is None:
+        parents = {}
+        for child, preds in graph.pred.items():
+            for parent, data in preds.items():
+                if data.get('relation') == 'parent_of':
+                    parents[child] = parent
+                    break
+        graph.graph['parents'] = parents
+    return parents
 
 class UIGraphBuilder:
-    def __init__(self):
+    def __init__(self, containment_tree=False):
+        """
+        containment_tree: link each node only to its tightest enclosing layout
+        (and nest layouts) instead of to every enclosing layout.
+        """
+        self.graph = nx.DiGraph()
+        self.containment_tree = containment_tree
+        self.subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def reset(self):
+        """
+        Starts update_graph() from an empty graph; graphs returned earlier are
+        left untouched.
+        """
         self.graph = nx.DiGraph()
 
     def build_graph(self, perception_data):
-        self.graph.clear()
+        if isinstance(perception_data, Scene):
+            perception_data = perception_data.to_perception()
+        # A fresh graph each time: callers (e.g. the scene cache) may keep earlier ones
+        self.graph = nx.DiGraph()
+        nodes = self._collect_nodes(perception_data)
+
+        # Relationships are resolved on arrays; networkx is only populated at the end
+        boxes = as_boxes([attr['box'] for _, attr in nodes])
+        n_layouts = len(perception_data['layouts'])
+        with metrics.span('graph.hierarchy'):
+            parent_pairs = self._establish_hierarchy(boxes, n_layouts)
+        with metrics.span('graph.spatial'):
+            near_pairs = self._add_spatial_relationships(boxes, parent_pairs)
+
+        with metrics.span('graph.populate'):
+            self.graph.add_nodes_from(nodes)
+            self.graph.add_edges_from((nodes[p][0], nodes[c][0], {'relation': 'parent_of'})
+                                      for p, c in parent_pairs.tolist())
+            self.graph.add_edges_from((nodes[a][0], nodes[b][0], {'relation': 'near'})
+                                      for a, b in near_pairs.tolist())
+            # Pairs are sorted by parent, matching in_edges order: keep each child's first
+            parents: Dict[str, str] = {}
+            for p, c in parent_pairs.tolist():
+                parents.setdefault(nodes[c][0], nodes[p][0])
+            self.graph.graph['parents'] = parents
+        metrics.gauge('graph.nodes', len(nodes))
+        metrics.gauge('graph.edges', len(parent_pairs) + len(near_pairs))
+        return self.graph
+
+    def view(self, scene: Scene) -> "SceneGraphView":
+        """
+        Array-only graph over a Scene; the networkx graph is built on first access.
+        """
+        return SceneGraphView(self, scene)
+
+    def _collect_nodes(self, perception_data, key_by_track=False) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Node ids are positional (layout_3) or, with key_by_track, derived from the
+        TemporalManager track_id (layout_t42) so they survive reordering.
+        """
+        nodes = []
+
+        def node_id(prefix, i, item):
+            if key_by_track:
+                return f"{prefix}_t{item['track_id']}"
+            return f"{prefix}_{i}"
+
+        def with_track(attrs, item):
+            if 'track_id' in item:
+                attrs['track_id'] = item['track_id']
+            return attrs
         
         # 1. Add Layout Nodes (Containers)
         for i, lay in enumerate(perception_data['layouts']):
-            node_id = f"layout_{i}"
-            self.graph.add_node(node_id, 
+            nodes.append((node_id('layout', i, lay), with_track(dict(
                                type='layout',
                                class_name=lay['class'],
                                box=lay['box'],
                                confidence=lay['confidence'],
-                               semantic_label=f"container_{lay['class']}")
+                               semantic_label=f"container_{lay['class']}"), lay)))
             
         # 2. Add Element Nodes (Interaction Units)
         for i, el in enumerate(perception_data['elements']):
-            node_id = f"element_{i}"
-            self.graph.add_node(node_id,
+            nodes.append((node_id('element', i, el), with_track(dict(
                                type='element',
                                class_name=el['class'],
                                box=el['box'],
                                confidence=el['confidence'],
-                               semantic_label=el.get('semantic_tag', el['class']))
+                               semantic_label=el.get('semantic_tag', el['class'])), el)))
             
         # 3. Add Text Nodes (Semantic Anchors)
         for i, text_item in enumerate(perception_data['text']):
-            node_id = f"text_{i}"
             bbox = text_item['box']
             x1, y1 = bbox[0]
             x2, y2 = bbox[2]
             
-            self.graph.add_node(node_id,
+            nodes.append((node_id('text', i, text_item), with_track(dict(
                                type='text',
                                text=text_item['text'],
                                box=[x1, y1, x2, y2],
                                confidence=text_item['confidence'],
-                               semantic_label=text_item['text'])
+                               semantic_label=text_item['text']), text_item)))
+        return nodes
 
-        self._establish_hierarchy()
-        self._add_spatial_relationships()
-        return self.graph
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        Registers callback(change_set), called after every update_graph().
+        """
+        self.subscribers.append(callback)
+        return callback
 
-    def _establish_hierarchy(self):
+    def update_graph(self, perception_data, move_tolerance=2.0, threshold_px=80) -> Dict[str, Any]:
         """
-        Determines which elements are inside which layouts.
+        Patches self.graph in place from tracked perception data (items carrying
+        'track_id', see TemporalManager). Only nodes that appeared, disappeared or
+        moved by more than move_tolerance px get their parent_of/near edges
+        recomputed; the stored box of a node is its last committed position.
+        Returns the change set, which is also sent to subscribers.
         """
-        nodes = list(self.graph.nodes(data=True))
-        layouts = [n for n in nodes if n[1]['type'] == 'layout']
-        others = [n for n in nodes if n[1]['type'] != 'layout']
-        
-        for l_id, l_attr in layouts:
-            for o_id, o_attr in others:
-                if self._is_contained(o_attr['box'], l_attr['box']):  # type: ignore
-                    self.graph.add_edge(l_id, o_id, relation='parent_of')
-
-    def _add_spatial_relationships(self, threshold_px=80):
-        nodes = list(self.graph.nodes(data=True))
-        for i, (id1, attr1) in enumerate(nodes):
-            for j, (id2, attr2) in enumerate(nodes):
-                if i == j: continue
-                if self.graph.has_edge(id1, id2) or self.graph.has_edge(id2, id1):
+        new_nodes = self._collect_nodes(perception_data, key_by_track=True)
+        new_attrs = dict(new_nodes)
+        prev_ids = set(self.graph.nodes)
+
+        removed = [n for n in self.graph.nodes if n not in new_attrs]
+        removed_set = set(removed)
+        added = [n for n, _ in new_nodes if n not in prev_ids]
+        moved, updated = [], []
+        kept = [(n, attrs) for n, attrs in new_nodes if n in prev_ids]
+        if kept:
+            old_boxes = as_boxes([self.graph.nodes[n]['box'] for n, _ in kept])
+            new_boxes = as_boxes([attrs['box'] for _, attrs in kept])
+            shifted = np.abs(new_boxes - old_boxes).max(axis=1) > move_tolerance
+            for (n, attrs), is_moved in zip(kept, shifted.tolist()):
+                old = self.graph.nodes[n]
+                if is_moved:
+                    moved.append(n)
+                    old.update(attrs)
                     continue
-                
-                if self._is_near(attr1['box'], attr2['box'], threshold_px):  # type: ignore
-                    self.graph.add_edge(id1, id2, relation='near')
+                changed = {k: v for k, v in attrs.items() if k != 'box' and old.get(k) != v}
+                if changed:
+                    updated.append(n)
+                    old.update(changed)
+
+        changes: Dict[str, Any] = {
+            'added_nodes': added,
+            'removed_nodes': removed,
+            'moved_nodes': moved,
+            'updated_nodes': updated,
+            'added_edges': [],
+            'removed_edges': []
+        }
+        if removed or added or moved:
+            changes['removed_edges'].extend((u, v, d['relation']) for u, v, d in self.graph.edges(removed, data=True))
+            changes['removed_edges'].extend((u, v, d['relation']) for u, v, d in self.graph.in_edges(removed, data=True)
+                                            if u not in removed_set)
+            self.graph.remove_nodes_from(removed)
+            self.graph.add_nodes_from((n, new_attrs[n]) for n in added)
+            self._patch_edges(set(added) | set(moved), removed, changes, threshold_px)
+        if added or removed or moved or updated:
+            for key in DERIVED_KEYS:
+                self.graph.graph.pop(key, None)
+
+        for callback in self.subscribers:
+            callback(changes)
+        return changes
+
+    def _patch_edges(self, dirty: Set[str], removed: List[str], changes: Dict[str, Any], threshold_px):
+        ids = list(self.graph.nodes)
+        order = {n: i for i, n in enumerate(ids)}
+        types = [self.graph.nodes[n]['type'] for n in ids]
+        # Layouts first, matching the index layout used by _establish_hierarchy
+        layout_ids = [n for n, t in zip(ids, types) if t == 'layout']
+        other_ids = [n for n, t in zip(ids, types) if t != 'layout']
+        ordered = layout_ids + other_ids
+        boxes = as_boxes([self.graph.nodes[n]['box'] for n in ordered])
+
+        layouts_changed = any(n in dirty for n in layout_ids) or any(n.startswith('layout_') for n in removed)
+        children = set(ordered) if layouts_changed else {n for n in dirty}
+
+        # 1. Hierarchy: desired parent set for the affected children
+        desired: Set[Tuple[str, str]] = set()
+        for p, c in self._establish_hierarchy(boxes, len(layout_ids)).tolist():
+            if ordered[c] in children:
+                desired.add((ordered[p], ordered[c]))
+        current = {(p, c) for c in children for p, _, d in self.graph.in_edges(c, data=True)
+                   if d.get('relation') == 'parent_of'}
+
+        touched: Set[Tuple[str, str]] = set()
+        for p, c in sorted(current - desired, key=lambda e: (order[e[0]], order[e[1]])):
+            self.graph.remove_edge(p, c)
+            changes['removed_edges'].append((p, c, 'parent_of'))
+            touched.add((p, c))
+        for p, c in sorted(desired - current, key=lambda e: (order[e[0]], order[e[1]])):
+            for u, v in ((p, c), (c, p)):
+                if self.graph.has_edge(u, v):
+                    self.graph.remove_edge(u, v)
+                    changes['removed_edges'].append((u, v, 'near'))
+            self.graph.add_edge(p, c, relation='parent_of')
+            changes['added_edges'].append((p, c, 'parent_of'))
+
+        # 2. Proximity for dirty nodes against every node, plus pairs that lost a parent edge
+        centers = box_centers(as_boxes([self.graph.nodes[n]['box'] for n in ids]))
+
+        def linked(u, v):
+            return self.graph.has_edge(u, v) or self.graph.has_edge(v, u)
+
+        def set_near(u, v, want):
+            a, b = (u, v) if order[u] < order[v] else (v, u)
+            has = self.graph.has_edge(a, b) and self.graph.edges[a, b].get('relation') == 'near'
+            if want and not has and not linked(a, b):
+                self.graph.add_edge(a, b, relation='near')
+                changes['added_edges'].append((a, b, 'near'))
+            elif not want and has:
+                self.graph.remove_edge(a, b)
+                changes['removed_edges'].append((a, b, 'near'))
+
+        dirty_list = [n for n in ids if n in dirty]
+        if dirty_list:
+            d_idx = np.array([order[n] for n in dirty_list])
+            diff = centers[d_idx][:, None, :] - centers[None, :, :]
+            close = np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2) < threshold_px
+            for row, n in enumerate(dirty_list):
+                close_set = {ids[j] for j in np.flatnonzero(close[row]) if ids[j] != n}
+                neighbours = {v for _, v, d in self.graph.out_edges(n, data=True) if d.get('relation') == 'near'}
+                neighbours |= {u for u, _, d in self.graph.in_edges(n, data=True) if d.get('relation') == 'near'}
+                for m in sorted(neighbours - close_set, key=order.get):
+                    set_near(n, m, False)
+                for m in sorted(close_set - neighbours, key=order.get):
+                    set_near(n, m, True)
+
+        for p, c in sorted(touched, key=lambda e: (order[e[0]], order[e[1]])):
+            if p in dirty or c in dirty:
+                continue
+            dist = np.sqrt(np.sum((centers[order[p]] - centers[order[c]]) ** 2))
+            set_near(p, c, bool(dist < threshold_px))
+
+    def _establish_hierarchy(self, boxes: np.ndarray, n_layouts: int) -> np.ndarray:
+        """
+        Determines which elements are inside which layouts.
+        boxes holds the layouts first, then elements and text.
+        Returns (parent_idx, child_idx) pairs into boxes.
+        """
+        if n_layouts == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        layout_pairs, other_pairs = containment_pairs(
+            boxes[:n_layouts], boxes[n_layouts:], nearest=self.containment_tree)
+        other_pairs[:, 1] += n_layouts
+        return np.concatenate((layout_pairs, other_pairs))
+
+    def _add_spatial_relationships(self, boxes: np.ndarray, parent_pairs: np.ndarray,
+                                   threshold_px=80) -> np.ndarray:
+        """
+        Finds (i, j), i < j, pairs whose centres are closer than threshold_px and
+        that are not already linked by the hierarchy.
+        Uses a uniform grid so only neighbouring cells are compared; the result is
+        identical to an all-pairs scan in node order.
+        """
+        if len(boxes) < 2:
+            return np.empty((0, 2), dtype=np.int64)
+
+        pairs = GridIndex(box_centers(boxes), threshold_px).pairs_within(threshold_px)
+        if len(pairs) and len(parent_pairs):
+            # Hierarchy edges take precedence over proximity, in either direction
+            n = len(boxes)
+            linked = np.sort(parent_pairs, axis=1)
+            keep = ~np.isin(pairs[:, 0] * n + pairs[:, 1], linked[:, 0] * n + linked[:, 1])
+            pairs = pairs[keep]
+        return pairs
 
     def _is_contained(self, inner: List[float], outer: List[float]) -> bool:
         return (inner[0] >= outer[0] - 5 and inner[1] >= outer[1] - 5 and 
@@ -81,6 +304,77 @@ class UIGraphBuilder:
         dist = np.sqrt((c1[0]-c2[0])**2 + (c1[1]-c2[1])**2)
         return bool(dist < threshold)
 
+class SceneGraphView:
+    def __init__(self, builder: UIGraphBuilder, scene: Scene):
+        """
+        Relations of a Scene as index arrays (same rules as build_graph).
+        parent_pairs / near_pairs hold (i, j) row indices into the scene.
+        """
+        self.scene = scene
+        self._builder = builder
+        n_layouts = scene.count(GROUP_LAYOUT)
+        self.parent_pairs = builder._establish_hierarchy(scene.boxes, n_layouts)
+        self.near_pairs = builder._add_spatial_relationships(scene.boxes, self.parent_pairs)
+        self._graph = None
+        self._node_ids = None
+        # Set by ActionGroundingEngine on first use
+        self.lexical_index = None
+
+    @property
+    def node_ids(self) -> List[str]:
+        """
+        Node ids as build_graph would assign them, aligned with scene rows.
+        """
+        if self._node_ids is None:
+            prefixes = ('layout', 'element', 'text')
+            counters = [0, 0, 0]
+            ids = []
+            for group in self.scene.groups.tolist():
+                ids.append(f"{prefixes[group]}_{counters[group]}")
+                counters[group] += 1
+            self._node_ids = ids
+        return self._node_ids
+
+    def first_parents(self) -> np.ndarray:
+        """
+        Per row, the first parent_of source in graph edge order (-1 if none).
+        """
+        parents = np.full(len(self.scene), -1, dtype=np.int64)
+        # Pairs are sorted by parent, so the first hit per child is the smallest parent index
+        for p, c in self.parent_pairs[::-1].tolist():
+            parents[c] = p
+        return parents
+
+    def semantic_labels(self) -> List[str]:
+        """
+        The semantic_label build_graph would store for every row.
+        """
+        class_names = self.scene.class_names()
+        tags = self.scene.labels.lookup(self.scene.label_ids)
+        labels = []
+        for group, cls_name, tag in zip(self.scene.groups.tolist(), class_names, tags):
+            if group == GROUP_LAYOUT:
+                labels.append(f"container_{cls_name}")
+            else:
+                labels.append(tag if tag is not None else cls_name)
+        return labels
+
+    @property
+    def graph(self):
+        """
+        Lazily materialised networkx DiGraph, identical to build_graph(scene).
+        """
+        if self._graph is None:
+            nodes = self._builder._collect_nodes(self.scene.to_perception())
+            graph = nx.DiGraph()
+            graph.add_nodes_from(nodes)
+            graph.add_edges_from((nodes[p][0], nodes[c][0], {'relation': 'parent_of'})
+                                 for p, c in self.parent_pairs.tolist())
+            graph.add_edges_from((nodes[a][0], nodes[b][0], {'relation': 'near'})
+                                 for a, b in self.near_pairs.tolist())
+            self._graph = graph
+        return self._graph
+
 if __name__ == "__main__":
     # Dummy verification
     builder = UIGraphBuilder()
@@ -1,18 +1,128 @@
-from sentence_transformers import SentenceTransformer, util
-import torch
+import numpy as np
+from reasoning.embedding_cache import EmbeddingCache
+from reasoning.graph_builder import SceneGraphView, parent_map
+from reasoning.lexical_index import LexicalIndex
+from utils.lazy import LazyModel
+from utils.backends import check_backend, load_sentence_transformer
+from utils.metrics import metrics
 
 class ActionGroundingEngine:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_size=4096, intent_cache_size=256, top_k=32,
+                 backend='torch', threads=None, backend_cache_dir=None):
+        """
+        top_k: candidates per intent kept by the lexical (BM25) retrieval stage
+        for semantic rerank; intents sharing no terms with any label fall back to
+        every candidate. None disables retrieval and embeds every node.
+        backend: 'torch', 'int8' or 'onnx' encoder (see utils.backends).
+        """
+        self.top_k = top_k
+        check_backend(backend)
+        self.model = LazyModel(f"sentence_transformer:{model_name}",
+                               lambda: load_sentence_transformer(model_name, backend, backend_cache_dir, threads))
+        # Candidate labels and intents repeat across frames; only misses reach the model
+        self.label_cache = EmbeddingCache(cache_size)
+        self.intent_cache = EmbeddingCache(intent_cache_size)
 
     def ground(self, intent, ui_graph):
         """
         Matches intent to the most relevant node in the UI Graph using 
         multimodal attributes (text, type, hierarchy).
         """
+        return self.ground_many([intent], ui_graph)[0]
+
+    def ground_many(self, intents, ui_graph):
+        """
+        Grounds several intents against the same graph. Candidate labels are
+        built once; a lexical index shortlists top_k candidates per intent, and
+        the union of shortlists is embedded once and scored in one similarity
+        matrix, each intent only against its own shortlist.
+        Returns one (node_id, confidence, action_type) tuple per intent.
+        """
+        intents = list(intents)
+        if not intents:
+            return []
+        if isinstance(ui_graph, SceneGraphView):
+            node_ids, candidates, node_attrs = self._scene_candidates(ui_graph)
+        else:
+            node_ids, candidates = self._graph_candidates(ui_graph)
+            node_attrs = lambda i: ui_graph.nodes[node_ids[i]]
+        if not node_ids:
+            return [(None, 0.0, None) for _ in intents]
+
+        import torch  # type: ignore
+        from sentence_transformers import util  # type: ignore
+
+        with metrics.span('grounding.retrieval'):
+            rows, allowed = self._shortlist(intents, candidates, ui_graph)
+
+        # Encode and calculate similarity
+        with metrics.span('grounding.encode'):
+            intent_embeddings = torch.stack(self.intent_cache.get_many(intents, self._encode))
+            candidate_embeddings = torch.stack(self.label_cache.get_many([candidates[i] for i in rows], self._encode))
+        metrics.gauge('grounding.candidates', len(candidates))
+        metrics.gauge('grounding.reranked', len(rows))
+        metrics.gauge('grounding.label_cache_hits', self.label_cache.hits)
+        metrics.gauge('grounding.label_cache_misses', self.label_cache.misses)
+
+        with metrics.span('grounding.scoring'):
+            cos_scores = util.cos_sim(intent_embeddings, candidate_embeddings)
+            if allowed is not None:
+                cos_scores = cos_scores.masked_fill(torch.from_numpy(~allowed).to(cos_scores.device), float('-inf'))
+            best_indices = torch.argmax(cos_scores, dim=1).tolist()
+        
+        results = []
+        for intent, scores, best_idx in zip(intents, cos_scores, best_indices):
+            best_node_id = node_ids[rows[best_idx]]
+            confidence = float(scores[best_idx])
+            
+            # Action inference logic
+            action_type = self._infer_action(intent, node_attrs(rows[best_idx]))
+            results.append((best_node_id, confidence, action_type))
+            
+        return results
+
+    def _shortlist(self, intents, candidates, ui_graph):
+        """
+        Returns (rows, allowed): candidate rows to embed, and an
+        (intents x rows) bool mask of each intent's shortlist (None: all allowed).
+        """
+        if self.top_k is None or len(candidates) <= self.top_k:
+            return list(range(len(candidates))), None
+        index = self._lexical_index(ui_graph, candidates)
+        shortlists = [index.top_k(intent, self.top_k) for intent in intents]
+        if any(len(hits) == 0 for hits in shortlists):
+            # No lexical evidence for some intent: it is scored against everything
+            rows = np.arange(len(candidates))
+        else:
+            rows = np.unique(np.concatenate(shortlists))
+        allowed = np.zeros((len(intents), len(rows)), dtype=bool)
+        for i, hits in enumerate(shortlists):
+            if len(hits):
+                allowed[i, np.searchsorted(rows, hits)] = True
+            else:
+                allowed[i] = True
+        return rows.tolist(), allowed
+
+    @staticmethod
+    def _lexical_index(ui_graph, candidates):
+        """
+        Index over the candidate labels, cached with the graph it describes.
+        """
+        if isinstance(ui_graph, SceneGraphView):
+            if ui_graph.lexical_index is None:
+                ui_graph.lexical_index = LexicalIndex(candidates)
+            return ui_graph.lexical_index
+        index = ui_graph.graph.get('lexical_index')
+        if index is None:
+            index = ui_graph.graph['lexical_index'] = LexicalIndex(candidates)
+        return index
+
+    def _graph_candidates(self, ui_graph):
+        cached = ui_graph.graph.get('candidates')
+        if cached is not None:
+            return cached
         nodes = list(ui_graph.nodes(data=True))
-        if not nodes:
-            return None, 0.0, None
+        parents = parent_map(ui_graph)
 
         # Prepare augmented candidates
         candidates = []
@@ -24,30 +134,45 @@ class ActionGroundingEngine:
             base_label = attr.get('semantic_label', attr.get('text', attr.get('class_name', "")))
             
             # Find parent context
-            parents = [p for p, c, d in ui_graph.in_edges(node_id, data=True) if d.get('relation') == 'parent_of']
+            parent = parents.get(node_id)
             parent_context = ""
-            if parents:
-                p_attr = ui_graph.nodes[parents[0]]
+            if parent is not None:
+                p_attr = ui_graph.nodes[parent]
                 parent_context = f" inside {p_attr.get('semantic_label', p_attr.get('class_name', 'container'))}"
             
             augmented_label = f"{base_label}{parent_context}"
             candidates.append(augmented_label)
             node_ids.append(node_id)
+        ui_graph.graph['candidates'] = (node_ids, candidates)
+        return node_ids, candidates
 
-        # Encode and calculate similarity
-        intent_embedding = self.model.encode(intent, convert_to_tensor=True)
-        candidate_embeddings = self.model.encode(candidates, convert_to_tensor=True)
-        
-        cos_scores = util.cos_sim(intent_embedding, candidate_embeddings)[0]
-        best_idx = torch.argmax(cos_scores).item()
-        
-        best_node_id = node_ids[best_idx]
-        confidence = float(cos_scores[best_idx])
-        
-        # Action inference logic
-        action_type = self._infer_action(intent, ui_graph.nodes[best_node_id])
-            
-        return best_node_id, confidence, action_type
+    def _scene_candidates(self, view):
+        """
+        Same augmented labels as _graph_candidates, read straight from the scene arrays.
+        """
+        labels = view.semantic_labels()
+        parents = view.first_parents().tolist()
+        candidates = [f"{label} inside {labels[p]}" if p >= 0 else label
+                      for label, p in zip(labels, parents)]
+        class_names = view.scene.class_names()
+        return view.node_ids, candidates, lambda i: {'class_name': class_names[i]}
+
+    def _encode(self, texts):
+        """
+        Encodes a batch of strings in one model call, one tensor per string.
+        Rows are cloned so cached entries do not pin the whole batch tensor.
+        """
+        embeddings = self.model.encode(list(texts), convert_to_tensor=True)
+        return [row.clone() for row in embeddings]
+
+    def models(self):
+        return [self.model]
+
+    def cache_stats(self):
+        return {
+            'labels': self.label_cache.stats(),
+            'intents': self.intent_cache.stats()
+        }
 
     def _infer_action(self, intent, target_node):
         intent_low = intent.lower()
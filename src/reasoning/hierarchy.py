@@ -0,0 +1,73 @@
+from typing import Tuple
+import numpy as np
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """
+    Normalises a sequence of [x1, y1, x2, y2] boxes to an (n, 4) float64 array.
+    """
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def containment_matrix(outer: np.ndarray, inner: np.ndarray, margin: float = 5.0) -> np.ndarray:
+    """
+    Broadcast version of UIGraphBuilder._is_contained.
+    Returns a (len(outer), len(inner)) bool matrix, True where inner[j] lies in outer[i].
+    """
+    outer = as_boxes(outer)
+    inner = as_boxes(inner)
+    return ((inner[None, :, 0] >= outer[:, None, 0] - margin) &
+            (inner[None, :, 1] >= outer[:, None, 1] - margin) &
+            (inner[None, :, 2] <= outer[:, None, 2] + margin) &
+            (inner[None, :, 3] <= outer[:, None, 3] + margin))
+
+
+def _areas(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def _tightest(contains: np.ndarray, areas: np.ndarray) -> np.ndarray:
+    """
+    For each column, the row index of the smallest containing box (or -1).
+    """
+    if contains.shape[0] == 0:
+        return np.full(contains.shape[1], -1, dtype=np.int64)
+    masked = np.where(contains, areas[:, None], np.inf)
+    best = np.argmin(masked, axis=0)
+    return np.where(contains.any(axis=0), best, -1)
+
+
+def _as_pairs(parents: np.ndarray) -> np.ndarray:
+    children = np.flatnonzero(parents >= 0)
+    pairs = np.stack((parents[children], children), axis=1).astype(np.int64)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def containment_pairs(layout_boxes, other_boxes, margin: float = 5.0,
+                      nearest: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes parent_of relations as index pairs, without touching the graph.
+
+    Returns (layout_pairs, other_pairs), each an (k, 2) array of
+    (parent_layout_idx, child_idx) sorted by parent then child.
+    - nearest=False: every enclosing layout parents every contained element/text,
+      and layouts are not linked to each other (legacy behaviour).
+    - nearest=True: each element/text and each nested layout gets only its
+      tightest enclosing layout, which yields a containment tree.
+    """
+    layouts = as_boxes(layout_boxes)
+    others = as_boxes(other_boxes)
+    contains = containment_matrix(layouts, others, margin)
+
+    if not nearest:
+        return np.empty((0, 2), dtype=np.int64), np.argwhere(contains).astype(np.int64)
+
+    areas = _areas(layouts)
+    nested = containment_matrix(layouts, layouts, margin)
+    # A layout may only be parented by a strictly larger one; identical boxes
+    # fall back to detection order so the result stays acyclic.
+    idx = np.arange(len(layouts))
+    larger = (areas[:, None] > areas[None, :]) | ((areas[:, None] == areas[None, :]) & (idx[:, None] < idx[None, :]))
+    nested &= larger
+
+    return _as_pairs(_tightest(nested, areas)), _as_pairs(_tightest(contains, areas))
@@ -0,0 +1,86 @@
+from typing import Dict, List, Sequence, Tuple
+import re
+import numpy as np
+
+# Intent filler that says nothing about the target
+STOPWORDS = frozenset(['the', 'a', 'an', 'on', 'in', 'inside', 'into', 'to', 'of', 'and', 'at', 'for',
+                       'please', 'click', 'tap', 'press', 'select'])
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase alphanumeric words; underscores split ('container_form' -> container, form).
+    """
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def trigrams(token: str) -> List[str]:
+    padded = f"#{token}#"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class LexicalIndex:
+    def __init__(self, labels: Sequence[str], k1=1.2, b=0.75, trigram_weight=0.3):
+        """
+        Inverted index over candidate labels with BM25 scoring.
+        Terms are whole tokens plus character trigrams (weighted by
+        trigram_weight), so OCR typos and partial words still match.
+        """
+        self.size = len(labels)
+        self.k1 = k1
+        self.b = b
+        self.trigram_weight = trigram_weight
+        # Labels repeat a lot on real screens: index each distinct label once and
+        # count repeats as documents, which keeps the BM25 statistics exact
+        distinct, self._inverse, multiplicity = np.unique(np.array(labels, dtype=object),
+                                                          return_inverse=True, return_counts=True)
+        doc_terms = [self._terms(label) for label in distinct.tolist()]
+        lengths = np.array([sum(tf.values()) for tf in doc_terms], dtype=np.float64)
+        avg_length = float((lengths * multiplicity).sum() / self.size) if self.size else 0.0
+        avg_length = avg_length or 1.0
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for doc, tf in enumerate(doc_terms):
+            for term, count in tf.items():
+                docs, counts = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                counts.append(count)
+
+        # Per-term (distinct label ids, BM25 weight), precomputed so a query is a few scatter-adds
+        norm = k1 * (1 - b + b * lengths / avg_length)
+        self._distinct = len(distinct)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, (docs, counts) in postings.items():
+            docs_arr = np.array(docs, dtype=np.int64)
+            tf_arr = np.array(counts, dtype=np.float64)
+            df = multiplicity[docs_arr].sum()
+            idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            self.postings[term] = (docs_arr, idf * tf_arr * (k1 + 1) / (tf_arr + norm[docs_arr]))
+
+    def _terms(self, text: str) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for token in tokenize(text):
+            terms[f"w:{token}"] = terms.get(f"w:{token}", 0) + 1
+            for gram in trigrams(token):
+                terms[gram] = terms.get(gram, 0) + self.trigram_weight
+        return terms
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self._distinct, dtype=np.float64)
+        for term, weight in self._terms(query).items():
+            posting = self.postings.get(term)
+            if posting is not None:
+                docs, term_scores = posting
+                scores[docs] += weight * term_scores
+        return scores[self._inverse]
+
+    def top_k(self, query: str, k: int) -> np.ndarray:
+        """
+        Indices of up to k labels with a positive score, best first (ties by index).
+        """
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        return hits[np.lexsort((hits, -scores[hits]))]
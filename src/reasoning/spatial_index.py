@@ -0,0 +1,78 @@
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Half neighbourhood of a grid cell. Together with the cell itself these
+# offsets visit every pair of adjacent cells exactly once.
+_FORWARD_NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class GridIndex:
+    def __init__(self, centers: np.ndarray, cell_size: float):
+        """
+        Uniform grid over box centres.
+        Cell size equals the query radius, so any two centres closer than
+        the radius live in the same or in adjacent cells.
+        """
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+
+        if len(self.centers) == 0 or self.cell_size <= 0:
+            return
+
+        keys = np.floor(self.centers / self.cell_size).astype(np.int64)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        sorted_keys = keys[order]
+        # Boundaries where the (cx, cy) key changes
+        change = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+        starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+        ends = np.concatenate((starts[1:], [len(order)]))
+        for s, e in zip(starts, ends):
+            cx, cy = sorted_keys[s]
+            self.cells[(int(cx), int(cy))] = order[s:e]
+
+    def pairs_within(self, radius: float) -> np.ndarray:
+        """
+        Returns every index pair (i, j) with i < j whose centres are strictly
+        closer than radius, sorted lexicographically. Shape (k, 2).
+        """
+        if radius <= 0 or not self.cells:
+            return np.empty((0, 2), dtype=np.int64)
+
+        found: List[np.ndarray] = []
+        for (cx, cy), members in self.cells.items():
+            # Same cell: upper triangle only
+            if len(members) > 1:
+                found.append(self._match(members, members, radius, same=True))
+            for dx, dy in _FORWARD_NEIGHBOURS:
+                other = self.cells.get((cx + dx, cy + dy))
+                if other is not None:
+                    found.append(self._match(members, other, radius, same=False))
+
+        if not found:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = np.concatenate(found)
+        if len(pairs) == 0:
+            return pairs
+        pairs = np.sort(pairs, axis=1)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def _match(self, a: np.ndarray, b: np.ndarray, radius: float, same: bool) -> np.ndarray:
+        ca = self.centers[a]
+        cb = self.centers[b]
+        dx = ca[:, None, 0] - cb[None, :, 0]
+        dy = ca[:, None, 1] - cb[None, :, 1]
+        # Same arithmetic as UIGraphBuilder._is_near so results match bit for bit
+        close = np.sqrt(dx ** 2 + dy ** 2) < radius
+        if same:
+            close = np.triu(close, k=1)
+        ia, ib = np.nonzero(close)
+        return np.stack((a[ia], b[ib]), axis=1).astype(np.int64)
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    """
+    boxes: (n, 4) array of [x1, y1, x2, y2]
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2), axis=1)
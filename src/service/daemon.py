@@ -0,0 +1,134 @@
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+import os
+import queue
+import socketserver
+import threading
+from service.ipc import Address, decode, encode
+from utils.metrics import metrics
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon: "VIGADaemon" = self.server.viga  # type: ignore
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = decode(line)
+            except ValueError as e:
+                self.wfile.write(encode({'ok': False, 'error': f"bad request: {e}"}))
+                self.wfile.flush()
+                continue
+            if not isinstance(message, dict):
+                self.wfile.write(encode({'ok': False, 'error': 'bad request'}))
+                self.wfile.flush()
+                continue
+            reply = daemon.dispatch(message)
+            reply['id'] = message.get('id')
+            self.wfile.write(encode(reply))
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class VIGADaemon:
+    def __init__(self, agent, address: Address):
+        """
+        Keeps one VIGAAgent (and its models) resident and serves intents over a
+        local socket with a line-delimited JSON protocol:
+            {"op": "ground", "intent": "..."} -> {"ok": true, "result": {...}}
+            {"op": "ping"} / {"op": "stats"} / {"op": "shutdown"}
+            {"op": "invalidate"}  (drop results cached for the current screen)
+            {"op": "metrics", "format": "json" | "prometheus"}
+        Client connections are handled concurrently; grounding requests go
+        through one queue and a single worker, and everything queued while the
+        worker was busy is grounded together against one perception pass.
+        """
+        self.agent = agent
+        self.address = address
+        self.requests: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self.served = 0
+        self._server = None
+        self._worker = threading.Thread(target=self._work, name="viga-daemon-worker", daemon=True)
+
+    def dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        op = message.get('op', 'ground')
+        try:
+            if op == 'ping':
+                return {'ok': True, 'result': 'pong'}
+            if op == 'stats':
+                return {'ok': True, 'result': self.stats()}
+            if op == 'metrics':
+                if message.get('format') == 'prometheus':
+                    return {'ok': True, 'result': metrics.prometheus_text()}
+                return {'ok': True, 'result': metrics.snapshot()}
+            if op == 'invalidate':
+                self.agent.invalidate_scene_cache()
+                return {'ok': True, 'result': 'invalidated'}
+            if op == 'shutdown':
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {'ok': True, 'result': 'shutting down'}
+            if op == 'ground':
+                intent = message.get('intent')
+                if not isinstance(intent, str) or not intent.strip():
+                    return {'ok': False, 'error': "'intent' must be a non-empty string"}
+                future: Future = Future()
+                self.requests.put((intent, future))
+                return {'ok': True, 'result': future.result()}
+            return {'ok': False, 'error': f"unknown op: {op}"}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    def _work(self):
+        while True:
+            batch: List[Tuple[str, Future]] = [self.requests.get()]
+            while True:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self.agent.ground_intents([intent for intent, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self.served += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'served': self.served,
+            'queued': self.requests.qsize(),
+            'model_load_ms': self.agent.model_load_report(),
+            'scene_cache': self.agent.scene_cache.stats() if self.agent.scene_cache is not None else None
+        }
+
+    def serve_forever(self):
+        if isinstance(self.address, tuple):
+            self._server = _TCPServer(self.address, _Handler)
+        else:
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = _UnixServer(self.address, _Handler)
+        self._server.viga = self  # type: ignore
+        self._worker.start()
+        print(f"VIGA daemon listening on {self.address}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if not isinstance(self.address, tuple) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,47 @@
+from typing import Any, Dict, Optional, Tuple, Union
+import json
+import os
+import socket
+import tempfile
+
+DEFAULT_PORT = 8765
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "viga.sock")
+
+Address = Union[str, Tuple[str, int]]
+
+
+def resolve_address(socket_path: Optional[str] = None, port: Optional[int] = None) -> Address:
+    """
+    Unix domain socket where the platform has one, otherwise TCP on localhost.
+    An explicit port always selects TCP.
+    """
+    if port is not None or not hasattr(socket, 'AF_UNIX'):
+        return ('127.0.0.1', port or DEFAULT_PORT)
+    return socket_path or DEFAULT_SOCKET
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    """
+    Protocol framing: one JSON object per line.
+    """
+    return (json.dumps(message) + "\n").encode('utf-8')
+
+
+def decode(line: bytes) -> Dict[str, Any]:
+    return json.loads(line.decode('utf-8'))
+
+
+def request(message: Dict[str, Any], address: Address, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Sends one request and waits for its reply.
+    """
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(encode(message))
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("VIGA daemon closed the connection without replying")
+    return decode(line)
@@ -0,0 +1,202 @@
+from typing import Any, Optional
+import hashlib
+import os
+import re
+import shutil
+import sys
+
+# Inference implementations selectable per model:
+#   torch  eager fp32 (the default, and the only one that uses CUDA)
+#   int8   torch dynamic int8 quantization of Linear layers (CPU)
+#   onnx   ONNX Runtime on graphs exported once and cached under cache_dir (CPU)
+BACKENDS = ('torch', 'int8', 'onnx')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'viga', 'backends')
+
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    return backend
+
+
+# Intra-op thread count waiting for the first model load (see configure_threads)
+_pending_threads: Optional[int] = None
+
+
+def configure_threads(threads: Optional[int]):
+    """
+    Intra-op thread count for torch (ONNX Runtime sessions take it via session_options).
+    Importing torch is slow, so unless it is already loaded the setting is
+    only recorded and applied by apply_threads() on the first model load.
+    """
+    global _pending_threads
+    if not threads:
+        return
+    _pending_threads = threads
+    if sys.modules.get('torch') is not None:
+        apply_threads()
+
+
+def apply_threads():
+    """
+    Applies a thread count recorded by configure_threads; called by the model loaders.
+    """
+    global _pending_threads
+    threads, _pending_threads = _pending_threads, None
+    if threads:
+        import torch  # type: ignore
+        torch.set_num_threads(threads)
+
+
+def session_options(threads: Optional[int] = None):
+    import onnxruntime as ort  # type: ignore
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+    return options
+
+
+def cache_path(cache_dir: Optional[str], name: str, suffix: str = '') -> str:
+    """
+    Stable on-disk location for an exported model derived from its name or weights path.
+    """
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_')
+    directory = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, slug + suffix)
+
+
+def quantize_int8(model: Any) -> Any:
+    """
+    Dynamic int8 quantization: Linear weights are stored as int8 and activations
+    quantized on the fly. Pays off for transformer models (CLIP, MiniLM).
+    """
+    import torch  # type: ignore
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def weights_key(weights: str) -> str:
+    """
+    Cache name for exports of a weights file: its stem plus a hash of its
+    contents, so two different best.pt files never share an export. Names
+    that are not local files (downloaded by ultralytics) are used as is.
+    """
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    if not os.path.isfile(weights):
+        return stem
+    digest = hashlib.sha1()
+    with open(weights, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"{stem}-{digest.hexdigest()[:12]}"
+
+
+def load_yolo(weights: str, backend: str = 'torch', cache_dir: Optional[str] = None,
+              threads: Optional[int] = None):
+    """
+    Ultralytics YOLO. The 'onnx' backend exports once and loads the .onnx file,
+    which ultralytics runs through ONNX Runtime with the same Results API.
+    YOLO is convolutional, so 'int8' dynamic quantization has nothing to act on
+    and it stays eager fp32.
+    """
+    from ultralytics import YOLO  # type: ignore
+    apply_threads()
+    if check_backend(backend) != 'onnx':
+        return YOLO(weights)
+    path = cache_path(cache_dir, weights_key(weights), '.onnx')
+    if not os.path.exists(path):
+        exported = YOLO(weights).export(format='onnx', dynamic=True, simplify=True)
+        shutil.move(str(exported), path)
+    model = YOLO(path, task='detect')
+    if threads:
+        import numpy as np
+        import onnxruntime as ort  # type: ignore
+        # ultralytics builds its session on the first predict, without options: build it, then swap it
+        model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+        model.predictor.model.session = ort.InferenceSession(path, session_options(threads),
+                                                             providers=['CPUExecutionProvider'])
+    return model
+
+
+class OnnxCLIP:
+    def __init__(self, model, path: str, threads: Optional[int] = None):
+        """
+        CLIP whose image tower (called per frame) runs in ONNX Runtime; the text
+        tower (called once per label vocabulary) stays in torch. The exported
+        graph is cached at path.
+        """
+        import onnxruntime as ort  # type: ignore
+        if not os.path.exists(path):
+            self._export(model, path)
+        self.model = model
+        self.session = ort.InferenceSession(path, session_options(threads), providers=['CPUExecutionProvider'])
+
+    @staticmethod
+    def _export(model, path):
+        import torch  # type: ignore
+
+        class ImageFeatures(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, pixel_values):
+                return self.model.get_image_features(pixel_values=pixel_values)
+
+        tmp = path + '.tmp'
+        dummy = torch.zeros(1, 3, 224, 224)
+        torch.onnx.export(ImageFeatures().eval(), (dummy,), tmp, input_names=['pixel_values'],
+                          output_names=['image_embeds'], opset_version=17,
+                          dynamic_axes={'pixel_values': {0: 'batch'}, 'image_embeds': {0: 'batch'}})
+        os.replace(tmp, path)
+
+    def get_image_features(self, pixel_values, **_):
+        import torch  # type: ignore
+        (embeds,) = self.session.run(None, {'pixel_values': pixel_values.cpu().numpy()})
+        return torch.from_numpy(embeds)
+
+    def get_text_features(self, **inputs):
+        return self.model.get_text_features(**inputs)
+
+    def to(self, device):
+        return self
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.model, attr)
+
+
+def load_clip(name: str, backend: str = 'torch', device: str = 'cpu', cache_dir: Optional[str] = None,
+              threads: Optional[int] = None):
+    from transformers import CLIPModel  # type: ignore
+    apply_threads()
+    model = CLIPModel.from_pretrained(name).eval()
+    if check_backend(backend) == 'int8':
+        return quantize_int8(model)
+    if backend == 'onnx':
+        return OnnxCLIP(model, cache_path(cache_dir, name, '.image.onnx'), threads)
+    return model.to(device)
+
+
+def load_sentence_transformer(name: str, backend: str = 'torch', cache_dir: Optional[str] = None,
+                              threads: Optional[int] = None):
+    """
+    The 'onnx' backend uses sentence-transformers' own ONNX support; the first
+    load exports the model and saves it under cache_dir for later runs.
+    """
+    from sentence_transformers import SentenceTransformer  # type: ignore
+    apply_threads()
+    if check_backend(backend) == 'torch':
+        return SentenceTransformer(name)
+    if backend == 'int8':
+        return quantize_int8(SentenceTransformer(name, device='cpu'))
+    path = cache_path(cache_dir, name)
+    model_kwargs = {'provider': 'CPUExecutionProvider', 'session_options': session_options(threads)}
+    if os.path.isdir(path):
+        return SentenceTransformer(path, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+    model = SentenceTransformer(name, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+    model.save_pretrained(path)
+    return model
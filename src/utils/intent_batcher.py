@@ -0,0 +1,50 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+
+
+class IntentBatcher:
+    def __init__(self, process_batch: Callable[[List[str]], List[Any]], window=0.05,
+                 executor: Optional[Executor] = None):
+        """
+        Collects intents submitted within `window` seconds of each other and
+        resolves them with a single process_batch(intents) call.
+        process_batch is blocking (perception, graph, grounding) and runs on
+        `executor`, one batch at a time, so the event loop stays responsive.
+        """
+        self.process_batch = process_batch
+        self.window = window
+        # Models are not safe to drive from several threads at once
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="viga-batch")
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, intent: str) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((intent, future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, []
+        # Intents arriving while this batch runs open the next window
+        self._flush_task = None
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.process_batch, [i for i, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
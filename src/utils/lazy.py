@@ -0,0 +1,75 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import threading
+import time
+
+
+class LazyModel:
+    def __init__(self, name: str, factory: Callable[[], Any], verbose=True):
+        """
+        Handle that constructs a model on first use (thread-safe, at most once).
+        Calls and attribute access are forwarded to the loaded model, so the
+        handle can stand in for it, e.g. lazy_yolo(img, verbose=False).
+        """
+        self.name = name
+        self.factory = factory
+        self.verbose = verbose
+        self.load_time_ms: Optional[float] = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    model = self.factory()
+                    self.load_time_ms = (time.perf_counter() - start) * 1000
+                    self._model = model
+                    if self.verbose:
+                        print(f"      Loaded {self.name} in {self.load_time_ms:.0f}ms")
+        return self._model
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not defined on the handle itself
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+def warm_up(models: Iterable[LazyModel]) -> List[Future]:
+    """
+    Loads every handle on its own background thread, in parallel.
+    Returns one future per model; result() is the loaded model.
+    """
+    futures = []
+    seen = set()
+    for model in models:
+        if id(model) in seen:
+            continue
+        seen.add(id(model))
+        future: Future = Future()
+
+        def load(m=model, f=future):
+            try:
+                f.set_result(m.get())
+            except BaseException as e:
+                f.set_exception(e)
+
+        threading.Thread(target=load, name=f"viga-warmup-{model.name}", daemon=True).start()
+        futures.append(future)
+    return futures
+
+
+def load_report(models: Iterable[LazyModel]) -> Dict[str, Optional[float]]:
+    """
+    Load time in ms per model name (None if not loaded yet).
+    """
+    return {m.name: m.load_time_ms for m in models}
@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Any, Dict, Optional
+import json
+import threading
+import time
+
+import numpy as np
+
+
+class Span:
+    def __init__(self, registry: "MetricsRegistry", name: str):
+        self.registry = registry
+        self.name = name
+        self.ms = 0.0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ms = (time.perf_counter() - self._start) * 1000
+        self.registry.observe(self.name, self.ms)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, window=1024):
+        """
+        Timing histograms (rolling window of the last `window` samples, in ms),
+        monotonic counters and last-value gauges. Thread-safe.
+        """
+        self.window = window
+        self.timings: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._sink = None
+
+    def span(self, name: str) -> Span:
+        """
+        with metrics.span('perception.detect') as s: ...   # s.ms afterwards
+        """
+        return Span(self, name)
+
+    def observe(self, name: str, ms: float):
+        with self._lock:
+            samples = self.timings.get(name)
+            if samples is None:
+                samples = self.timings[name] = deque(maxlen=self.window)
+            samples.append(ms)
+            self.counts[name] = self.counts.get(name, 0) + 1
+            sink = self._sink
+        if sink is not None:
+            self._emit({'type': 'span', 'name': name, 'ms': ms, 'ts': time.time()})
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def summary(self, name: str) -> Dict[str, float]:
+        with self._lock:
+            samples = np.array(self.timings.get(name, ()), dtype=np.float64)
+            count = self.counts.get(name, 0)
+        if not len(samples):
+            return {'count': count}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {'count': count, 'mean': float(samples.mean()), 'p50': float(p50),
+                'p95': float(p95), 'p99': float(p99), 'max': float(samples.max())}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            names = list(self.timings)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        return {
+            'ts': time.time(),
+            'timings_ms': {name: self.summary(name) for name in names},
+            'counters': counters,
+            'gauges': gauges
+        }
+
+    def to_json_line(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def stream_to(self, path: Optional[str]):
+        """
+        Appends every span as a JSON line to path (None stops streaming).
+        """
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+            self._sink = open(path, 'a', encoding='utf-8') if path else None
+
+    def _emit(self, event: Dict[str, Any]):
+        with self._lock:
+            if self._sink is not None:
+                self._sink.write(json.dumps(event) + "\n")
+                self._sink.flush()
+
+    def prometheus_text(self, prefix='viga') -> str:
+        """
+        Prometheus text exposition: summaries for timings, counters and gauges.
+        """
+        snap = self.snapshot()
+        lines = []
+        for name, stats in snap['timings_ms'].items():
+            metric = f"{prefix}_{_sanitize(name)}_ms"
+            lines.append(f"# TYPE {metric} summary")
+            for q in ('p50', 'p95', 'p99'):
+                if q in stats:
+                    lines.append(f'{metric}{{quantile="0.{q[1:]}"}} {stats[q]:.3f}')
+            lines.append(f"{metric}_count {stats['count']}")
+        for name, value in snap['counters'].items():
+            metric = f"{prefix}_{_sanitize(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in snap['gauges'].items():
+            metric = f"{prefix}_{_sanitize(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counts.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+def _sanitize(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+# Process-wide registry used by the pipeline stages
+metrics = MetricsRegistry()
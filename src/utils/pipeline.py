@@ -0,0 +1,179 @@
+from collections import deque
+from typing import Any, Callable, Iterator, Optional, Tuple
+import queue
+import threading
+import time
+
+
+class FrameRingBuffer:
+    def __init__(self, capacity=2):
+        """
+        Bounded buffer of (frame_id, timestamp, frame).
+        Producers never block: when full, the oldest frame is dropped.
+        Consumers always take the newest frame and discard anything older.
+        """
+        self._frames: deque = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._waiting = 0
+        self.dropped = 0
+
+    def put(self, item: Tuple[int, float, Any]):
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(item)
+            # The producer may be waiting on the same condition (wait_for_demand)
+            self._cond.notify_all()
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[Tuple[int, float, Any]]:
+        """
+        Returns the newest frame, or None once closed (or on timeout).
+        """
+        with self._cond:
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                if not self._cond.wait_for(lambda: self._frames or self._closed, timeout):
+                    return None
+            finally:
+                self._waiting -= 1
+            if not self._frames:
+                return None
+            item = self._frames.pop()
+            self.dropped += len(self._frames)
+            self._frames.clear()
+            return item
+
+    def wait_for_demand(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until a consumer is waiting on an empty buffer. Returns False on
+        timeout or once closed.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: (self._waiting and not self._frames) or self._closed, timeout)
+            return bool(self._waiting and not self._frames and not self._closed)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+_DONE = object()
+
+
+class StreamingPipeline:
+    def __init__(self, capture: Callable[[], Any], perceive: Callable[[Any], Any],
+                 reason: Callable[[Any], Any], buffer_size=2, max_pending=1, capture_interval=0.0,
+                 on_demand=True):
+        """
+        Three-stage producer/consumer pipeline:
+            capture thread -> ring buffer -> perception thread -> bounded queue -> reason (caller)
+        capture: returns a frame, or raises StopIteration to end the stream (e.g.
+            a finished replay). Runs on its own thread, so it must not share
+            thread-bound resources (e.g. an mss handle) with other stages.
+        perceive: frame -> perception result.
+        reason: perception result -> yielded state. Runs in the consuming thread,
+            overlapping with perception of the next frame.
+        max_pending: perception results allowed to wait for reasoning; a full
+            queue blocks perception, which then only ever sees fresh frames.
+        on_demand: capture only when perception is waiting for a frame, so no
+            frame is grabbed just to be dropped and the capture thread does not
+            compete with perception for CPU. False captures continuously,
+            every capture_interval seconds (minimum spacing in both modes).
+        """
+        self.capture = capture
+        self.perceive = perceive
+        self.reason = reason
+        self.capture_interval = capture_interval
+        self.on_demand = on_demand
+        self.frames = FrameRingBuffer(buffer_size)
+        self.results: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._threads = []
+        self.error: Optional[BaseException] = None
+
+    def _capture_loop(self):
+        frame_id = 0
+        try:
+            while not self._stop.is_set():
+                if self.on_demand and not self.frames.wait_for_demand(timeout=0.1):
+                    if self.frames.closed:
+                        break
+                    continue
+                self.frames.put((frame_id, time.time(), self.capture()))
+                frame_id += 1
+                if self.capture_interval:
+                    self._stop.wait(self.capture_interval)
+        except StopIteration:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.frames.close()
+
+    def _perception_loop(self):
+        try:
+            while not self._stop.is_set():
+                item = self.frames.get_latest(timeout=0.5)
+                if item is None:
+                    if self.frames.closed:
+                        break
+                    continue
+                frame_id, timestamp, frame = item
+                result = self.perceive(frame)
+                self._put((frame_id, timestamp, result))
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._put(_DONE)
+
+    def _put(self, item):
+        # Blocking put gives back-pressure, but must not outlive stop()
+        while True:
+            try:
+                self.results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set() and item is not _DONE:
+                    return
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="viga-capture", daemon=True),
+            threading.Thread(target=self._perception_loop, name="viga-perception", daemon=True)
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.frames.close()
+        # Drain so a blocked producer can observe the stop flag
+        while any(t.is_alive() for t in self._threads):
+            try:
+                self.results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._threads = []
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self._threads:
+            self.start()
+        try:
+            while True:
+                item = self.results.get()
+                if item is _DONE:
+                    break
+                frame_id, timestamp, result = item
+                yield self.reason(frame_id, timestamp, result)
+        finally:
+            self.stop()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import threading
+import time
+
+GroundingResult = Tuple[Optional[str], float, Optional[str]]
+
+
+class SceneCache:
+    def __init__(self, max_scenes=8, max_results=64, ttl=5.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Memoizes the agent pipeline per scene fingerprint (see
+        perception.screen_capture.fingerprint): the perception output, the built
+        graph and, per intent, the grounding result (node_id, confidence, action).
+        A scene expires ttl seconds after it was first seen, whatever its hits;
+        beyond max_scenes the least recently used scene is evicted.
+        Safe to use from several threads (e.g. the daemon's invalidate op).
+        """
+        self.max_scenes = max_scenes
+        self.max_results = max_results
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.hooks: List[Callable[[Optional[Hashable]], None]] = []
+        self._scenes: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, fingerprint: Hashable, create=False) -> Optional[Dict[str, Any]]:
+        # Callers hold self._lock
+        entry = self._scenes.get(fingerprint)
+        if entry is not None and self.clock() - entry['created'] > self.ttl:
+            del self._scenes[fingerprint]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = self._scenes[fingerprint] = {'created': self.clock(), 'results': OrderedDict()}
+            while len(self._scenes) > self.max_scenes:
+                self._scenes.popitem(last=False)
+        self._scenes.move_to_end(fingerprint)
+        return entry
+
+    def get(self, fingerprint: Hashable, key: str) -> Any:
+        """
+        Cached stage output ('perception' or 'graph') for a scene, or None.
+        """
+        with self._lock:
+            entry = self._entry(fingerprint)
+            value = entry.get(key) if entry is not None else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, fingerprint: Hashable, key: str, value: Any):
+        with self._lock:
+            self._entry(fingerprint, create=True)[key] = value
+
+    def get_result(self, fingerprint: Hashable, intent: str) -> Optional[GroundingResult]:
+        with self._lock:
+            entry = self._entry(fingerprint)
+            result = entry['results'].get(intent) if entry is not None else None
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                entry['results'].move_to_end(intent)
+            return result
+
+    def put_result(self, fingerprint: Hashable, intent: str, result: GroundingResult):
+        with self._lock:
+            results = self._entry(fingerprint, create=True)['results']
+            results[intent] = result
+            results.move_to_end(intent)
+            while len(results) > self.max_results:
+                results.popitem(last=False)
+
+    def on_invalidate(self, callback: Callable[[Optional[Hashable]], None]):
+        """
+        Registers callback(fingerprint), called after invalidate(); the
+        fingerprint is None when the whole cache was dropped.
+        """
+        self.hooks.append(callback)
+        return callback
+
+    def invalidate(self, fingerprint: Optional[Hashable] = None):
+        """
+        Drops one scene, or every scene. Call it whenever cached results may no
+        longer hold for an unchanged frame, e.g. after acting on the UI or
+        changing models.
+        """
+        with self._lock:
+            if fingerprint is None:
+                self._scenes.clear()
+            else:
+                self._scenes.pop(fingerprint, None)
+        for callback in self.hooks:
+            callback(fingerprint)
+
+    def clear(self):
+        with self._lock:
+            self._scenes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._scenes),
+                'max_size': self.max_scenes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._scenes)
@@ -1,31 +1,97 @@
+from collections import deque
+import itertools
 import numpy as np
+from utils.tracker import BoxTracker
+from perception.scene import Scene, GROUP_KEYS, GROUP_TEXT
 
 class TemporalManager:
-    def __init__(self, history_size=5):
-        self.history = []
+    def __init__(self, history_size=5, iou_threshold=0.3, max_age=3, smooth=True):
+        """
+        Tracks layouts, elements and text across frames.
+        Every item gets a persistent 'track_id' and keeps its detected 'box',
+        which grounding and execution act on. With smooth=True the
+        constant-velocity Kalman estimate is added as 'smooth_box' (same format),
+        for display only: it lags behind jumps and overshoots after them.
+        History keeps only compact (track_ids, boxes) arrays per frame, never
+        images; the boxes are the smoothed ones with smooth=True.
+        """
+        self.history = deque(maxlen=history_size)
         self.history_size = history_size
+        self.smooth = smooth
+        self._ids = itertools.count()
+        self.trackers = {
+            'layouts': BoxTracker(iou_threshold, max_age),
+            'elements': BoxTracker(iou_threshold, max_age),
+            'text': BoxTracker(iou_threshold, max_age)
+        }
 
     def update(self, perception_data):
         """
-        Maintains a rolling window of perception results to stabilize boxes.
-        This is a simplified version of temporal tracking.
+        Associates the new detections with existing tracks and returns the
+        stabilized perception data.
         """
-        self.history.append(perception_data)
-        if len(self.history) > self.history_size:
-            self.history.pop(0)
-            
-        return self._stabilize()
+        if perception_data is None:
+            return None
+        if isinstance(perception_data, Scene):
+            return self._update_scene(perception_data)
+
+        stabilized = dict(perception_data)
+        snapshot = {}
+        next_id = lambda: next(self._ids)
+
+        for group in ('layouts', 'elements'):
+            items = perception_data.get(group, [])
+            boxes = np.array([it['box'] for it in items], dtype=np.float64).reshape(-1, 4)
+            ids, smoothed = self.trackers[group].update(boxes, [it['class'] for it in items], next_id)
+            stabilized[group] = [{**it, 'track_id': int(t)} for it, t in zip(items, ids)]
+            if self.smooth:
+                for it, b in zip(stabilized[group], smoothed.tolist()):
+                    it['smooth_box'] = b
+            snapshot[group] = (ids, (smoothed if self.smooth else boxes).astype(np.float32))
+
+        # OCR text can flicker between frames, so text tracks ignore content
+        items = perception_data.get('text', [])
+        boxes = np.array([[*it['box'][0], *it['box'][2]] for it in items], dtype=np.float64).reshape(-1, 4)
+        ids, smoothed = self.trackers['text'].update(boxes, None, next_id)
+        stabilized['text'] = []
+        for it, (x1, y1, x2, y2), t in zip(items, smoothed.tolist(), ids):
+            item = {**it, 'track_id': int(t)}
+            if self.smooth:
+                item['smooth_box'] = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            stabilized['text'].append(item)
+        snapshot['text'] = (ids, (smoothed if self.smooth else boxes).astype(np.float32))
 
-    def _stabilize(self):
+        self.history.append(snapshot)
+        return stabilized
+
+    def _update_scene(self, scene):
         """
-        Returns stabilized version of the latest perception data.
-        In a full implementation, we would use an IoU-based tracker (SORT/DeepSORT).
-        For now, we return the latest but could implement box averaging.
+        Scene variant of update(): tracks each group directly on the box arrays.
+        Boxes stay as detected; smoothed ones are in the history and get_smooth_box().
         """
-        if not self.history:
-            return None
-        return self.history[-1]
+        next_id = lambda: next(self._ids)
+        tracked = scene.boxes.copy()
+        track_ids = np.full(len(scene), -1, dtype=np.int64)
+        class_names = scene.class_names()
+        snapshot = {}
+        for group, key in enumerate(GROUP_KEYS):
+            rows = scene.group_slice(group)
+            labels = None if group == GROUP_TEXT else class_names[rows]
+            ids, smoothed = self.trackers[key].update(scene.boxes[rows], labels, next_id)
+            track_ids[rows] = ids
+            if self.smooth:
+                tracked[rows] = smoothed
+            snapshot[key] = (ids, tracked[rows].astype(np.float32))
+
+        self.history.append(snapshot)
+        return scene.replace(track_ids=track_ids)
 
     def get_smooth_box(self, element_id, current_box):
-        # Placeholder for Kalman filter logic
+        """
+        Kalman estimate for a track id, or current_box if it is not tracked.
+        """
+        for tracker in self.trackers.values():
+            box = tracker.box_of(element_id)
+            if box is not None:
+                return box
         return current_box
@@ -0,0 +1,151 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between (n, 4) and (m, 4) [x1, y1, x2, y2] arrays.
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def greedy_match(scores: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """
+    Greedy assignment on a score matrix: repeatedly takes the best remaining
+    (row, col) pair above threshold. Returns (row, col) pairs.
+    """
+    if scores.size == 0:
+        return []
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    matches = []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matches.append((r, c))
+    return matches
+
+
+def _to_state(boxes: np.ndarray) -> np.ndarray:
+    # [x1, y1, x2, y2] -> [cx, cy, w, h]
+    return np.stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]), axis=1)
+
+
+def _to_boxes(state: np.ndarray) -> np.ndarray:
+    cx, cy, w, h = state[:, 0], state[:, 1], state[:, 2], state[:, 3]
+    return np.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), axis=1)
+
+
+class BoxTracker:
+    def __init__(self, iou_threshold=0.3, max_age=3, process_noise=1.0, measurement_noise=2.0):
+        """
+        IoU tracker with a constant-velocity Kalman filter per track, all tracks
+        filtered together as stacked arrays.
+        State per track: [cx, cy, w, h, vcx, vcy, vw, vh].
+        max_age: frames a track survives without a matching detection.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.Q = np.diag([process_noise ** 2] * 4 + [(process_noise / 2) ** 2] * 4)
+        self.R = np.eye(4) * measurement_noise ** 2
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.labels: List[str] = []
+        self.x = np.empty((0, 8))
+        self.P = np.empty((0, 8, 8))
+        self.misses = np.empty(0, dtype=np.int64)
+
+    def update(self, boxes: np.ndarray, labels: Optional[List[str]], next_id) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Associates detections with tracks and filters them.
+        labels: per-detection class names; tracks only match detections of the
+        same class. None disables the class constraint.
+        next_id: callable returning a fresh global track id.
+        Returns (track_ids, smoothed_boxes), aligned with the input boxes.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(boxes)
+
+        # Predict
+        if len(self.ids):
+            self.x = self.x @ self.F.T
+            self.P = self.F @ self.P @ self.F.T + self.Q
+
+        scores = iou_matrix(_to_boxes(self.x[:, :4]), boxes)
+        if labels is not None and len(self.ids) and n:
+            same = np.asarray(self.labels, dtype=object)[:, None] == np.asarray(labels, dtype=object)[None, :]
+            scores = np.where(same, scores, 0.0)
+        matches = greedy_match(scores, self.iou_threshold)
+
+        track_of = np.full(n, -1, dtype=np.int64)
+        if matches:
+            t_idx = np.array([m[0] for m in matches])
+            d_idx = np.array([m[1] for m in matches])
+            self._correct(t_idx, _to_state(boxes[d_idx]))
+            track_of[d_idx] = t_idx
+            self.misses[t_idx] = 0
+        matched_tracks = np.zeros(len(self.ids), dtype=bool)
+        matched_tracks[track_of[track_of >= 0]] = True
+        self.misses[~matched_tracks] += 1
+
+        # Spawn tracks for unmatched detections
+        new = np.flatnonzero(track_of < 0)
+        if len(new):
+            start = len(self.ids)
+            z = _to_state(boxes[new])
+            x0 = np.concatenate((z, np.zeros_like(z)), axis=1)
+            P0 = np.tile(np.diag([self.R[0, 0]] * 4 + [100.0] * 4), (len(new), 1, 1))
+            self.ids = np.concatenate((self.ids, [next_id() for _ in new]))
+            self.labels.extend(labels[i] if labels is not None else "" for i in new)
+            self.x = np.concatenate((self.x, x0))
+            self.P = np.concatenate((self.P, P0))
+            self.misses = np.concatenate((self.misses, np.zeros(len(new), dtype=np.int64)))
+            track_of[new] = np.arange(start, start + len(new))
+
+        ids = self.ids[track_of]
+        smoothed = _to_boxes(self.x[track_of, :4])
+        self._prune()
+        return ids, smoothed
+
+    def _correct(self, t_idx: np.ndarray, z: np.ndarray):
+        x = self.x[t_idx]
+        P = self.P[t_idx]
+        y = z - x[:, :4]
+        S = P[:, :4, :4] + self.R
+        K = P[:, :, :4] @ np.linalg.inv(S)
+        self.x[t_idx] = x + (K @ y[:, :, None])[:, :, 0]
+        self.P[t_idx] = P - K @ P[:, :4, :]
+
+    def _prune(self):
+        alive = self.misses <= self.max_age
+        if alive.all():
+            return
+        self.ids = self.ids[alive]
+        self.labels = [l for l, keep in zip(self.labels, alive) if keep]
+        self.x = self.x[alive]
+        self.P = self.P[alive]
+        self.misses = self.misses[alive]
+
+    def box_of(self, track_id: int) -> Optional[List[float]]:
+        hit = np.flatnonzero(self.ids == track_id)
+        if not len(hit):
+            return None
+        return _to_boxes(self.x[hit[:1], :4])[0].tolist()
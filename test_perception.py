@@ -14,7 +14,8 @@ def main():
     data = engine.perceive()
     
     print("\n--- Perception Results ---")
-    print(f"Elements detected: {len(data['detections'])}")
+    print(f"Layouts detected: {len(data['layouts'])}")
+    print(f"Elements detected: {len(data['elements'])}")
     print(f"Text segments found: {len(data['text'])}")
     
     if data['text']:
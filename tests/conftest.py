@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (perception.*, reasoning.*, utils.*)
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+# Synthetic scene generator shared with the benchmarks
+BENCHMARKS = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+if BENCHMARKS not in sys.path:
+    sys.path.append(BENCHMARKS)
+
+# main.py (the agent and CLI) lives at the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
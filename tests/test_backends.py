@@ -0,0 +1,93 @@
+"""
+Smoke tests of the ONNX backends: export, cache, reload and agreement with
+eager torch. The model tests are skipped unless torch, transformers,
+sentence-transformers and onnxruntime are installed (the models are
+downloaded on first run).
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+from utils.backends import OnnxCLIP, load_clip, load_sentence_transformer, weights_key
+
+CLIP_NAME = "openai/clip-vit-base-patch32"
+ENCODER_NAME = 'all-MiniLM-L6-v2'
+
+
+@pytest.fixture
+def torch():
+    for module in ('transformers', 'sentence_transformers', 'onnxruntime'):
+        pytest.importorskip(module)
+    return pytest.importorskip('torch')
+
+
+def test_weights_key_tells_same_named_weights_apart(tmp_path):
+    (tmp_path / 'layout').mkdir()
+    (tmp_path / 'atomic').mkdir()
+    (tmp_path / 'layout' / 'best.pt').write_bytes(b'layout weights')
+    (tmp_path / 'atomic' / 'best.pt').write_bytes(b'atomic weights')
+    layout = weights_key(str(tmp_path / 'layout' / 'best.pt'))
+    atomic = weights_key(str(tmp_path / 'atomic' / 'best.pt'))
+    assert layout != atomic
+    assert layout.startswith('best-')
+    assert weights_key('yolov8n.pt') == 'yolov8n'
+
+
+def cosine(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_onnx_clip_matches_torch(torch, tmp_path):
+    reference = load_clip(CLIP_NAME, 'torch')
+    model = load_clip(CLIP_NAME, 'onnx', cache_dir=str(tmp_path))
+    assert isinstance(model, OnnxCLIP)
+    assert [f for f in os.listdir(tmp_path) if f.endswith('.image.onnx')]
+
+    pixels = torch.rand(3, 3, 224, 224)
+    with torch.no_grad():
+        expected = reference.get_image_features(pixel_values=pixels)
+    assert cosine(model.get_image_features(pixel_values=pixels), expected).min() > 0.999
+
+    # Second load reuses the cached export
+    reloaded = load_clip(CLIP_NAME, 'onnx', cache_dir=str(tmp_path))
+    assert np.allclose(reloaded.get_image_features(pixel_values=pixels),
+                       model.get_image_features(pixel_values=pixels))
+
+
+def test_onnx_sentence_transformer_matches_torch(torch, tmp_path):
+    sentences = ["click save", "open settings", "Cancel"]
+    expected = load_sentence_transformer(ENCODER_NAME, 'torch').encode(sentences)
+    model = load_sentence_transformer(ENCODER_NAME, 'onnx', cache_dir=str(tmp_path))
+    assert cosine(model.encode(sentences), expected).min() > 0.999
+
+    assert os.listdir(tmp_path)
+    reloaded = load_sentence_transformer(ENCODER_NAME, 'onnx', cache_dir=str(tmp_path))
+    assert cosine(reloaded.encode(sentences), expected).min() > 0.999
+
+
+def test_threads_wait_for_the_first_model_load(monkeypatch):
+    import types
+    from utils import backends
+    monkeypatch.setattr(backends, '_pending_threads', None)
+    # An import of torch would fail: configuring threads must not import it
+    monkeypatch.setitem(sys.modules, 'torch', None)
+    backends.configure_threads(3)
+    assert backends._pending_threads == 3
+
+    calls = []
+    monkeypatch.setitem(sys.modules, 'torch', types.SimpleNamespace(set_num_threads=calls.append))
+    backends.apply_threads()
+    backends.apply_threads()
+    assert calls == [3]
+
+
+def test_agent_construction_does_not_import_torch(monkeypatch):
+    from main import VIGAAgent
+    monkeypatch.setitem(sys.modules, 'torch', None)
+    from utils import backends
+    monkeypatch.setattr(backends, '_pending_threads', None)
+    VIGAAgent(threads=2, scene_cache_ttl=0)
+    assert backends._pending_threads == 2
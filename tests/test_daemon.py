@@ -0,0 +1,55 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+from service.daemon import VIGADaemon
+from service.ipc import decode, encode, request
+
+
+class FakeAgent:
+    scene_cache = None
+
+    def ground_intents(self, intents):
+        return [{'intent': intent, 'node_id': 'n1'} for intent in intents]
+
+    def model_load_report(self):
+        return {}
+
+
+@pytest.fixture
+def daemon():
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip("needs Unix sockets")
+    address = os.path.join(tempfile.mkdtemp(), 'viga.sock')
+    server = VIGADaemon(FakeAgent(), address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(address):
+        time.sleep(0.01)
+    yield address
+    server.shutdown()
+    thread.join(5)
+
+
+def test_non_object_requests_get_a_reply(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(daemon)
+        with sock.makefile('rb') as reader:
+            for payload in (b'[1]\n', b'"x"\n', b'not json\n'):
+                sock.sendall(payload)
+                assert decode(reader.readline())['ok'] is False
+            # The connection survives bad requests
+            sock.sendall(encode({'op': 'ping', 'id': 7}))
+            assert decode(reader.readline()) == {'ok': True, 'result': 'pong', 'id': 7}
+
+
+def test_ground_and_stats(daemon):
+    assert request({'op': 'ground', 'intent': 'click save'}, daemon, timeout=5)['result']['node_id'] == 'n1'
+    assert request({'op': 'ground'}, daemon, timeout=5)['ok'] is False
+    stats = request({'op': 'stats'}, daemon, timeout=5)['result']
+    assert stats['served'] == 1 and stats['scene_cache'] is None
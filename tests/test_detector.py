@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from perception.detector import UIDetector
+from perception.icon_cache import dhash
+from utils.metrics import metrics
+
+
+def test_icon_cache_hits_count_only_real_hits():
+    detector = UIDetector()
+    img = np.zeros((100, 100, 3), dtype=np.uint8)
+    img[10:30, 10:30] = np.arange(20, dtype=np.uint8)[None, :, None] * 10
+    detector.icon_cache.put(dhash(img[10:30, 10:30]), "home")
+    metrics.reset()
+    # A cached icon twice, plus an empty crop
+    tags = detector._get_icon_semantics_batch(img, [[10, 10, 30, 30], [10, 10, 30, 30], [50, 50, 50, 60]])
+    assert tags == ["home", "home", "unknown"]
+    assert metrics.snapshot()['counters']['detector.icon_cache_hits'] == 2
+
+
+@pytest.mark.parametrize('size', [0, -1])
+def test_rejects_non_positive_clip_batch_size(size):
+    with pytest.raises(ValueError):
+        UIDetector(clip_batch_size=size)
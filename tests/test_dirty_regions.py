@@ -0,0 +1,101 @@
+import numpy as np
+
+from perception import dirty_regions
+from perception.perception_bridge import PerceptionEngine
+
+
+def test_grow_rects_covers_touched_boxes():
+    toolbar = [0, 0, 400, 40]
+    rects = dirty_regions.grow_rects([(300, 10, 330, 30)], [toolbar, [500, 500, 600, 600]], (480, 640))
+    assert rects == [(0, 0, 400, 40)]
+
+
+def test_grow_rects_chains_and_merges():
+    # The first box pulls the rect onto the second, which then joins the other rect
+    boxes = [[0, 0, 100, 20], [90, 10, 200, 30]]
+    rects = dirty_regions.grow_rects([(10, 5, 20, 15), (190, 25, 210, 40)], boxes, (480, 640))
+    assert rects == [(0, 0, 210, 40)]
+
+
+def test_grow_rects_clips_to_frame():
+    assert dirty_regions.grow_rects([(0, 0, 10, 10)], [[-5, -5, 700, 20]], (480, 640)) == [(0, 0, 640, 20)]
+
+
+class FakeDetector:
+    """Finds every solid white rectangle in the image, as a 'panel' layout."""
+
+    def detect_batch(self, crops):
+        return [self.detect(crop) for crop in crops]
+
+    def detect(self, img, executor=None):
+        import cv2
+        mask = (img.max(axis=2) == 255).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        layouts = [{'box': [int(x), int(y), int(x + w), int(y + h)], 'class': 'panel', 'confidence': 0.9}
+                   for x, y, w, h, _ in stats[1:count]]
+        return {'layouts': layouts, 'elements': []}
+
+    last_timings = {}
+
+
+class FakeRecognizer:
+    def recognize(self, img, regions=None):
+        return []
+
+
+def make_engine(**kwargs):
+    engine = PerceptionEngine(incremental=True, **kwargs)
+    engine.detector = FakeDetector()
+    engine.recognizer = FakeRecognizer()
+    return engine
+
+
+def test_incremental_change_inside_layout_keeps_it_whole():
+    engine = make_engine(max_dirty_ratio=0.9)
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[0:40, 0:400] = 255
+    first = engine.process_frame(img)
+    assert [d['box'] for d in first['layouts']] == [[0, 0, 400, 40]]
+
+    # A spinner redraws inside the toolbar: it is re-detected whole, not as the dirty crop
+    changed = img.copy()
+    changed[10:30, 300:320] = (255, 255, 0)
+    second = engine.process_frame(changed)
+    assert [d['box'] for d in second['layouts']] == [[0, 0, 400, 40]]
+
+
+def test_incremental_forces_periodic_full_pass():
+    engine = make_engine(full_every=2)
+    calls = []
+    full = engine._perceive_full
+    engine._perceive_full = lambda img: calls.append('full') or full(img)
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    for _ in range(5):
+        engine.process_frame(img)
+    # Initial pass, then a full pass after every two incremental frames
+    assert calls == ['full', 'full']
+
+
+def test_change_inside_window_stays_incremental():
+    # Default max_dirty_ratio: a spinner inside a window-sized panel must not force full passes
+    engine = make_engine()
+    calls = []
+    full = engine._perceive_full
+    engine._perceive_full = lambda img: calls.append('full') or full(img)
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[10:460, 10:630] = 255
+    engine.process_frame(img)
+    for shade in (0, 128, 0):
+        frame = img.copy()
+        frame[200:220, 300:320] = shade
+        data = engine.process_frame(frame)
+        assert [d['box'] for d in data['layouts']] == [[10, 10, 630, 460]]
+    assert calls == ['full']
+
+
+def test_inside_crop_drops_clipped_views():
+    shape = (480, 640)
+    rect = (100, 0, 200, 50)
+    assert dirty_regions.inside_crop({'box': [10, 0, 50, 20]}, rect, shape)  # top is the frame edge
+    assert not dirty_regions.inside_crop({'box': [0, 10, 50, 20]}, rect, shape)
+    assert not dirty_regions.inside_crop({'box': [10, 10, 100, 20]}, rect, shape)
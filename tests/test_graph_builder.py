@@ -0,0 +1,111 @@
+import copy
+import networkx as nx
+import numpy as np
+import pytest
+
+from perception.scene import Scene
+from reasoning.graph_builder import UIGraphBuilder
+from synthetic import make_scene
+
+GROUPS = (('layout', 'layouts'), ('element', 'elements'), ('text', 'text'))
+
+
+def with_tracks(scene):
+    track = 0
+    for _, group in GROUPS:
+        for item in scene[group]:
+            item['track_id'] = track
+            track += 1
+    return scene
+
+
+def edges(graph):
+    # 'near' is symmetric; the builders may store either direction
+    return {(frozenset((u, v)) if d['relation'] == 'near' else (u, v), d['relation'])
+            for u, v, d in graph.edges(data=True)}
+
+
+def rebuilt(scene, containment_tree):
+    """
+    build_graph of the whole scene, with node ids renamed to the track-keyed ids of update_graph.
+    """
+    builder = UIGraphBuilder(containment_tree=containment_tree)
+    builder.build_graph(scene)
+    mapping = {f"{prefix}_{i}": f"{prefix}_t{item['track_id']}"
+               for prefix, group in GROUPS for i, item in enumerate(scene[group])}
+    return nx.relabel_nodes(builder.graph, mapping)
+
+
+def mutate(scene, rng, step):
+    scene = copy.deepcopy(scene)
+    for group in ('layouts', 'elements'):
+        for item in scene[group]:
+            if rng.random() < 0.05:
+                item['box'] = [c + rng.uniform(-60, 60) for c in item['box']]
+        if rng.random() < 0.3 and scene[group]:
+            scene[group].pop(int(rng.integers(len(scene[group]))))
+    if rng.random() < 0.5:
+        scene['elements'].append({'group': 'element', 'box': [500, 500, 540, 520], 'class': 'button',
+                                  'confidence': 0.9, 'track_id': 1000 + step})
+    for item in scene['text']:
+        if rng.random() < 0.05:
+            d = rng.uniform(-50, 50)
+            item['box'] = [[x + d, y] for x, y in item['box']]
+    return scene
+
+
+@pytest.mark.parametrize('containment_tree', [False, True])
+def test_update_graph_equals_build_graph(containment_tree):
+    rng = np.random.default_rng(0)
+    scene = with_tracks(make_scene(300, seed=3))
+    builder = UIGraphBuilder(containment_tree=containment_tree)
+    builder.update_graph(scene, move_tolerance=0)
+    for step in range(10):
+        scene = mutate(scene, rng, step)
+        builder.update_graph(scene, move_tolerance=0)
+        expected = rebuilt(scene, containment_tree)
+        assert set(builder.graph.nodes) == set(expected.nodes)
+        assert edges(builder.graph) == edges(expected)
+
+
+def test_update_graph_reports_changes():
+    scene = with_tracks(make_scene(60, seed=1))
+    builder = UIGraphBuilder()
+    events = []
+    builder.subscribe(events.append)
+    first = builder.update_graph(scene)
+    assert len(first['added_nodes']) == 60
+    assert not any(builder.update_graph(scene).values())
+
+    moved = copy.deepcopy(scene)
+    moved['elements'][0]['box'] = [c + 40 for c in moved['elements'][0]['box']]
+    moved['text'].pop()
+    changes = builder.update_graph(moved)
+    assert changes['moved_nodes'] == [f"element_t{moved['elements'][0]['track_id']}"]
+    assert changes['removed_nodes'] == [f"text_t{scene['text'][-1]['track_id']}"]
+    assert len(events) == 3
+    assert changes['removed_edges'] or changes['added_edges']
+
+
+def tagged_scene(n, seed):
+    scene = make_scene(n, seed=seed)
+    for i, element in enumerate(scene['elements']):
+        if i % 3 == 0:
+            element['semantic_tag'] = ['home', 'search', 'gear'][i % 9 // 3]
+    return scene
+
+
+@pytest.mark.parametrize('containment_tree', [False, True])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_scene_view_graph_equals_build_graph(containment_tree, seed):
+    data = tagged_scene(300, seed)
+    expected = UIGraphBuilder(containment_tree=containment_tree).build_graph(data)
+    view = UIGraphBuilder(containment_tree=containment_tree).view(Scene.from_perception(data))
+    graph = view.graph
+    assert list(graph.nodes) == list(expected.nodes) == view.node_ids
+    for node, attrs in expected.nodes(data=True):
+        got = dict(graph.nodes[node])
+        assert got.pop('confidence') == pytest.approx(attrs['confidence'], rel=1e-6)
+        assert got == {k: v for k, v in attrs.items() if k != 'confidence'}
+    assert edges(graph) == edges(expected)
+    assert view.semantic_labels() == [attrs['semantic_label'] for _, attrs in expected.nodes(data=True)]
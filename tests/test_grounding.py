@@ -0,0 +1,83 @@
+import networkx as nx
+import pytest
+
+from perception.scene import Scene
+from reasoning.graph_builder import UIGraphBuilder
+from reasoning.grounding import ActionGroundingEngine
+from reasoning.lexical_index import LexicalIndex, tokenize
+from synthetic import make_scene
+
+
+def test_tokenize_drops_filler_and_splits_underscores():
+    assert tokenize("Click the Save button inside container_form") == ['save', 'button', 'container', 'form']
+
+
+def test_lexical_index_ranks_and_tolerates_typos():
+    index = LexicalIndex(["Save", "Save as", "Settings", "Cancel", "Sa ve"])
+    hits = index.top_k("save", 2)
+    assert hits.tolist() == [0, 1]
+    # OCR typo still matches through trigrams
+    assert index.top_k("settngs", 1).tolist() == [2]
+    assert len(index.top_k("zzz", 3)) == 0
+
+
+def test_lexical_index_repeated_labels_score_alike():
+    index = LexicalIndex(["OK", "Cancel", "OK", "Help"])
+    scores = index.scores("ok")
+    assert scores[0] == scores[2] > 0
+    assert scores[1] == scores[3] == 0
+
+
+def make_graph(labels):
+    graph = nx.DiGraph()
+    for i, label in enumerate(labels):
+        graph.add_node(i, text=label, class_name='text')
+    return graph
+
+
+def test_shortlist_masks_each_intent_to_its_hits():
+    engine = ActionGroundingEngine(top_k=2)
+    labels = ["Save", "Open", "Settings", "Cancel", "Help", "Print"]
+    rows, allowed = engine._shortlist(["save", "print"], labels, make_graph(labels))
+    assert rows == [0, 5]
+    assert allowed.tolist() == [[True, False], [False, True]]
+
+
+def test_shortlist_falls_back_to_all_without_lexical_evidence():
+    engine = ActionGroundingEngine(top_k=2)
+    labels = ["Save", "Open", "Settings", "Cancel"]
+    rows, allowed = engine._shortlist(["save", "go back"], labels, make_graph(labels))
+    assert rows == [0, 1, 2, 3]
+    assert allowed[0].tolist() == [True, False, False, False]
+    assert allowed[1].all()
+
+
+def test_shortlist_disabled_or_small():
+    labels = ["Save", "Open"]
+    assert ActionGroundingEngine(top_k=None)._shortlist(["save"], labels, make_graph(labels)) == ([0, 1], None)
+    assert ActionGroundingEngine(top_k=8)._shortlist(["save"], labels, make_graph(labels)) == ([0, 1], None)
+
+
+def test_shortlist_caches_index_on_graph():
+    engine = ActionGroundingEngine(top_k=1)
+    labels = ["Save", "Open", "Help"]
+    graph = make_graph(labels)
+    engine._shortlist(["save"], labels, graph)
+    index = graph.graph['lexical_index']
+    engine._shortlist(["open"], labels, graph)
+    assert graph.graph['lexical_index'] is index
+
+
+@pytest.mark.parametrize('containment_tree', [False, True])
+def test_scene_candidates_equal_graph_candidates(containment_tree):
+    data = make_scene(200, seed=2)
+    for i, element in enumerate(data['elements'][::4]):
+        element['semantic_tag'] = 'icon_%d' % (i % 5)
+    engine = ActionGroundingEngine()
+    graph = UIGraphBuilder(containment_tree=containment_tree).build_graph(data)
+    view = UIGraphBuilder(containment_tree=containment_tree).view(Scene.from_perception(data))
+    node_ids, candidates, node_attrs = engine._scene_candidates(view)
+    assert (node_ids, candidates) == engine._graph_candidates(graph)
+    # Same action inferred for every node
+    assert all(engine._infer_action("open it", node_attrs(i)) == engine._infer_action("open it", graph.nodes[n])
+               for i, n in enumerate(node_ids))
@@ -0,0 +1,38 @@
+import sys
+import types
+
+import numpy as np
+
+from perception.ocr import TextRecognizer
+
+
+class FakeReader:
+    """Like EasyOCR's recognize(): one result per box, ordered by top edge, text = the box's fill value."""
+
+    def recognize(self, img, horizontal_list, free_list, batch_size):
+        results = []
+        for x1, x2, y1, y2 in sorted(horizontal_list, key=lambda b: (b[2], -b[1])):
+            polygon = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            results.append((polygon, f"v{int(img[y2 - 1, x2 - 1])}", 0.9))
+        return results
+
+
+def test_regions_sharing_a_corner_keep_their_own_text(monkeypatch):
+    utils = types.ModuleType('easyocr.utils')
+    utils.reformat_input = lambda img: (img, img[:, :, 0])
+    monkeypatch.setitem(sys.modules, 'easyocr', types.ModuleType('easyocr'))
+    monkeypatch.setitem(sys.modules, 'easyocr.utils', utils)
+
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    img[10:40, 10:150] = 50
+    img[10:30, 10:60] = 70  # nested region with the same top-left corner
+    recognizer = TextRecognizer()
+    recognizer.reader = FakeReader()
+    results = recognizer.recognize_regions(img, [[10, 10, 150, 40], [10, 10, 60, 30]])
+    by_box = {(r['box'][0][0], r['box'][0][1], r['box'][2][0], r['box'][2][1]): r['text'] for r in results}
+    assert by_box == {(10, 10, 150, 40): 'v50', (10, 10, 60, 30): 'v70'}
+
+    # Second pass is served from the content cache with the same routing
+    again = recognizer.recognize_regions(img, [[10, 10, 60, 30], [10, 10, 150, 40]])
+    assert [r['text'] for r in again] == ['v70', 'v50']
+    assert recognizer.cache_hits == 2
@@ -0,0 +1,57 @@
+import time
+
+from utils.pipeline import FrameRingBuffer, StreamingPipeline
+
+
+def run(on_demand, frames=6):
+    captured = []
+
+    def capture():
+        captured.append(time.perf_counter())
+        return len(captured)
+
+    def perceive(frame):
+        time.sleep(0.02)
+        return frame
+
+    pipeline = StreamingPipeline(capture, perceive, lambda frame_id, ts, result: result, on_demand=on_demand)
+    seen = []
+    for result in pipeline:
+        seen.append(result)
+        if len(seen) == frames:
+            break
+    return captured, seen
+
+
+def test_on_demand_captures_only_what_perception_takes():
+    captured, seen = run(on_demand=True)
+    assert seen == sorted(seen)
+    # One frame per perception pass (plus at most one requested when the loop stopped)
+    assert len(captured) <= len(seen) + 2
+    assert seen == list(range(1, len(seen) + 1))
+
+
+def test_continuous_capture_drops_stale_frames():
+    captured, seen = run(on_demand=False)
+    assert len(captured) > len(seen) + 2
+    assert seen == sorted(seen)
+
+
+def test_capture_end_stops_stream():
+    frames = iter(range(3))
+
+    def capture():
+        return next(frames)
+
+    results = list(StreamingPipeline(capture, lambda f: f, lambda i, ts, r: r, capture_interval=0.0))
+    assert results == sorted(results) and results[-1] == 2
+
+
+def test_ring_buffer_returns_newest():
+    buf = FrameRingBuffer(capacity=2)
+    for i in range(3):
+        buf.put((i, 0.0, i))
+    assert buf.get_latest(timeout=0)[0] == 2
+    assert buf.dropped == 2
+    buf.close()
+    assert buf.get_latest(timeout=0) is None and not buf.wait_for_demand(timeout=0)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from perception.replay import SessionRecorder, SessionReader, ReplayPerception
+from perception.scene import Scene, LabelTable, GROUP_ELEMENT, GROUP_TEXT
+
+
+def make_scene(offset=0.0):
+    labels = LabelTable(['OK', 'icon'])
+    return Scene(boxes=[[10.123456789, 20.5, 110.000000001, 40.25 + offset], [5, 5, 50, 15]],
+                 confidences=[0.9, 0.8], groups=[GROUP_ELEMENT, GROUP_TEXT],
+                 class_ids=[0, -1], label_ids=[1, 0], classes=LabelTable(['button']), labels=labels,
+                 image=np.full((60, 120, 3), 7, dtype=np.uint8))
+
+
+def test_round_trip_keeps_box_precision(tmp_path):
+    with SessionRecorder(str(tmp_path)) as rec:
+        rec.record(make_scene(), transform=(100, 50, 2.0), timestamp=1.0)
+        rec.record(make_scene(0.5), timestamp=2.0)
+    reader = SessionReader(str(tmp_path))
+    assert len(reader) == 2
+    scene = reader.scene(1)
+    assert np.array_equal(scene.boxes, make_scene(0.5).boxes)
+    assert reader.labels.lookup(scene.label_ids) == ['icon', 'OK']
+    assert reader.transform(0) == (100.0, 50.0, 2.0)
+    assert reader.image(0).shape == (60, 120, 3)
+
+
+def test_session_readable_without_close(tmp_path):
+    rec = SessionRecorder(str(tmp_path))
+    rec.record(make_scene(), timestamp=1.0)
+    rec.record(make_scene(1.0), timestamp=2.0)
+    # Simulate a kill mid-frame: detections of a third frame reach disk, its index row does not
+    rec._columns['boxes'].write(np.zeros((2, 4)).tobytes())
+    rec._columns['boxes'].flush()
+    reader = SessionReader(str(tmp_path))
+    assert len(reader) == 2
+    assert np.array_equal(reader.scene(1).boxes, make_scene(1.0).boxes)
+    rec.close()
+
+
+def test_replay_perception_ends(tmp_path):
+    with SessionRecorder(str(tmp_path)) as rec:
+        rec.record(make_scene())
+    replay = ReplayPerception(str(tmp_path), load_images=False)
+    data = replay.perceive()
+    assert data['image'] is None
+    with pytest.raises(StopIteration):
+        replay.perceive()
+
+
+def test_rejects_other_formats(tmp_path):
+    with SessionRecorder(str(tmp_path)) as rec:
+        rec.record(make_scene())
+    (tmp_path / 'meta.json').write_text('{"version": 99, "classes": [], "labels": []}')
+    with pytest.raises(ValueError):
+        SessionReader(str(tmp_path))
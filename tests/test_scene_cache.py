@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+
+from perception.screen_capture import fingerprint
+from reasoning.graph_builder import UIGraphBuilder
+from utils.scene_cache import SceneCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = SceneCache(ttl=1.0, clock=clock)
+    cache.put('a', 'graph', 'g')
+    cache.put_result('a', 'click save', ('n1', 0.9, 'click'))
+    assert cache.get('a', 'graph') == 'g'
+    assert cache.get_result('a', 'click save') == ('n1', 0.9, 'click')
+    clock.now = 1.5
+    assert cache.get('a', 'graph') is None
+    assert cache.get_result('a', 'click save') is None
+
+
+def test_least_recently_used_scene_is_evicted():
+    cache = SceneCache(max_scenes=2)
+    cache.put('a', 'graph', 1)
+    cache.put('b', 'graph', 2)
+    cache.get('a', 'graph')
+    cache.put('c', 'graph', 3)
+    assert cache.get('b', 'graph') is None
+    assert cache.get('a', 'graph') == 1 and cache.get('c', 'graph') == 3
+
+
+def test_results_per_scene_are_bounded():
+    cache = SceneCache(max_results=2)
+    for intent in ('one', 'two', 'three'):
+        cache.put_result('a', intent, (intent, 1.0, 'click'))
+    assert cache.get_result('a', 'one') is None
+    assert cache.get_result('a', 'three') == ('three', 1.0, 'click')
+
+
+def test_invalidate_calls_hooks():
+    cache = SceneCache()
+    seen = []
+    cache.on_invalidate(seen.append)
+    cache.put('a', 'graph', 1)
+    cache.put('b', 'graph', 2)
+    cache.invalidate('a')
+    assert cache.get('a', 'graph') is None and cache.get('b', 'graph') == 2
+    cache.invalidate()
+    assert len(cache) == 0 and seen == ['a', None]
+
+
+def test_concurrent_invalidate_and_lookups():
+    cache = SceneCache(max_scenes=4)
+    errors = []
+
+    def lookups():
+        try:
+            for i in range(20000):
+                key = i % 8
+                cache.put(key, 'graph', i)
+                cache.get(key, 'graph')
+                cache.put_result(key, 'x', (None, 0.0, None))
+                cache.get_result(key, 'x')
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    worker = threading.Thread(target=lookups)
+    worker.start()
+    while worker.is_alive():
+        cache.invalidate()
+    worker.join()
+    assert not errors
+
+
+def test_fingerprint_detects_visible_changes_only():
+    img = np.full((64, 64, 3), 100, dtype=np.uint8)
+    assert fingerprint(img) == fingerprint(img.copy())
+    changed = img.copy()
+    changed[5, 5, 0] = 116  # 16 levels within one 4x4 block
+    assert fingerprint(changed) != fingerprint(img)
+    frames = [(img, (0, 0, 1.0)), (img, (64, 0, 1.0))]
+    assert fingerprint(frames) != fingerprint(frames[:1])
+
+
+def test_build_graph_leaves_returned_graphs_alone():
+    builder = UIGraphBuilder()
+    data = {'layouts': [{'box': [0, 0, 100, 100], 'class': 'form', 'confidence': 0.9}],
+            'elements': [{'box': [10, 10, 40, 30], 'class': 'button', 'confidence': 0.9}], 'text': []}
+    first = builder.build_graph(data)
+    nodes = set(first.nodes)
+    builder.build_graph({'layouts': [], 'elements': [], 'text': []})
+    builder.reset()
+    assert set(first.nodes) == nodes and builder.graph is not first
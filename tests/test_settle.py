@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+from execution import executor as executor_module
+from execution.executor import ExecutionEngine
+from execution.settle import monitor_of, wait_for_settle, watch_region
+
+
+class FakeSct:
+    monitors = [{'left': 0, 'top': 0, 'width': 3840, 'height': 1080},
+                {'left': 0, 'top': 0, 'width': 1920, 'height': 1080},
+                {'left': 1920, 'top': 0, 'width': 1920, 'height': 1080}]
+
+
+class FakeCapturer:
+    """A UI that starts animating `delay` s after creation, for `duration` s."""
+
+    sct = FakeSct()
+
+    def __init__(self, delay=0.0, duration=0.0):
+        self.t0 = time.perf_counter()
+        self.delay = delay
+        self.duration = duration
+        self.monitors_seen = set()
+
+    def capture(self, monitor_number=1, region=None, scale=None):
+        self.monitors_seen.add(monitor_number)
+        t = time.perf_counter() - self.t0 - self.delay
+        h, w = (135, 240) if region is None else (max(1, region[3] // 2), max(1, region[2] // 2))
+        img = np.zeros((h, w, 3), dtype=np.uint8)
+        if 0 <= t < self.duration:
+            img[:, :int(t / self.duration * w) + 1] = 255
+        elif t >= self.duration and self.duration:
+            img[:] = 255
+        return img
+
+
+def test_static_ui_waits_quiet_window():
+    result = wait_for_settle(FakeCapturer(), box=[100, 100, 300, 140], quiet=0.3)
+    assert result['settled'] and not result['changed']
+    assert result['ms'] >= 300
+
+
+def test_delayed_reaction_is_waited_for():
+    capturer = FakeCapturer(delay=0.15, duration=0.2)
+    result = wait_for_settle(capturer, box=[100, 100, 300, 140], quiet=0.3)
+    assert result['settled'] and result['changed']
+    assert result['ms'] >= 350
+
+
+def test_endless_motion_times_out():
+    result = wait_for_settle(FakeCapturer(duration=10), timeout=0.3)
+    assert not result['settled'] and result['changed']
+
+
+def test_watches_only_the_monitor_with_the_box():
+    capturer = FakeCapturer()
+    assert monitor_of(capturer, [2000, 100, 2100, 140]) == 2
+    assert watch_region(capturer, [2000, 100, 2100, 140], 2) == (56, 76, 148, 88)
+    wait_for_settle(capturer, box=[2000, 100, 2100, 140], quiet=0.1)
+    assert capturer.monitors_seen == {2}
+
+
+def test_execute_plan_chains_on_settle(monkeypatch):
+    calls = []
+
+    class FakeGui:
+        click = staticmethod(lambda x, y: calls.append(('click', x, y)))
+        typewrite = staticmethod(lambda text: calls.append(('type', text)))
+        press = staticmethod(lambda key: calls.append(('press', key)))
+
+    monkeypatch.setattr(executor_module, '_gui', lambda: FakeGui)
+    engine = ExecutionEngine(capturer=FakeCapturer(), quiet=0.05)
+    records = engine.execute_plan([{'action': 'click', 'coordinates': (200, 120), 'box': [100, 100, 300, 140]},
+                                   {'action': 'type', 'text': 'hi'},
+                                   {'action': 'press'}])
+    assert calls == [('click', 200, 120), ('type', 'hi'), ('press', 'enter')]
+    assert [r['settled'] for r in records] == [True, True, True]
+    assert not engine.execute({'action': 'click'})
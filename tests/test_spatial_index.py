@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from reasoning.spatial_index import GridIndex, box_centers
+
+
+def brute_force_pairs(centers, radius):
+    diff = centers[:, None, :] - centers[None, :, :]
+    close = np.triu(np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2) < radius, k=1)
+    return np.argwhere(close)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('radius', [10.0, 50.0, 300.0])
+def test_pairs_match_brute_force(seed, radius):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-200, 1800, size=(300, 2))
+    # Clusters, duplicates and points on cell borders
+    centers[:40] = centers[0] + rng.normal(0, 3, size=(40, 2))
+    centers[40:50] = centers[50]
+    centers[60:70] = np.arange(10)[:, None] * radius
+    pairs = GridIndex(centers, radius).pairs_within(radius)
+    assert np.array_equal(pairs, brute_force_pairs(centers, radius))
+
+
+def test_empty_and_degenerate():
+    assert GridIndex(np.empty((0, 2)), 50).pairs_within(50).shape == (0, 2)
+    assert GridIndex(np.zeros((3, 2)), 50).pairs_within(0).shape == (0, 2)
+    assert GridIndex(np.array([[0, 0], [100, 100]]), 50).pairs_within(50).shape == (0, 2)
+
+
+def test_box_centers():
+    assert box_centers([[0, 0, 10, 20], [5, 5, 5, 5]]).tolist() == [[5, 10], [5, 5]]
@@ -0,0 +1,87 @@
+import numpy as np
+
+from perception.perception_bridge import PerceptionEngine
+from perception.screen_capture import ScreenCapturer
+
+
+class FakeShot:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.raw = bytes(width * height * 4)
+
+
+class FakeMss:
+    monitors = [{'left': 0, 'top': 0, 'width': 3840, 'height': 1080},
+                {'left': 1920, 'top': 0, 'width': 1920, 'height': 1080}]
+
+    def grab(self, monitor):
+        self.grabbed = monitor
+        return FakeShot(monitor['width'], monitor['height'])
+
+
+def test_capturer_applies_its_region_and_scale():
+    capturer = ScreenCapturer(region=(100, 50, 400, 200), scale=0.5)
+    capturer._sct = FakeMss()
+    img = capturer.capture()
+    assert img.shape == (100, 200, 3)
+    assert capturer.last_transform == (2020, 50, 0.5)
+    assert capturer.to_screen([0, 0, 100, 100]) == [2020, 50, 2220, 250]
+    # Explicit arguments still win
+    assert capturer.capture(region=(0, 0, 40, 40), scale=1.0).shape == (40, 40, 3)
+
+
+def test_make_capturer_keeps_region_and_scale():
+    engine = PerceptionEngine(capture_region=(100, 50, 400, 200), capture_scale=0.5)
+    capturer = engine.make_capturer()
+    assert (capturer.region, capturer.scale) == ((100, 50, 400, 200), 0.5)
+    assert capturer is not engine.capturer
+
+
+class FakeGrounder:
+    def ground(self, intent, graph):
+        return next(n for n, d in graph.nodes(data=True) if d['type'] == 'element'), 0.9, 'click'
+
+    def models(self):
+        return []
+
+
+class FakePerception:
+    """Frames from a capturer with its own transform; the engine's capturer has another."""
+
+    def __init__(self):
+        self.capturer = ScreenCapturer()
+        self.capturer.last_transform = (0, 0, 1.0)
+        self.frames = 0
+
+    def make_capturer(self):
+        perception = self
+
+        class Capturer(ScreenCapturer):
+            def capture(self, *args, **kwargs):
+                perception.frames += 1
+                if perception.frames > 2:
+                    raise StopIteration
+                self.last_transform = (1920, 100, 0.5)
+                return np.zeros((10, 10, 3), dtype=np.uint8)
+
+        return Capturer()
+
+    def process_frame(self, img):
+        return {'image': img, 'layouts': [], 'text': [],
+                'elements': [{'box': [10, 10, 30, 30], 'class': 'button', 'confidence': 0.9}]}
+
+    def to_screen(self, box):
+        return self.capturer.to_screen(box)
+
+    def models(self):
+        return []
+
+
+def test_stream_maps_with_the_transform_of_the_frame():
+    from main import VIGAAgent
+    agent = VIGAAgent(perception=FakePerception(), scene_cache_ttl=0)
+    agent.grounder = FakeGrounder()
+    states = list(agent.stream("click the button"))
+    assert len(states) == 2
+    assert all(state['coordinates'] == (1960.0, 140.0) for state in states)
+    assert states[0]['transform'] == (1920, 100, 0.5)
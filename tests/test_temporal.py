@@ -0,0 +1,42 @@
+import numpy as np
+
+from perception.scene import Scene
+from utils.temporal import TemporalManager
+
+
+def frame(x):
+    return {'layouts': [],
+            'elements': [{'box': [x, 100, x + 100, 140], 'class': 'icon', 'confidence': 0.9}],
+            'text': [{'box': [[x, 200], [x + 120, 200], [x + 120, 230], [x, 230]], 'text': 'Save',
+                      'confidence': 0.9}]}
+
+
+def test_detected_boxes_are_kept_after_a_jump():
+    temporal = TemporalManager()
+    for _ in range(5):
+        temporal.update(frame(100))
+    data = temporal.update(frame(120))
+    element, text = data['elements'][0], data['text'][0]
+    # Grounding and execution see the detection; the lagging estimate is display only
+    assert element['box'] == [120, 100, 220, 140]
+    assert text['box'] == frame(120)['text'][0]['box']
+    assert element['smooth_box'][0] < 120
+    assert element['track_id'] == data['elements'][0]['track_id']
+
+
+def test_smoothing_off_adds_no_estimate():
+    data = TemporalManager(smooth=False).update(frame(100))
+    assert 'smooth_box' not in data['elements'][0]
+    assert 'smooth_box' not in data['text'][0]
+
+
+def test_scene_boxes_are_kept():
+    temporal = TemporalManager()
+    scene = Scene.from_perception(frame(100))
+    temporal.update(scene)
+    moved = Scene.from_perception(frame(120))
+    tracked = temporal.update(moved)
+    assert np.array_equal(tracked.boxes, moved.boxes)
+    assert (tracked.track_ids >= 0).all()
+    smooth = temporal.get_smooth_box(int(tracked.track_ids[0]), None)
+    assert smooth is not None and smooth[0] < 120
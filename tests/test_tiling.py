@@ -0,0 +1,134 @@
+import multiprocessing
+
+import cv2
+import numpy as np
+import pytest
+
+from perception import tiling
+
+
+class FakeDetector:
+    """White components are 'toolbar' layouts, grey ones 'button' elements."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    @staticmethod
+    def _components(mask, label):
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8))
+        return [{'box': [float(x), float(y), float(x + w), float(y + h)], 'class': label, 'confidence': 0.9}
+                for x, y, w, h, _ in stats[1:count]]
+
+    def detect(self, img):
+        return {'layouts': self._components(img[:, :, 0] == 255, 'toolbar'),
+                'elements': self._components(img[:, :, 0] == 128, 'button')}
+
+
+class FakeRecognizer:
+    def recognize(self, img):
+        return []
+
+
+def fake_init(detector_kwargs, ocr, threads):
+    tiling._worker.update(detector=FakeDetector(), recognizer=FakeRecognizer(), frames={})
+
+
+def perceive_in_process(img, tile_size=1280, overlap=128, transform=(0, 0, 1.0)):
+    fake_init({}, True, 1)
+    frame = tiling.SharedFrame(img.shape, img.dtype)
+    try:
+        frame.write(img)
+        tiles = tiling.make_tiles(img.shape[1], img.shape[0], tile_size, overlap)
+        results = [tiling._perceive_tile(0, frame.name, frame.shape, frame.dtype.str, tile, transform)
+                   for tile in tiles]
+        for handle in tiling._worker['frames'].values():
+            handle.close()
+        return tiling.merge_tiles(results, 0.6, tiling.overlap_regions(tiles))
+    finally:
+        frame.close()
+
+
+def test_make_tiles_cover_frame_with_overlap():
+    tiles = tiling.make_tiles(3000, 400, 1280, 128)
+    assert [t[0] for t in tiles] == [0, 860, 1720]
+    assert tiles[-1][2] == 3000
+    assert all(a[2] - b[0] >= 128 for a, b in zip(tiles, tiles[1:]))
+    assert tiling.make_tiles(800, 600, 1280, 128) == [(0, 0, 800, 600)]
+
+
+def test_nms_keeps_complete_box_over_cut_twin():
+    boxes = np.array([[0, 0, 100, 20], [40, 0, 100, 20], [200, 0, 220, 20]])
+    keep = tiling.nms(boxes, [0.9, 0.9, 0.5])
+    assert sorted(keep.tolist()) == [0, 2]
+
+
+def test_full_width_toolbar_is_joined():
+    img = np.zeros((400, 3000, 3), dtype=np.uint8)
+    img[10:50, :] = 255
+    img[100:120, 1250:1300] = 128  # a button straddling the first tile seam
+    img[200:220, 40:80] = 128
+    merged = perceive_in_process(img)
+    assert [d['box'] for d in merged['layouts']] == [[0.0, 10.0, 3000.0, 50.0]]
+    assert sorted(d['box'] for d in merged['elements']) == [[40.0, 200.0, 80.0, 220.0],
+                                                            [1250.0, 100.0, 1300.0, 120.0]]
+    assert all('tile_cut' not in d for d in merged['layouts'] + merged['elements'])
+
+
+def test_nested_layouts_of_one_class_stay_apart():
+    boxes = np.array([[0, 0, 1300, 200], [1100, 0, 3000, 200], [0, 50, 1300, 80], [1100, 50, 3000, 80]],
+                     dtype=np.float64)
+    groups = tiling.join_fragments(boxes, ['panel'] * 4, np.ones(4, dtype=bool), [(1100, 0, 1300, 400)])
+    assert groups == [[0, 1], [2, 3]]
+
+
+def test_attach_closes_stale_handles():
+    tiling._worker['frames'] = {}
+    first = tiling.SharedFrame((4, 4, 3))
+    second = tiling.SharedFrame((8, 8, 3))
+    try:
+        tiling._attach(0, first.name, first.shape, first.dtype)
+        old = tiling._worker['frames'][0]
+        tiling._attach(0, second.name, second.shape, second.dtype)
+        assert old.buf is None
+        tiling._worker['frames'][0].close()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_default_pool_is_bounded():
+    assert 1 <= tiling.TiledPerceptionEngine().workers <= 4
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_engine_merges_two_monitors(monkeypatch):
+    monkeypatch.setattr(tiling, '_init_worker', fake_init)
+    img = np.zeros((1080, 2560, 3), dtype=np.uint8)
+    img[0:40, :] = 255
+    img[500:530, 1200:1300] = 128
+    engine = tiling.TiledPerceptionEngine(workers=2, tile_size=1280, overlap=128, start_method='fork')
+    try:
+        out = engine.process_frame([(img, (0, 0, 1.0)), (img, (2560, 0, 1.0))])
+    finally:
+        engine.close()
+    assert sorted(d['box'] for d in out['layouts']) == [[0.0, 0.0, 2560.0, 40.0], [2560.0, 0.0, 5120.0, 40.0]]
+    assert sorted(d['box'] for d in out['elements']) == [[1200.0, 500.0, 1300.0, 530.0],
+                                                         [3760.0, 500.0, 3860.0, 530.0]]
+    assert out['image'] is None
+
+
+def test_attach_leaves_segment_untracked(monkeypatch):
+    tracked = []
+    monkeypatch.setattr(tiling.resource_tracker, 'register', lambda name, rtype: tracked.append(name))
+    monkeypatch.setattr(tiling.resource_tracker, 'unregister',
+                        lambda name, rtype: tracked.remove(name) if name in tracked else None)
+    frame = tiling.SharedFrame((4, 4, 3))
+    tracked.clear()
+    tiling._worker['frames'] = {}
+    try:
+        tiling._attach(0, frame.name, frame.shape, frame.dtype)
+        # The worker's attachment must not leave the segment for its tracker to unlink
+        assert tracked == []
+        tiling._worker['frames'][0].close()
+    finally:
+        frame.close()
@@ -0,0 +1,64 @@
+import itertools
+import numpy as np
+
+from utils.tracker import BoxTracker, greedy_match, iou_matrix
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]])
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 100, 100]])
+    iou = iou_matrix(a, b)
+    assert iou.shape == (2, 3)
+    assert np.allclose(iou[0], [1.0, 50 / 150, 0.0])
+    assert np.allclose(iou[1], 0.0)
+    assert iou_matrix(np.empty((0, 4)), b).shape == (0, 3)
+
+
+def test_greedy_match_takes_best_pairs_once():
+    scores = np.array([[0.9, 0.8], [0.85, 0.1]])
+    assert greedy_match(scores, 0.3) == [(0, 0)]
+    assert sorted(greedy_match(scores, 0.05)) == [(0, 0), (1, 1)]
+    assert greedy_match(np.empty((0, 0)), 0.3) == []
+
+
+def test_ids_persist_and_respect_labels():
+    tracker = BoxTracker()
+    ids = itertools.count()
+    first, _ = tracker.update([[0, 0, 10, 10], [50, 50, 60, 60]], ['button', 'icon'], lambda: next(ids))
+    # Same boxes, slightly moved, listed in reverse order
+    second, _ = tracker.update([[51, 50, 61, 60], [1, 0, 11, 10]], ['icon', 'button'], lambda: next(ids))
+    assert second.tolist() == first[::-1].tolist()
+    # A different class at the same place is a new track
+    third, _ = tracker.update([[1, 0, 11, 10]], ['text'], lambda: next(ids))
+    assert third[0] not in first
+
+
+def test_tracks_expire_after_max_age():
+    tracker = BoxTracker(max_age=1)
+    ids = itertools.count()
+    (track,), _ = tracker.update([[0, 0, 10, 10]], None, lambda: next(ids))
+    tracker.update([], None, lambda: next(ids))
+    assert tracker.box_of(int(track)) is not None
+    tracker.update([], None, lambda: next(ids))
+    assert tracker.box_of(int(track)) is None
+
+
+def test_kalman_smooths_jitter_and_follows_motion():
+    rng = np.random.default_rng(0)
+    tracker = BoxTracker(measurement_noise=2.0)
+    ids = itertools.count()
+    truth = np.array([100.0, 100.0, 140.0, 120.0])
+    raw_err, smooth_err = [], []
+    for _ in range(30):
+        noisy = truth + rng.normal(0, 2.0, 4)
+        _, smoothed = tracker.update([noisy], None, lambda: next(ids))
+        raw_err.append(np.abs(noisy - truth).mean())
+        smooth_err.append(np.abs(smoothed[0] - truth).mean())
+    assert np.mean(smooth_err[10:]) < np.mean(raw_err[10:])
+
+    # Constant motion: the filter learns the velocity and keeps up
+    for step in range(30):
+        box = truth + [3 * step, 0, 3 * step, 0]
+        (track,), smoothed = tracker.update([box], None, lambda: next(ids))
+    assert track == 0
+    assert np.abs(smoothed[0] - box).max() < 1.0
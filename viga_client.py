@@ -0,0 +1,44 @@
+import argparse
+import json
+import os
+import sys
+
+# Add src to path if not already there
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from service.ipc import request, resolve_address  # type: ignore
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Thin client for a running VIGA daemon (python main.py --serve)")
+    parser.add_argument('intent', nargs='*', help="Natural language command")
+    parser.add_argument('--op', default='ground', choices=['ground', 'ping', 'stats', 'metrics', 'invalidate', 'shutdown'])
+    parser.add_argument('--prometheus', action='store_true',
+                        help="With --op metrics, print Prometheus text instead of JSON")
+    parser.add_argument('--socket', metavar='PATH', help="Unix socket path of the daemon")
+    parser.add_argument('--port', type=int, help="TCP port of the daemon on localhost")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    message = {'op': args.op}
+    if args.op == 'ground':
+        if not args.intent:
+            parser.error("an intent is required for --op ground")
+        message['intent'] = " ".join(args.intent)
+    elif args.op == 'metrics' and args.prometheus:
+        message['format'] = 'prometheus'
+
+    try:
+        reply = request(message, resolve_address(args.socket, args.port), timeout=args.timeout)
+    except OSError as e:
+        print(f"Could not reach VIGA daemon: {e}")
+        sys.exit(1)
+    if 'format' in message and reply.get('ok'):
+        print(reply['result'], end="")
+    else:
+        print(json.dumps(reply, indent=2))
+    sys.exit(0 if reply.get('ok') else 1)
+
+if __name__ == "__main__":
+    main()